@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'today_races',
     'today_race_detail',
     'report',
+    'history',
 ]
 
 MIDDLEWARE = [
@@ -125,6 +126,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# スクレイピング用 HTTP レスポンスキャッシュ（scraping/response_cache.py）
+HTTP_CACHE_DIR = BASE_DIR / 'data' / 'http_cache'
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# extractor の HTML パーサー（lxml / html.parser / html5lib）
+SCRAPING_PARSER_BACKEND = 'lxml'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -6,7 +6,7 @@ from django.conf.urls.static import static
 from ui.views import home, config, prediction_1,  prediction_2, media, delete_media, result, delete_result, report
 
 from today_races import views as tr_viewsl
-from today_race_detail.views import get_race_detail
+from today_race_detail.views import get_race_detail, get_race_detail_async, get_races_bulk, live_stream
 
 def api_root(request):
     return JsonResponse({
@@ -14,6 +14,9 @@ def api_root(request):
         "endpoints": [
             "/api/today_races/all/",
             "/api/today_races/characters_api/",
+            "/api/race/detail/",
+            "/api/race/bulk/",
+            "/api/live/",
         ]
     })
 
@@ -47,7 +50,10 @@ urlpatterns = [
     #API
     path("api/", api_root),
     path("api/today_races/", include("today_races.urls")),
-    path("api/race/detail/", get_race_detail, name="router_race_detail"),
+    path("api/race/detail/", get_race_detail_async, name="router_race_detail"),
+    path("api/race/detail/sync/", get_race_detail, name="router_race_detail_sync"),
+    path("api/race/bulk/", get_races_bulk, name="router_race_bulk"),
+    path("api/live/", live_stream, name="router_live"),
 ]
 
 if settings.DEBUG:
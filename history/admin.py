@@ -0,0 +1,6 @@
+from django.contrib import admin
+from .models import EquipmentStat, HistoricalRace, Racer
+
+admin.site.register(HistoricalRace)
+admin.site.register(Racer)
+admin.site.register(EquipmentStat)
@@ -0,0 +1,116 @@
+# history/archive.py
+"""
+boatrace.jp の指定日（hd=YYYYMMDD）のページから record を作って保存する。
+開催一覧 → 各場 raceindex → 各レース racelist / beforeinfo → 払戻一覧 の順に取り、
+パースは当日用と同じ関数（parse_sites_from_index / parse_racelist / parse_beforeinfo /
+parse_all_venues_as_dict）を使う。
+"""
+from __future__ import annotations
+from datetime import date
+from typing import Any, Dict, List, Tuple
+import logging
+import re
+
+from report.core.fetch_payouts import PAY_URL, parse_all_venues_as_dict
+from scraping import http_client
+from today_races.crawler import crawl
+from today_races.views import INDEX_URL, parse_sites_from_index, populate_sites
+from today_race_detail.prefetch import beforeinfo_url_for, parse_beforeinfo, parse_racelist
+from .equipment import fold_records
+from .racers import update_racers
+from .store import rno_to_int, save_records
+
+logger = logging.getLogger(__name__)
+
+
+def _with_day(url: str, day: date) -> str:
+    return f"{url}?hd={day:%Y%m%d}"
+
+
+def parse_payout_rows(rows: List[Tuple]) -> Dict[int, Dict[str, Any]]:
+    """
+    parse_all_venues_as_dict の1会場分 → { R: {"finish_order", "payouts"} }
+    払戻一覧に載るのは 3連単 なので、その組番がそのまま1〜3着になる。
+    """
+    result = {}
+    for race, combo, pay_text, _odds, pop_suffix, _href in rows:
+        try:
+            rno = rno_to_int(race)
+        except ValueError:
+            continue
+        m_pay = re.search(r"(\d[\d,]*)", pay_text)
+        m_pop = re.search(r"\d+", pop_suffix or "")
+        result[rno] = {
+            "finish_order": combo,
+            "payouts": [{
+                "bet_type": "trifecta",
+                "combo": combo,
+                "amount": int(m_pay.group(1).replace(",", "")) if m_pay else 0,
+                "popularity": int(m_pop.group(0)) if m_pop else None,
+            }],
+        }
+    return result
+
+
+def build_records(day: date) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """指定日の全レースの record を作る。返り値: (records, { URL or 会場: 失敗理由 })"""
+    # 過去日のページは二度と読まないので、ディスクキャッシュを通さない（当日のページを追い出さない）
+    fetch = lambda url: http_client.fetch_text(url, timeout=20, use_cache=False)
+    sites = parse_sites_from_index(fetch(_with_day(INDEX_URL, day)))
+    failures: Dict[str, str] = dict(populate_sites(sites, use_cache=False))
+
+    races = [
+        (site, race) for site in sites for race in site.get("races", [])
+        if race.get("url")
+    ]
+    urls = [race["url"] for _, race in races] + [beforeinfo_url_for(race["url"]) for _, race in races]
+    pages, errors = crawl(urls, use_cache=False)
+    failures.update(errors)
+
+    try:
+        pay = parse_all_venues_as_dict(fetch(_with_day(PAY_URL, day)))
+    except Exception as e:
+        failures["pay"] = str(e)
+        pay = {}
+    results = {place: parse_payout_rows(rows) for place, rows in pay.items()}
+
+    records = []
+    for site, race in races:
+        url = race["url"]
+        if url not in pages:
+            continue
+        try:
+            racelist = parse_racelist(pages[url], url)
+            before_html = pages.get(beforeinfo_url_for(url), "")
+            beforeinfo = parse_beforeinfo(before_html, url)
+        except Exception as e:
+            failures[url] = f"parse: {e}"
+            continue
+
+        rno = rno_to_int(race["rno"])
+        result = results.get(site["place"], {}).get(rno, {})
+        records.append({
+            "date": day,
+            "place": site["place"],
+            "rno": rno,
+            "time": race.get("time"),
+            "title": site.get("title"),
+            "type": racelist["meta"].get("type"),
+            "distance": racelist["meta"].get("distance"),
+            "url": url,
+            "weather": beforeinfo["weather_meta"],
+            "entries": racelist["entries"],
+            "before_entries": beforeinfo["before_entries"],
+            "finish_order": result.get("finish_order", ""),
+            "payouts": result.get("payouts", []),
+        })
+    return records, failures
+
+
+def archive_day(day: date) -> Tuple[int, Dict[str, str]]:
+    """指定日を取得して保存し、選手マスタ・モーター/ボート成績にもその日の分を畳み込む。返り値: (保存レース数, 失敗)"""
+    records, failures = build_records(day)
+    saved = save_records(records)
+    update_racers(records)
+    fold_records(records)
+    return saved, failures
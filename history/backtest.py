@@ -0,0 +1,232 @@
+# history/backtest.py
+"""
+履歴DBのレースを A / B の計算機と買い目ロジックに通して成績を集計する。
+
+本番（views の A / B）と同じ順で計算する：
+- 共通: _enrich（選手マスタ・モーター成績で欠損を補う。索引は現在のもの）
+- A: make_feature_table（出走表のみ）→ run_race_predict_logic と同じく make_feature_table_just で採点し直す
+- B: 出走表 + 展示をマージ → make_feature_table_just
+- 買い目は参考3連単（make_tickets の通常 points 点）、払戻は履歴DBの 3連単
+- 確率は probability.win_probabilities（最終スコア → 1着確率）で較正を見る
+
+レースは chunk ごとにプロセスプールへ渡し、chunk 内は NumPy 版
+（vectorized.make_feature_tables / _just、結果は通常版と同じ）でまとめて計算する。
+プールに渡す chunk は MAX_IN_FLIGHT × workers 個までにして、iter_records の読み出しと歩調を合わせる。
+"""
+from __future__ import annotations
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import contextlib
+import copy
+import io
+import os
+import time
+
+from today_race_detail.features.feature_calculator_a import _normalize_race_type
+from today_race_detail.features.probability import scores_matrix, win_probabilities
+from today_race_detail.features.tickets import make_tickets
+from today_race_detail.features.vectorized import make_feature_tables, make_feature_tables_just
+
+MODES = ("A", "B")
+DEFAULT_POINTS = 10
+CHUNK_SIZE = 500
+MAX_IN_FLIGHT = 2      # ワーカー1つあたりの未回収 chunk 数
+CALIBRATION_BINS = 10
+
+
+# ==========================================================
+# 1 chunk 分の評価（ワーカー側）
+# ==========================================================
+def _context(rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {"place": rec["place"], "distance": rec.get("distance"), "type": rec.get("type")}
+
+
+def _with_exhibit(rec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """racelist の entries に beforeinfo の展示をマージ（_run_race_detail_just_logic と同じ）"""
+    entries = copy.deepcopy(rec["entries"])
+    before = {int(k): v for k, v in (rec.get("before_entries") or {}).items()}
+    for e in entries:
+        lane = int(e.get("lane", 0))
+        if lane in before:
+            e.update(before[lane])
+    return entries
+
+
+def _trifecta_payout(rec: Dict[str, Any]) -> int:
+    for p in rec.get("payouts") or []:
+        if p["bet_type"] == "trifecta" and p["combo"] == rec["finish_order"]:
+            return p["amount"]
+    return 0
+
+
+def evaluate_chunk(records: List[Dict[str, Any]], modes: Tuple[str, ...] = MODES,
+                   points: int = DEFAULT_POINTS) -> List[Dict[str, Any]]:
+    """records（着順確定済み）→ レース × モードごとの結果行"""
+    records = [r for r in records if r.get("finish_order") and r.get("entries")]
+    if not records:
+        return []
+    contexts = [_context(r) for r in records]
+
+    scored: Dict[str, List[List[Dict[str, Any]]]] = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        if "A" in modes:
+            # 本番の A も参考買い目は make_feature_table_just のスコアで作る
+            a_scored = make_feature_tables([copy.deepcopy(r["entries"]) for r in records], contexts)
+            scored["A"] = make_feature_tables_just(a_scored, contexts)
+        if "B" in modes:
+            scored["B"] = make_feature_tables_just([_with_exhibit(r) for r in records], contexts)
+
+    rows = []
+    for mode, races in scored.items():
+        probs = win_probabilities(scores_matrix(races))
+        for rec, entries, p in zip(records, races, probs):
+            finish = rec["finish_order"]
+            winner = int(finish.split("-")[0])
+            picks = make_tickets(entries, "trifecta", "normal", points=points)
+            hit = finish in picks
+            top = int(p.argmax()) + 1
+            rows.append({
+                "mode": mode,
+                "place": rec["place"],
+                "type": _normalize_race_type(rec.get("type")),
+                "stake": 100 * len(picks),
+                "return": _trifecta_payout(rec) if hit else 0,
+                "hit": hit,
+                "top_won": top == winner,
+                "p_top": float(p.max()),
+                "probs": p.tolist(),
+                "winner": winner,
+            })
+    return rows
+
+
+def _evaluate_job(job):
+    records, modes, points = job
+    return evaluate_chunk(records, modes, points)
+
+
+# ==========================================================
+# 集計
+# ==========================================================
+def _new_stats() -> Dict[str, float]:
+    return {"races": 0, "hits": 0, "stake": 0, "return": 0, "top_won": 0, "p_top": 0.0, "brier": 0.0}
+
+
+def _add(stats: Dict[str, float], row: Dict[str, Any]) -> None:
+    stats["races"] += 1
+    stats["hits"] += row["hit"]
+    stats["stake"] += row["stake"]
+    stats["return"] += row["return"]
+    stats["top_won"] += row["top_won"]
+    stats["p_top"] += row["p_top"]
+    stats["brier"] += sum(
+        (p - (1.0 if lane == row["winner"] else 0.0)) ** 2
+        for lane, p in enumerate(row["probs"], start=1)
+    )
+
+
+def _finish(stats: Dict[str, float]) -> Dict[str, float]:
+    n = stats["races"] or 1
+    return {
+        "races": stats["races"],
+        "hit_rate": stats["hits"] / n,
+        "roi": stats["return"] / stats["stake"] if stats["stake"] else 0.0,
+        "stake": stats["stake"],
+        "return": stats["return"],
+        # 較正：本命（確率最大の艇）の予測勝率の平均 vs 実際の勝率
+        "top_pred": stats["p_top"] / n,
+        "top_actual": stats["top_won"] / n,
+        "brier": stats["brier"] / n,
+    }
+
+
+def _enriched(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """views._enrich と同じ補完（DB の索引を読むので親プロセスで行う）"""
+    from today_race_detail.views import _enrich
+
+    for rec in records:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _enrich(rec.get("entries") or [], rec["place"])
+        yield rec
+
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_backtest(records: Iterable[Dict[str, Any]], modes: Tuple[str, ...] = MODES,
+                 points: int = DEFAULT_POINTS, workers: int | None = None,
+                 chunk_size: int = CHUNK_SIZE, enrich: bool = True) -> Dict[str, Any]:
+    """
+    返り値:
+    {
+      "races": レース数, "seconds": 秒, "races_per_sec": ...,
+      "groups": { ("mode", "A"): stats, ("place", "桐生", "A"): stats, ("type", "予選", "A"): stats, ... },
+      "calibration": { mode: [ {"bin": (lo, hi), "count", "pred", "actual"} ... ] },
+    }
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+
+    groups: Dict[Tuple, Dict[str, float]] = defaultdict(_new_stats)
+    bins = {m: [[0, 0.0, 0] for _ in range(CALIBRATION_BINS)] for m in modes}  # 件数, 予測和, 的中数
+
+    def collect(rows):
+        for row in rows:
+            mode = row["mode"]
+            _add(groups[("mode", mode)], row)
+            _add(groups[("place", row["place"], mode)], row)
+            _add(groups[("type", row["type"], mode)], row)
+            for lane, p in enumerate(row["probs"], start=1):
+                b = bins[mode][min(int(p * CALIBRATION_BINS), CALIBRATION_BINS - 1)]
+                b[0] += 1
+                b[1] += p
+                b[2] += lane == row["winner"]
+        return len(rows)
+
+    if enrich:
+        records = _enriched(records)
+    jobs = ((chunk, tuple(modes), points) for chunk in _chunks(records, chunk_size))
+    n_rows = 0
+    if workers == 1:
+        for job in jobs:
+            n_rows += collect(_evaluate_job(job))
+    else:
+        # pool.map は全 chunk を先に投入する（期間全体を読み込んで pickle する）ので、窓を区切って投入する
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for job in jobs:
+                pending.append(pool.submit(_evaluate_job, job))
+                if len(pending) >= workers * MAX_IN_FLIGHT:
+                    n_rows += collect(pending.popleft().result())
+            while pending:
+                n_rows += collect(pending.popleft().result())
+
+    n_races = n_rows // max(len(modes), 1)
+    seconds = time.perf_counter() - started
+    return {
+        "races": n_races,
+        "seconds": seconds,
+        "races_per_sec": n_races / seconds if seconds > 0 else 0.0,
+        "groups": {key: _finish(stats) for key, stats in groups.items()},
+        "calibration": {
+            mode: [
+                {
+                    "bin": (i / CALIBRATION_BINS, (i + 1) / CALIBRATION_BINS),
+                    "count": count,
+                    "pred": total / count if count else 0.0,
+                    "actual": wins / count if count else 0.0,
+                }
+                for i, (count, total, wins) in enumerate(mode_bins)
+            ]
+            for mode, mode_bins in bins.items()
+        },
+    }
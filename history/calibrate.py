@@ -0,0 +1,228 @@
+# history/calibrate.py
+"""
+履歴DBの着順に合わせて B の計算機（feature_calculator_b）の W / W_EX / PLACE_BIAS / TYPE_BIAS を探索する。
+
+- 目的関数: 実際の 1-2-3着の Harville 確率（probability と同じ式）の負の対数尤度。A と B の平均
+- 本番（と backtest）の A は make_feature_table のあと make_feature_table_just で採点し直すので、
+  A も B と同じく score_b（展示なし）で採点する。どちらのスコアも B の値だけで決まるので、探索するのは B の値。
+  A の計算機の値は今のものをそのまま A の節に書き出す
+- 特徴量配列（vectorized.build_batch）は最初に1回だけ作って各ワーカーに渡し、
+  候補ごとに score_b で全レースをまとめて再計算する
+- 探索は (1+λ) 進化戦略: 今の最良値に雑音を足した λ 個の候補を並列に評価し、良ければ置き換える。
+  改善が無かった世代は雑音の幅を縮める
+- 期間の後ろ VALID_RATIO は検証用に残し、採用するかどうかはそちらで判断する
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+import copy
+import os
+import re
+
+import numpy as np
+
+from today_race_detail.features import feature_calculator_a as calc_a
+from today_race_detail.features import feature_calculator_b as calc_b
+from today_race_detail.features.params import PARAM_KEYS
+from today_race_detail.features.probability import TEMPERATURE, win_probabilities
+from today_race_detail.features.vectorized import (
+    KLASSES, MAX_BOATS, PLACES, RACE_TYPES, build_batch, compile_params, score_b,
+)
+from .backtest import _context, _with_exhibit
+
+MODES = ("A", "B")
+VALID_RATIO = 0.2
+GENERATIONS = 30
+POPULATION = 16
+SHRINK = 0.7            # 改善しなかった世代の雑音の縮め方
+EPS = 1e-9
+
+# 探索する値と、雑音の幅・取りうる範囲
+W_KEYS = ("lane", "st", "win", "two_natloc", "two_mecha", "three_mix")
+W_EX_KEYS = ("exhibit_time", "tilt", "course", "st_display", "adjust_weight")
+SIGMA = {"W": 0.02, "W_EX": 0.01, "PLACE_BIAS": 0.1, "TYPE_BIAS": 0.1}
+BOUNDS = {"W": (0.01, 1.0), "W_EX": (0.0, 0.3), "PLACE_BIAS": (-1.0, 1.0), "TYPE_BIAS": (-1.0, 2.0)}
+
+
+# ==========================================================
+# パラメータ ⇔ ベクトル
+# ==========================================================
+def _layout() -> List[Tuple[str, Any, Any]]:
+    """ベクトルの各要素が (表, キー1, キー2) のどこに当たるか"""
+    slots = [("W", k, None) for k in W_KEYS]
+    slots += [("W_EX", k, None) for k in W_EX_KEYS]
+    slots += [("PLACE_BIAS", p, lane) for p in PLACES for lane in range(1, MAX_BOATS + 1)]
+    slots += [("TYPE_BIAS", t, k) for t in RACE_TYPES for k in KLASSES]
+    return slots
+
+
+LAYOUT = _layout()
+_GROUP = np.array([table for table, _, _ in LAYOUT])
+_SIGMA = np.array([SIGMA[g] for g in _GROUP])
+_LO = np.array([BOUNDS[g][0] for g in _GROUP])
+_HI = np.array([BOUNDS[g][1] for g in _GROUP])
+_W_MASK = _GROUP == "W"
+
+
+def current_params(calculator: str = "B") -> Dict[str, Any]:
+    """計算機（"A" / "B"）に読み込まれている値（パラメータファイル適用後）"""
+    module = calc_a if calculator == "A" else calc_b
+    return copy.deepcopy({k: getattr(module, k) for k in PARAM_KEYS if hasattr(module, k)})
+
+
+def to_vector(params: Dict[str, Any]) -> np.ndarray:
+    vec = []
+    for table, k1, k2 in LAYOUT:
+        v = params[table].get(k1, {} if k2 is not None else 0.0)
+        vec.append(v.get(k2, 0.0) if k2 is not None else v)
+    return np.array(vec, dtype=float)
+
+
+def from_vector(vec: np.ndarray, template: Dict[str, Any]) -> Dict[str, Any]:
+    """template（W_EX の weather_factor など探索しない値を含む）に vec を書き込んだ新しい params"""
+    params = copy.deepcopy(template)
+    for (table, k1, k2), v in zip(LAYOUT, vec.tolist()):
+        v = round(v, 4)
+        if k2 is None:
+            params[table][k1] = v
+        else:
+            params[table].setdefault(k1, {})[k2] = v
+    return params
+
+
+def _project(vec: np.ndarray, w_total: float) -> np.ndarray:
+    """範囲に収め、W の合計を元の合計に戻す（スコアの桁と TEMPERATURE の関係を変えない）"""
+    vec = np.clip(vec, _LO, _HI)
+    vec[_W_MASK] *= w_total / vec[_W_MASK].sum()
+    return vec
+
+
+# ==========================================================
+# 目的関数
+# ==========================================================
+def _finish_lanes(finish_order: str) -> Tuple[int, int, int] | None:
+    lanes = [int(x) for x in re.findall(r"\d", finish_order or "")][:3]
+    if len(lanes) < 3 or len(set(lanes)) < 3 or not all(1 <= x <= MAX_BOATS for x in lanes):
+        return None
+    return tuple(lanes)
+
+
+def prepare(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """records → 特徴量配列と着順（1回だけ作る）"""
+    records = [
+        r for r in records
+        if r.get("entries") and len(r["entries"]) <= MAX_BOATS and _finish_lanes(r.get("finish_order"))
+    ]
+    contexts = [_context(r) for r in records]
+    finish = np.array([_finish_lanes(r["finish_order"]) for r in records], dtype=np.int64).reshape(-1, 3) - 1
+    return {
+        "races": len(records),
+        "A": build_batch([r["entries"] for r in records], contexts, with_exhibit=True),
+        "B": build_batch([_with_exhibit(r) for r in records], contexts, with_exhibit=True),
+        "finish": finish,
+    }
+
+
+def _lane_scores(batch: Dict[str, np.ndarray], values: np.ndarray) -> np.ndarray:
+    """艇の並び (R, 6) → 枠番順 (R, 6)（欠艇は NaN）"""
+    scores = np.full(values.shape, np.nan)
+    r, b = np.nonzero(batch["lane_idx"] > 0)
+    scores[r, batch["lane_idx"][r, b] - 1] = values[r, b]
+    return scores
+
+
+def _nll(scores: np.ndarray, finish: np.ndarray) -> float:
+    """実際の着順（3連単）の負の対数尤度の平均"""
+    p = win_probabilities(scores, TEMPERATURE)
+    rows = np.arange(len(p))
+    a, b, c = (p[rows, finish[:, i]] for i in range(3))
+    prob = a * b / np.maximum(1.0 - a, EPS) * c / np.maximum(1.0 - a - b, EPS)
+    return float(-np.log(np.maximum(prob, EPS)).mean())
+
+
+def evaluate(data: Dict[str, Any], params: Dict[str, Any], modes=MODES) -> float:
+    if not data["races"]:
+        return 0.0
+    compiled = compile_params(params)
+    losses = []
+    for mode in modes:
+        # A は展示なしの entries、B は展示をマージした entries（どちらも make_feature_table_just と同じ計算）
+        comps = score_b(data[mode], compiled)
+        losses.append(_nll(_lane_scores(data[mode], comps["raw"] * comps["calm_mult"]), data["finish"]))
+    return float(np.mean(losses))
+
+
+# ワーカー側（データは initializer で1回だけ受け取る）
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(data, template, modes):
+    _WORKER.update(data=data, template=template, modes=modes)
+
+
+def _evaluate_vector(vec: np.ndarray) -> float:
+    return evaluate(_WORKER["data"], from_vector(vec, _WORKER["template"]), _WORKER["modes"])
+
+
+# ==========================================================
+# 探索
+# ==========================================================
+def split_records(records: List[Dict[str, Any]], valid_ratio: float = VALID_RATIO):
+    """日付順の records を 学習 / 検証 に分ける（後ろが検証）"""
+    cut = int(len(records) * (1.0 - valid_ratio))
+    return records[:cut], records[cut:]
+
+
+def optimize(train: List[Dict[str, Any]], valid: List[Dict[str, Any]],
+             start: Dict[str, Any] | None = None, modes=MODES,
+             generations: int = GENERATIONS, population: int = POPULATION,
+             workers: int | None = None, seed: int = 0,
+             progress: Callable[[int, float, float], None] | None = None) -> Dict[str, Any]:
+    """
+    返り値: {"params": {"A": 今の A の値, "B": 最良の B の値}, "metrics": {...}}
+    start は B の値（省略時は今の B の値）。
+    progress(世代, その世代の最良, これまでの最良) は世代ごとに呼ぶ。
+    """
+    template = copy.deepcopy(start or current_params())
+    train_data, valid_data = prepare(train), prepare(valid)
+    rng = np.random.default_rng(seed)
+
+    best = to_vector(template)
+    w_total = float(best[_W_MASK].sum())
+    best_loss = evaluate(train_data, template, modes)
+    initial_loss = best_loss
+    scale = 1.0
+    # 1候補で動かす要素の割合（全部いっぺんに動かすと改善が見つかりにくい）
+    mix = max(4 / len(best), 0.1)
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(train_data, template, tuple(modes))) as pool:
+        for gen in range(1, generations + 1):
+            candidates = []
+            for _ in range(population):
+                mask = rng.random(len(best)) < mix
+                noise = rng.normal(0.0, 1.0, len(best)) * _SIGMA * scale * mask
+                candidates.append(_project(best + noise, w_total))
+
+            losses = list(pool.map(_evaluate_vector, candidates))
+            i = int(np.argmin(losses))
+            if losses[i] < best_loss:
+                best, best_loss = candidates[i], losses[i]
+            else:
+                scale *= SHRINK
+            if progress:
+                progress(gen, losses[i], best_loss)
+
+    params = from_vector(best, template)
+    return {
+        "params": {"A": current_params("A"), "B": params},
+        "metrics": {
+            "races_train": train_data["races"],
+            "races_valid": valid_data["races"],
+            "train_nll_before": round(initial_loss, 5),
+            "train_nll_after": round(evaluate(train_data, params, modes), 5),
+            "valid_nll_before": round(evaluate(valid_data, template, modes), 5),
+            "valid_nll_after": round(evaluate(valid_data, params, modes), 5),
+        },
+    }
@@ -0,0 +1,203 @@
+# history/equipment.py
+"""
+モーター / ボートの会場別成績（EquipmentStat）。
+
+- fold_records(records): 着順が確定した records を1パスで数え上げて upsert する
+  （数えたレースは HistoricalRace の motor_folded / boat_folded に印を付け、次からは飛ばす。
+  日付の順番に依らないので、新しい日から過去へさかのぼってアーカイブしても、後から索引を作っても同じ数になる）
+- get_equipment(kind, place, number): 全行（24場 × 約60機 × 2 で数千行）を dict に持ち、1艇1回の参照で返す
+- enrich_entries(entries, place): motor_index / boat_index を付け、ページの 2連率・3連率が欠損なら埋める
+"""
+from __future__ import annotations
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Tuple
+import threading
+import time
+
+from django.db import transaction
+
+from today_races.schedule import rno_to_int
+
+from .models import EquipmentStat, HistoricalRace
+from .store import BATCH_SIZE, _finish_positions
+
+KINDS = ("motor", "boat")
+FOLDED_FIELDS = {"motor": "motor_folded", "boat": "boat_folded"}   # 種別 → HistoricalRace の印
+RELOAD_SECONDS = 600   # 別プロセス（アーカイブ）の更新を拾う間隔
+MIN_STARTS = 10        # これより少ない出走数の成績では欠損を埋めない
+
+Key = Tuple[str, str, int]
+
+
+def _number(v: Any) -> int | None:
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return None
+
+
+# ==========================================================
+# 畳み込み
+# ==========================================================
+def _day_races(day: date) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    """その日の保存済みレース → {(会場, R): {"id", "motor_folded", "boat_folded"}}"""
+    return {
+        (r["place"], r["rno"]): r
+        for r in HistoricalRace.objects.filter(date=day).values("id", "place", "rno", *FOLDED_FIELDS.values())
+    }
+
+
+def fold_records(records: Iterable[Dict[str, Any]]) -> int:
+    """
+    records を1パスで数えて保存する。返り値: 更新したキー数
+    履歴DBに保存済みで、その種別にまだ畳み込んでいないレースだけを数える。
+    """
+    existing = {(r.kind, r.place, r.number): r for r in EquipmentStat.objects.all()}
+    counts: Dict[Key, List[int]] = defaultdict(lambda: [0, 0, 0, 0])  # 出走, 1着, 2連対, 3連対
+    dates: Dict[Key, List[date]] = {}                                   # [最初, 最後]
+    folded: Dict[str, List[int]] = {kind: [] for kind in KINDS}         # 種別 → 今回数えたレースの id
+    races_by_day: Dict[date, Dict[Tuple[str, int], Dict[str, Any]]] = {}
+
+    for rec in records:
+        if not rec.get("finish_order"):
+            continue
+        if rec["date"] not in races_by_day:
+            races_by_day[rec["date"]] = _day_races(rec["date"])
+        race = races_by_day[rec["date"]].get((rec["place"], rno_to_int(rec["rno"])))
+        if race is None:
+            continue  # 保存されていないレースは印を付けられないので数えない
+        kinds = [kind for kind in KINDS if not race[FOLDED_FIELDS[kind]]]
+        if not kinds:
+            continue
+        finish = _finish_positions(rec["finish_order"])
+        for kind in kinds:
+            race[FOLDED_FIELDS[kind]] = True   # 同じ records に同じレースが2回あっても1回だけ
+            folded[kind].append(race["id"])
+            for e in rec.get("entries") or []:
+                pos = finish.get(_number(e.get("lane")) or 0)
+                number = _number(e.get(f"{kind}_no"))
+                if number is None:
+                    continue
+                key = (kind, rec["place"], number)
+                c = counts[key]
+                c[0] += 1
+                c[1] += pos == 1
+                c[2] += bool(pos) and pos <= 2
+                c[3] += bool(pos)
+                d = dates.setdefault(key, [rec["date"], rec["date"]])
+                d[0], d[1] = min(d[0], rec["date"]), max(d[1], rec["date"])
+
+    if not any(folded.values()):
+        return 0
+    return _merge(existing, counts, dates, folded)
+
+
+@transaction.atomic
+def _merge(existing: Dict[Key, EquipmentStat], counts: Dict[Key, List[int]],
+           dates: Dict[Key, List[date]], folded: Dict[str, List[int]]) -> int:
+    rows = []
+    for key, (starts, wins, top2, top3) in counts.items():
+        first, last = dates[key]
+        row = existing.get(key)
+        if row is None:
+            row = EquipmentStat(kind=key[0], place=key[1], number=key[2], since=first, last_date=last)
+        row.since = min(row.since, first)
+        row.last_date = max(row.last_date, last)
+        row.starts += starts
+        row.wins += wins
+        row.top2 += top2
+        row.top3 += top3
+        rows.append(row)
+
+    EquipmentStat.objects.bulk_create(
+        rows,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["kind", "place", "number"],
+        update_fields=["starts", "wins", "top2", "top3", "since", "last_date"],
+    )
+    for kind, ids in folded.items():
+        for i in range(0, len(ids), BATCH_SIZE):
+            HistoricalRace.objects.filter(id__in=ids[i:i + BATCH_SIZE]).update(**{FOLDED_FIELDS[kind]: True})
+    _invalidate()
+    return len(rows)
+
+
+def reset(place: str, kind: str, since: date | None = None) -> int:
+    """
+    モーター / ボートの入れ替え：その会場の成績を消し、since 以降のレースの畳み込み済みの印を外す。
+    since より前のレースは印が残るので、入れ替え前の成績を数え直すことはない。返り値: 削除した行数
+    """
+    deleted, _ = EquipmentStat.objects.filter(place=place, kind=kind).delete()
+    races = HistoricalRace.objects.filter(place=place)
+    if since is not None:
+        races = races.filter(date__gte=since)
+    races.update(**{FOLDED_FIELDS[kind]: False})
+    _invalidate()
+    return deleted
+
+
+# ==========================================================
+# 参照（全行を dict に持つ）
+# ==========================================================
+_lock = threading.Lock()
+_index: Dict[Key, Dict[str, Any]] = {}
+_loaded_at: float | None = None
+
+
+def _as_stats(r: EquipmentStat) -> Dict[str, Any]:
+    n = r.starts or 1
+    return {
+        "starts": r.starts,
+        "win_rate": r.wins / n,
+        "top2_rate": r.top2 / n,
+        "top3_rate": r.top3 / n,
+        "since": r.since.isoformat(),
+    }
+
+
+def _fresh() -> bool:
+    return _loaded_at is not None and time.monotonic() - _loaded_at < RELOAD_SECONDS
+
+
+def _ensure_loaded() -> None:
+    global _index, _loaded_at
+    if _fresh():
+        return
+    with _lock:
+        if _fresh():
+            return
+        _index = {(r.kind, r.place, r.number): _as_stats(r) for r in EquipmentStat.objects.all()}
+        _loaded_at = time.monotonic()
+
+
+def _invalidate() -> None:
+    global _loaded_at
+    with _lock:
+        _loaded_at = None
+
+
+def get_equipment(kind: str, place: str | None, number: Any) -> Dict[str, Any] | None:
+    """(種別, 会場, 番号) の成績。無ければ None"""
+    _ensure_loaded()
+    return _index.get((kind, place, _number(number)))
+
+
+def enrich_entries(entries: List[Dict[str, Any]], place: str | None) -> List[Dict[str, Any]]:
+    """
+    entries に motor_index / boat_index（出走数・勝率・2連対率・3連対率）を付ける。
+    ページの motor_2r / motor_3r / boat_2r / boat_3r が欠損で、出走数が MIN_STARTS 以上なら % で埋める。
+    """
+    for e in entries:
+        for kind in KINDS:
+            stats = get_equipment(kind, place, e.get(f"{kind}_no"))
+            if not stats:
+                continue
+            e[f"{kind}_index"] = stats
+            if stats["starts"] < MIN_STARTS:
+                continue
+            for rate, key in (("top2_rate", f"{kind}_2r"), ("top3_rate", f"{kind}_3r")):
+                if e.get(key) in (None, "", "-", "--"):
+                    e[key] = round(stats[rate] * 100, 2)
+    return entries
@@ -0,0 +1,41 @@
+# history/management/commands/archive_races.py
+import contextlib
+import io
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from history.archive import archive_day
+
+
+class Command(BaseCommand):
+    help = "指定日のレース（出走表・直前情報・着順・払戻）を boatrace.jp から取得して履歴DBに保存する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="対象日 YYYY-MM-DD（省略時は前日）")
+        parser.add_argument("--days", type=int, default=1, help="対象日から何日さかのぼるか")
+
+    def handle(self, *args, **opts):
+        try:
+            end = date.fromisoformat(opts["date"]) if opts["date"] else date.today() - timedelta(days=1)
+        except ValueError:
+            raise CommandError("--date は YYYY-MM-DD で指定してください")
+
+        total = 0
+        # 古い日から順に（期別成績などは新しい出走表の値が残るように）
+        for offset in reversed(range(opts["days"])):
+            day = end - timedelta(days=offset)
+            try:
+                # extractor の print は出さない
+                with contextlib.redirect_stdout(io.StringIO()):
+                    saved, failures = archive_day(day)
+            except Exception as e:
+                self.stderr.write(f"⚠️ {day}: {e}")
+                continue
+
+            total += saved
+            for key, reason in failures.items():
+                self.stderr.write(f"⚠️ {day} {key}: {reason}")
+            self.stdout.write(f"🗄 {day}: {saved} レース保存")
+
+        self.stdout.write(self.style.SUCCESS(f"合計 {total} レース"))
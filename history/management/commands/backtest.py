@@ -0,0 +1,70 @@
+# history/management/commands/backtest.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from history.backtest import CHUNK_SIZE, DEFAULT_POINTS, MODES, run_backtest
+from history.store import iter_records
+
+
+class Command(BaseCommand):
+    help = "履歴DBのレースを A / B の計算機と参考買い目で再生し、的中率・回収率・較正を集計する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="開始日 YYYY-MM-DD（省略時は終了日の 365 日前）")
+        parser.add_argument("--end", help="終了日 YYYY-MM-DD（省略時は前日）")
+        parser.add_argument("--places", nargs="+", help="会場で絞る（例: 桐生 戸田）")
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("--points", type=int, default=DEFAULT_POINTS, help="参考3連単の点数")
+        parser.add_argument("--workers", type=int, default=None, help="プロセス数（省略時は CPU 数）")
+        parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="1ジョブあたりのレース数")
+        parser.add_argument("--no-enrich", action="store_true",
+                            help="選手マスタ・モーター成績での補完をしない（出走表の値だけで評価）")
+
+    def handle(self, *args, **opts):
+        try:
+            end = date.fromisoformat(opts["end"]) if opts["end"] else date.today() - timedelta(days=1)
+            start = date.fromisoformat(opts["start"]) if opts["start"] else end - timedelta(days=365)
+        except ValueError:
+            raise CommandError("--start / --end は YYYY-MM-DD で指定してください")
+
+        records = iter_records(start, end, opts["places"], finished_only=True)
+        result = run_backtest(
+            records,
+            modes=tuple(opts["modes"]),
+            points=opts["points"],
+            workers=opts["workers"],
+            chunk_size=opts["chunk"],
+            enrich=not opts["no_enrich"],
+        )
+        if not result["races"]:
+            self.stdout.write(f"⚠️ {start}〜{end} に着順確定済みのレースがありません")
+            return
+
+        groups = result["groups"]
+        for axis, title in (("mode", "モード別"), ("place", "会場別"), ("type", "種別")):
+            self.stdout.write(f"\n📊 {title}")
+            self.stdout.write(
+                f"{'':<10}{'mode':>5}{'races':>8}{'hit':>8}{'roi':>8}{'本命予測':>9}{'本命実績':>9}{'brier':>8}"
+            )
+            for key in sorted(k for k in groups if k[0] == axis):
+                s = groups[key]
+                label = key[1] if axis != "mode" else "全体"
+                self.stdout.write(
+                    f"{label:<10}{key[-1]:>5}{s['races']:>8}{s['hit_rate']:>8.1%}{s['roi']:>8.1%}"
+                    f"{s['top_pred']:>11.1%}{s['top_actual']:>11.1%}{s['brier']:>8.3f}"
+                )
+
+        for mode, rows in result["calibration"].items():
+            self.stdout.write(f"\n🎯 較正（1着確率） mode={mode}")
+            for row in rows:
+                if row["count"]:
+                    lo, hi = row["bin"]
+                    self.stdout.write(
+                        f"  {lo:.1f}-{hi:.1f}  n={row['count']:>7}  予測 {row['pred']:.3f}  実績 {row['actual']:.3f}"
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ {result['races']} レース / {result['seconds']:.1f} 秒"
+            f"（{result['races_per_sec']:.0f} races/sec）"
+        ))
@@ -0,0 +1,36 @@
+# history/management/commands/build_equipment_index.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from history.equipment import KINDS, fold_records, reset
+from history.store import iter_records
+
+
+class Command(BaseCommand):
+    help = "履歴DBの期間からモーター / ボートの会場別成績を畳み込む（--reset で入れ替え後の数え直し）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="開始日 YYYY-MM-DD（省略時は終了日の 365 日前。--reset 時は入れ替え日を必ず指定）")
+        parser.add_argument("--end", help="終了日 YYYY-MM-DD（省略時は前日）")
+        parser.add_argument("--places", nargs="+", help="会場で絞る")
+        parser.add_argument("--reset", choices=KINDS, help="先に対象会場のこの種別の成績を消す（--places と --start 必須）")
+
+    def handle(self, *args, **opts):
+        if opts["reset"] and not opts["start"]:
+            # 既定の 365 日に戻すと、入れ替え前の機体の成績を数え直してしまう
+            raise CommandError("--reset には入れ替え日を --start で指定してください")
+        try:
+            end = date.fromisoformat(opts["end"]) if opts["end"] else date.today() - timedelta(days=1)
+            start = date.fromisoformat(opts["start"]) if opts["start"] else end - timedelta(days=365)
+        except ValueError:
+            raise CommandError("--start / --end は YYYY-MM-DD で指定してください")
+
+        if opts["reset"]:
+            if not opts["places"]:
+                raise CommandError("--reset には --places を指定してください")
+            for place in opts["places"]:
+                self.stdout.write(f"🧹 {place} {opts['reset']}: {reset(place, opts['reset'], start)} 件削除")
+
+        count = fold_records(iter_records(start, end, opts["places"], finished_only=True))
+        self.stdout.write(self.style.SUCCESS(f"✅ {count} 件更新（{start}〜{end}）"))
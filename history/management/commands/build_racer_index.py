@@ -0,0 +1,24 @@
+# history/management/commands/build_racer_index.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from history.racers import rebuild_racers
+
+
+class Command(BaseCommand):
+    help = "履歴DBの期間から選手マスタ（期別成績・級別・当地成績・直近成績）をまとめて作り直す"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="開始日 YYYY-MM-DD（省略時は終了日の 180 日前）")
+        parser.add_argument("--end", help="終了日 YYYY-MM-DD（省略時は前日）")
+
+    def handle(self, *args, **opts):
+        try:
+            end = date.fromisoformat(opts["end"]) if opts["end"] else date.today() - timedelta(days=1)
+            start = date.fromisoformat(opts["start"]) if opts["start"] else end - timedelta(days=180)
+        except ValueError:
+            raise CommandError("--start / --end は YYYY-MM-DD で指定してください")
+
+        count = rebuild_racers(start, end)
+        self.stdout.write(self.style.SUCCESS(f"✅ 選手 {count} 人（{start}〜{end}）"))
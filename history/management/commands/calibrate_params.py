@@ -0,0 +1,73 @@
+# history/management/commands/calibrate_params.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from history.calibrate import GENERATIONS, MODES, POPULATION, VALID_RATIO, optimize, split_records
+from history.store import iter_records
+from today_race_detail.features.params import PARAMS_DIR, save_params
+from today_race_detail.features.feature_calculator_b import PARAMS_VERSION
+
+
+class Command(BaseCommand):
+    help = "履歴DBの着順（A/B 両モードの最終スコア）に合わせて B の計算機の重み・バイアスを探索し、新しい版のパラメータファイルを書き出す"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="開始日 YYYY-MM-DD（省略時は終了日の 365 日前）")
+        parser.add_argument("--end", help="終了日 YYYY-MM-DD（省略時は前日）")
+        parser.add_argument("--places", nargs="+", help="会場で絞る")
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("--generations", type=int, default=GENERATIONS)
+        parser.add_argument("--population", type=int, default=POPULATION, help="1世代の候補数")
+        parser.add_argument("--workers", type=int, default=None, help="プロセス数（省略時は CPU 数）")
+        parser.add_argument("--valid-ratio", type=float, default=VALID_RATIO, help="検証に残す割合（期間の後ろ）")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--force", action="store_true", help="検証で改善しなくても保存する")
+        parser.add_argument("--dry-run", action="store_true", help="探索だけして保存しない")
+
+    def handle(self, *args, **opts):
+        try:
+            end = date.fromisoformat(opts["end"]) if opts["end"] else date.today() - timedelta(days=1)
+            start = date.fromisoformat(opts["start"]) if opts["start"] else end - timedelta(days=365)
+        except ValueError:
+            raise CommandError("--start / --end は YYYY-MM-DD で指定してください")
+
+        records = list(iter_records(start, end, opts["places"], finished_only=True))
+        if not records:
+            raise CommandError(f"{start}〜{end} に着順確定済みのレースがありません")
+        train, valid = split_records(records, opts["valid_ratio"])
+        self.stdout.write(f"🔧 v{PARAMS_VERSION} から探索: 学習 {len(train)} / 検証 {len(valid)} レース")
+
+        def progress(gen, gen_best, best):
+            self.stdout.write(f"  世代 {gen:>3}: 候補最良 {gen_best:.5f} / 最良 {best:.5f}")
+
+        result = optimize(
+            train, valid,
+            modes=tuple(opts["modes"]),
+            generations=opts["generations"],
+            population=opts["population"],
+            workers=opts["workers"],
+            seed=opts["seed"],
+            progress=progress,
+        )
+        m = result["metrics"]
+        self.stdout.write(
+            f"📉 学習 NLL {m['train_nll_before']:.5f} → {m['train_nll_after']:.5f} / "
+            f"検証 NLL {m['valid_nll_before']:.5f} → {m['valid_nll_after']:.5f}"
+        )
+
+        if opts["dry_run"]:
+            return
+        if m["valid_nll_after"] >= m["valid_nll_before"] and not opts["force"]:
+            self.stdout.write("⚠️ 検証期間で改善しなかったので保存しません（--force で保存）")
+            return
+
+        version = save_params(result["params"], meta={
+            "based_on": PARAMS_VERSION,
+            "source": {"start": str(start), "end": str(end), "places": opts["places"],
+                       "modes": opts["modes"], "seed": opts["seed"]},
+            "metrics": m,
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ v{version} を保存しました（{PARAMS_DIR}）。次回の起動から計算機が読み込みます"
+        ))
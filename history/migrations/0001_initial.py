@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalRace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('place', models.CharField(max_length=20)),
+                ('rno', models.PositiveSmallIntegerField()),
+                ('deadline', models.CharField(blank=True, max_length=5)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('race_type', models.CharField(blank=True, max_length=50)),
+                ('distance', models.CharField(blank=True, max_length=20)),
+                ('racelist_url', models.URLField(blank=True, max_length=300)),
+                ('weather', models.CharField(blank=True, max_length=20)),
+                ('temperature', models.FloatField(blank=True, null=True)),
+                ('water_temp', models.FloatField(blank=True, null=True)),
+                ('wind_speed', models.FloatField(blank=True, null=True)),
+                ('wind_angle', models.FloatField(blank=True, null=True)),
+                ('wave_height', models.FloatField(blank=True, null=True)),
+                ('relative_wind', models.CharField(blank=True, max_length=50)),
+                ('finish_order', models.CharField(blank=True, max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['place', 'date'], name='idx_hist_race_place_date')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'place', 'rno'), name='uniq_hist_race')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalPayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bet_type', models.CharField(max_length=10)),
+                ('combo', models.CharField(max_length=20)),
+                ('amount', models.PositiveIntegerField()),
+                ('popularity', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('race', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payouts', to='history.historicalrace')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('race', 'bet_type', 'combo'), name='uniq_hist_payout')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lane', models.PositiveSmallIntegerField()),
+                ('racer_id', models.CharField(blank=True, max_length=10)),
+                ('racer_name', models.CharField(blank=True, max_length=50)),
+                ('klass', models.CharField(blank=True, max_length=5)),
+                ('motor_no', models.CharField(blank=True, max_length=10)),
+                ('boat_no', models.CharField(blank=True, max_length=10)),
+                ('entry_json', models.TextField()),
+                ('before_json', models.TextField(blank=True)),
+                ('finish', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('race', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='history.historicalrace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['racer_id'], name='idx_hist_entry_racer')],
+                'constraints': [models.UniqueConstraint(fields=('race', 'lane'), name='uniq_hist_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Racer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('racer_id', models.CharField(max_length=10, unique=True)),
+                ('name', models.CharField(blank=True, max_length=50)),
+                ('klass', models.CharField(blank=True, max_length=5)),
+                ('branch', models.CharField(blank=True, max_length=20)),
+                ('origin', models.CharField(blank=True, max_length=20)),
+                ('age', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('weight', models.FloatField(blank=True, null=True)),
+                ('f_count', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('l_count', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('avg_st', models.FloatField(blank=True, null=True)),
+                ('national_win', models.FloatField(blank=True, null=True)),
+                ('national_2r', models.FloatField(blank=True, null=True)),
+                ('national_3r', models.FloatField(blank=True, null=True)),
+                ('local_json', models.TextField(blank=True)),
+                ('stats_date', models.DateField(blank=True, null=True)),
+                ('recent_form', models.CharField(blank=True, max_length=20)),
+                ('starts', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['klass'], name='idx_racer_klass')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0002_racer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('motor', 'モーター'), ('boat', 'ボート')], max_length=5)),
+                ('place', models.CharField(max_length=20)),
+                ('number', models.PositiveSmallIntegerField()),
+                ('starts', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('top2', models.PositiveIntegerField(default=0)),
+                ('top3', models.PositiveIntegerField(default=0)),
+                ('since', models.DateField()),
+                ('last_date', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'place', 'number'), name='uniq_equipment')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:04
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def mark_folded(apps, schema_editor):
+    """これまでの last_date 方式で数えてあった範囲（会場 × 種別の since〜last_date）のレースに印を付ける"""
+    EquipmentStat = apps.get_model("history", "EquipmentStat")
+    HistoricalRace = apps.get_model("history", "HistoricalRace")
+    spans = (
+        EquipmentStat.objects.values("kind", "place")
+        .annotate(first=Min("since"), last=Max("last_date"))
+    )
+    for span in spans:
+        HistoricalRace.objects.filter(
+            place=span["place"], date__range=(span["first"], span["last"])
+        ).exclude(finish_order="").update(**{f"{span['kind']}_folded": True})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0003_equipmentstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalrace',
+            name='boat_folded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='historicalrace',
+            name='motor_folded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_folded, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,154 @@
+from django.db import models
+
+
+class HistoricalRace(models.Model):
+    """
+    過去レース1件（日付 × 会場 × R）。
+    出走表・直前情報・天候・着順・払戻を1レース単位でまとめて残す。
+    """
+    date = models.DateField()
+    place = models.CharField(max_length=20)
+    rno = models.PositiveSmallIntegerField()
+    deadline = models.CharField(max_length=5, blank=True)      # "15:42"
+    title = models.CharField(max_length=200, blank=True)
+    race_type = models.CharField(max_length=50, blank=True)
+    distance = models.CharField(max_length=20, blank=True)
+    racelist_url = models.URLField(max_length=300, blank=True)
+
+    # 直前情報の気象（beforeinfo）
+    weather = models.CharField(max_length=20, blank=True)
+    temperature = models.FloatField(null=True, blank=True)
+    water_temp = models.FloatField(null=True, blank=True)
+    wind_speed = models.FloatField(null=True, blank=True)
+    wind_angle = models.FloatField(null=True, blank=True)
+    wave_height = models.FloatField(null=True, blank=True)
+    relative_wind = models.CharField(max_length=50, blank=True)
+
+    finish_order = models.CharField(max_length=20, blank=True)  # "1-3-2"（空なら未確定）
+
+    # モーター / ボート成績（EquipmentStat）に畳み込み済みか（同じレースを2回数えない）
+    motor_folded = models.BooleanField(default=False)
+    boat_folded = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "place", "rno"], name="uniq_hist_race"),
+        ]
+        indexes = [
+            models.Index(fields=["place", "date"], name="idx_hist_race_place_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.place} {self.rno}R"
+
+
+class HistoricalEntry(models.Model):
+    """出走1艇分（racelist の行 + beforeinfo の展示）"""
+    race = models.ForeignKey(HistoricalRace, on_delete=models.CASCADE, related_name="entries")
+    lane = models.PositiveSmallIntegerField()
+    racer_id = models.CharField(max_length=10, blank=True)
+    racer_name = models.CharField(max_length=50, blank=True)
+    klass = models.CharField(max_length=5, blank=True)
+    motor_no = models.CharField(max_length=10, blank=True)
+    boat_no = models.CharField(max_length=10, blank=True)
+    entry_json = models.TextField()                  # racelist の entry そのまま
+    before_json = models.TextField(blank=True)       # beforeinfo の before_entries[lane]
+    finish = models.PositiveSmallIntegerField(null=True, blank=True)  # 着順（1〜3 のみ判明）
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["race", "lane"], name="uniq_hist_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["racer_id"], name="idx_hist_entry_racer"),
+        ]
+
+    def __str__(self):
+        return f"{self.race} {self.lane} {self.racer_name}"
+
+
+class HistoricalPayout(models.Model):
+    """払戻（式別 × 組番）。金額は100円あたり"""
+    race = models.ForeignKey(HistoricalRace, on_delete=models.CASCADE, related_name="payouts")
+    bet_type = models.CharField(max_length=10)       # trifecta / trio / exacta / quinella / win / place
+    combo = models.CharField(max_length=20)          # "1-3-2" / "1=2=3"
+    amount = models.PositiveIntegerField()
+    popularity = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["race", "bet_type", "combo"], name="uniq_hist_payout"),
+        ]
+
+    def __str__(self):
+        return f"{self.race} {self.bet_type} {self.combo} ¥{self.amount}"
+
+
+class Racer(models.Model):
+    """
+    選手マスタ（登録番号ごと）。
+    期別成績・級別は最後に見た出走表の値、当地成績は会場ごと、直近成績は着順の並び。
+    履歴DBからまとめて作り、アーカイブのたびにその日の分だけ畳み込む（history/racers.py）。
+    """
+    racer_id = models.CharField(max_length=10, unique=True)
+    name = models.CharField(max_length=50, blank=True)
+    klass = models.CharField(max_length=5, blank=True)
+    branch = models.CharField(max_length=20, blank=True)
+    origin = models.CharField(max_length=20, blank=True)
+    age = models.PositiveSmallIntegerField(null=True, blank=True)
+    weight = models.FloatField(null=True, blank=True)
+
+    # 期別成績
+    f_count = models.PositiveSmallIntegerField(null=True, blank=True)
+    l_count = models.PositiveSmallIntegerField(null=True, blank=True)
+    avg_st = models.FloatField(null=True, blank=True)
+    national_win = models.FloatField(null=True, blank=True)
+    national_2r = models.FloatField(null=True, blank=True)
+    national_3r = models.FloatField(null=True, blank=True)
+    local_json = models.TextField(blank=True)         # { 会場: {"local_win", "local_2r", "local_3r"} }
+    stats_date = models.DateField(null=True, blank=True)  # 上の値を取った出走表の日付
+
+    # 直近成績（新しい順。"1"〜"3" = 着順、"-" = 4着以下・欠場など）
+    recent_form = models.CharField(max_length=20, blank=True)
+    starts = models.PositiveIntegerField(default=0)   # 履歴DBにある着順確定の出走数
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["klass"], name="idx_racer_klass"),
+        ]
+
+    def __str__(self):
+        return f"{self.racer_id} {self.name}"
+
+
+class EquipmentStat(models.Model):
+    """
+    モーター / ボートの成績（会場 × 種別 × 番号）。
+    アーカイブした日の着順を1パスで畳み込んで数えていく（history/equipment.py）。
+    畳み込んだレースは HistoricalRace の motor_folded / boat_folded で覚えるので、日付の順番に依らない。
+    """
+    KIND_CHOICES = [
+        ("motor", "モーター"),
+        ("boat", "ボート"),
+    ]
+
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    place = models.CharField(max_length=20)
+    number = models.PositiveSmallIntegerField()
+    starts = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    top2 = models.PositiveIntegerField(default=0)
+    top3 = models.PositiveIntegerField(default=0)
+    since = models.DateField()       # 数えた中で最も古い日（モーター・ボートの入れ替えでリセット）
+    last_date = models.DateField()   # 数えた中で最も新しい日
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "place", "number"], name="uniq_equipment"),
+        ]
+
+    def __str__(self):
+        return f"{self.place} {self.get_kind_display()} {self.number}"
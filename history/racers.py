@@ -0,0 +1,294 @@
+# history/racers.py
+"""
+選手マスタ（Racer）の作成・更新と、登録番号で引くメモリ内 LRU。
+
+- rebuild_racers(start, end): 履歴DBの期間をまとめて畳み込み、Racer を作り直す
+- update_racers(records): アーカイブした日の records だけを畳み込む
+  （期別成績・当地成績は日付の新しい方を残し、直近成績・出走数は履歴DBから数え直すので、日付の順番に依らない）
+- get_racers(ids): LRU に無い分（と RELOAD_SECONDS を過ぎた分）だけ1クエリで引く。1艇あたり辞書1回の参照
+  （畳み込みは別プロセスのコマンドで走るので、Web プロセスは時間で引き直して拾う）
+- enrich_entries(entries, place): 出走表の欠損を選手マスタで埋め、直近成績と級別の食い違いを付ける
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Tuple
+import json
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from .models import HistoricalEntry, Racer
+from .store import BATCH_SIZE, iter_records
+
+RECENT_RACES = 20      # recent_form に残す出走数
+MAX_RACERS = 4096      # 登録選手（約1600人）が全員収まる大きさ
+RELOAD_SECONDS = 600   # 別プロセス（アーカイブ・索引作成）の更新を拾う間隔
+
+# 出走表の entry のキー → Racer のフィールド
+STAT_FIELDS = {
+    "racer_name": "name",
+    "klass": "klass",
+    "branch": "branch",
+    "origin": "origin",
+    "age": "age",
+    "weight": "weight",
+    "F": "f_count",
+    "L": "l_count",
+    "avg_st": "avg_st",
+    "national_win": "national_win",
+    "national_2r": "national_2r",
+    "national_3r": "national_3r",
+}
+TEXT_FIELDS = ("name", "klass", "branch", "origin")
+LOCAL_KEYS = ("local_win", "local_2r", "local_3r")
+UPDATE_FIELDS = list(STAT_FIELDS.values()) + ["local_json", "stats_date", "recent_form", "starts"]
+
+
+def _missing(v: Any) -> bool:
+    return v in (None, "", "-", "--")
+
+
+# ==========================================================
+# 畳み込み（records → Racer）
+# ==========================================================
+def _blank(racer_id: str) -> Dict[str, Any]:
+    return {"racer_id": racer_id, "local": {}, "stats_date": None, "recent_form": "", "starts": 0,
+            **{f: None for f in STAT_FIELDS.values()}}
+
+
+def _from_row(r: Racer) -> Dict[str, Any]:
+    state = {f: getattr(r, f) for f in STAT_FIELDS.values()}
+    state.update(
+        racer_id=r.racer_id,
+        local=json.loads(r.local_json) if r.local_json else {},
+        stats_date=r.stats_date,
+        recent_form=r.recent_form,
+        starts=r.starts,
+    )
+    return state
+
+
+def _fold(states: Dict[str, Dict[str, Any]], records: Iterable[Dict[str, Any]]) -> None:
+    """
+    records を states に畳み込む（期別成績・級別・当地成績）。
+    どの順番で渡されても、日付の新しい出走表の値が残る（同じ日を2回渡しても結果は同じ）。
+    直近成績・出走数は _recent_forms で履歴DBから作る。
+    """
+    for rec in records:
+        for e in rec.get("entries") or []:
+            racer_id = str(e.get("racer_id") or "")
+            if not racer_id:
+                continue
+            s = states.setdefault(racer_id, _blank(racer_id))
+
+            # 期別成績・級別は新しい出走表の値で上書き（欠損は前の値を残す）
+            if s["stats_date"] is None or rec["date"] >= s["stats_date"]:
+                for key, field in STAT_FIELDS.items():
+                    if not _missing(e.get(key)):
+                        s[field] = e[key]
+                s["stats_date"] = rec["date"]
+            local = {k: e.get(k) for k in LOCAL_KEYS if not _missing(e.get(k))}
+            seen = (s["local"].get(rec["place"]) or {}).get("date")
+            if local and (seen is None or rec["date"].isoformat() >= seen):
+                s["local"][rec["place"]] = {**local, "date": rec["date"].isoformat()}
+
+
+def _recent_forms(racer_ids: Iterable[str]) -> Dict[str, Tuple[str, int]]:
+    """
+    { 登録番号: (直近成績, 出走数) }（履歴DBの着順確定レースから。直近は新しい順に RECENT_RACES 件）
+    出走表を先にアーカイブして着順が後から入った日も、次の畳み込みで数えられる。
+    """
+    ids = list(racer_ids)
+    finished = HistoricalEntry.objects.filter(racer_id__in=ids).exclude(race__finish_order="")
+    starts = dict(finished.values("racer_id").annotate(n=Count("id")).values_list("racer_id", "n"))
+    rows = (
+        finished.annotate(n=Window(
+            RowNumber(), partition_by=F("racer_id"),
+            order_by=[F("race__date").desc(), F("race__deadline").desc(), F("race__rno").desc()],
+        ))
+        .filter(n__lte=RECENT_RACES)
+        .order_by("racer_id", "n")
+        .values_list("racer_id", "finish")
+    )
+    forms: Dict[str, str] = {}
+    for racer_id, pos in rows:
+        forms[racer_id] = forms.get(racer_id, "") + (str(pos) if pos else "-")
+    return {racer_id: (forms.get(racer_id, ""), n) for racer_id, n in starts.items()}
+
+
+def _apply_recent(states: Dict[str, Dict[str, Any]]) -> None:
+    recent = {}
+    ids = list(states)
+    for i in range(0, len(ids), BATCH_SIZE):
+        recent.update(_recent_forms(ids[i:i + BATCH_SIZE]))
+    for racer_id, s in states.items():
+        s["recent_form"], s["starts"] = recent.get(racer_id, ("", 0))
+
+
+def _to_row(s: Dict[str, Any]) -> Racer:
+    fields = {f: s[f] for f in STAT_FIELDS.values()}
+    for f in TEXT_FIELDS:
+        fields[f] = fields[f] or ""
+    return Racer(
+        racer_id=s["racer_id"],
+        local_json=json.dumps(s["local"], ensure_ascii=False),
+        stats_date=s["stats_date"],
+        recent_form=s["recent_form"],
+        starts=s["starts"],
+        **fields,
+    )
+
+
+@transaction.atomic
+def _save(states: Dict[str, Dict[str, Any]]) -> int:
+    Racer.objects.bulk_create(
+        [_to_row(s) for s in states.values()],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["racer_id"],
+        update_fields=UPDATE_FIELDS,
+    )
+    _forget(states.keys())
+    return len(states)
+
+
+def rebuild_racers(start: date, end: date) -> int:
+    """期間の履歴から Racer を作り直す（期間に出てこない選手の行はそのまま）。返り値: 選手数"""
+    states: Dict[str, Dict[str, Any]] = {}
+    _fold(states, iter_records(start, end))
+    _apply_recent(states)
+    return _save(states)
+
+
+def update_racers(records: List[Dict[str, Any]]) -> int:
+    """
+    アーカイブした records を既存の Racer に畳み込む。返り値: 更新した選手数
+    records は履歴DBに保存済みであること（直近成績・出走数はそこから数え直す）
+    """
+    ids = {str(e.get("racer_id")) for r in records for e in r.get("entries") or [] if e.get("racer_id")}
+    states = {r.racer_id: _from_row(r) for r in Racer.objects.filter(racer_id__in=ids)}
+    _fold(states, records)
+    states = {k: v for k, v in states.items() if k in ids}
+    _apply_recent(states)
+    return _save(states)
+
+
+# ==========================================================
+# 参照（LRU）
+# ==========================================================
+_lock = threading.Lock()
+_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()   # 登録番号 → (読んだ時刻, 選手情報)
+_stats = {"hits": 0, "misses": 0}
+
+
+def _as_entry(r: Racer) -> Dict[str, Any]:
+    """Racer → 出走表の entry と同じキーの dict（+ local / recent_form / stats_date）"""
+    d = {key: getattr(r, field) for key, field in STAT_FIELDS.items()}
+    d.update(
+        racer_id=r.racer_id,
+        local=json.loads(r.local_json) if r.local_json else {},
+        recent_form=r.recent_form,
+        stats_date=r.stats_date.isoformat() if r.stats_date else None,
+    )
+    return d
+
+
+def get_racers(racer_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """{ 登録番号: 選手情報 }（マスタに無い登録番号は含めない）"""
+    ids = [str(i) for i in racer_ids if i not in (None, "")]
+    found: Dict[str, Dict[str, Any]] = {}
+    now = time.monotonic()
+    with _lock:
+        for racer_id in ids:
+            cached = _cache.get(racer_id)
+            if cached is not None and now - cached[0] < RELOAD_SECONDS:
+                _cache.move_to_end(racer_id)
+                found[racer_id] = cached[1]
+                _stats["hits"] += 1
+    missing = [i for i in ids if i not in found]
+
+    if missing:
+        rows = {r.racer_id: _as_entry(r) for r in Racer.objects.filter(racer_id__in=missing)}
+        with _lock:
+            _stats["misses"] += len(missing)
+            # マスタに無い登録番号は覚えない（索引が作られたら次の参照で引ける）
+            for racer_id, racer in rows.items():
+                found[racer_id] = racer
+                _cache[racer_id] = (now, racer)
+                _cache.move_to_end(racer_id)
+            while len(_cache) > MAX_RACERS:
+                _cache.popitem(last=False)
+
+    return found
+
+
+def get_racer(racer_id: Any) -> Dict[str, Any] | None:
+    return get_racers([racer_id]).get(str(racer_id))
+
+
+def _forget(racer_ids: Iterable[str]) -> None:
+    with _lock:
+        for racer_id in racer_ids:
+            _cache.pop(racer_id, None)
+
+
+def cache_info() -> Dict[str, int]:
+    return {"size": len(_cache), "max": MAX_RACERS, **_stats}
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+        _stats.update(hits=0, misses=0)
+
+
+# ==========================================================
+# 出走表の補完・照合
+# ==========================================================
+def form_stats(recent_form: str) -> Dict[str, float]:
+    """recent_form → {"starts", "win_rate", "top2_rate", "top3_rate"}"""
+    n = len(recent_form)
+    if not n:
+        return {"starts": 0, "win_rate": 0.0, "top2_rate": 0.0, "top3_rate": 0.0}
+    return {
+        "starts": n,
+        "win_rate": recent_form.count("1") / n,
+        "top2_rate": sum(recent_form.count(c) for c in "12") / n,
+        "top3_rate": sum(recent_form.count(c) for c in "123") / n,
+    }
+
+
+def enrich_entries(entries: List[Dict[str, Any]], place: str | None = None) -> List[Dict[str, Any]]:
+    """
+    出走表の entries を選手マスタで補う（entries を書き換えて返す）。
+    - 欠損（None / "-"）の期別成績・当地成績だけを埋める。ページの値は上書きしない
+    - recent_form / recent_stats を付ける
+    - 氏名・級別がマスタと違えば racer_mismatch にキーを入れる（期替わり・取り違えの確認用）
+    """
+    racers = get_racers(e.get("racer_id") for e in entries)
+    for e in entries:
+        r = racers.get(str(e.get("racer_id")))
+        if not r:
+            continue
+        for key in STAT_FIELDS:
+            if _missing(e.get(key)) and r.get(key) not in (None, ""):
+                e[key] = r[key]
+        local = r["local"].get(place) or {}
+        for key in LOCAL_KEYS:
+            if _missing(e.get(key)) and not _missing(local.get(key)):
+                e[key] = local[key]
+
+        e["recent_form"] = r["recent_form"]
+        e["recent_stats"] = form_stats(r["recent_form"])
+        mismatch = [
+            key for key in ("racer_name", "klass")
+            if e.get(key) and r.get(key) and str(e[key]).replace(" ", "").replace("　", "")
+            != str(r[key]).replace(" ", "").replace("　", "")
+        ]
+        if mismatch:
+            e["racer_mismatch"] = mismatch
+    return entries
@@ -0,0 +1,198 @@
+# history/store.py
+"""
+過去レースの保存（まとめて upsert）と期間指定の読み出し。
+
+1レース分の record（保存も読み出しも同じ形）:
+{
+    "date": date, "place": "桐生", "rno": 1, "time": "15:42",
+    "title": ..., "type": ..., "distance": ..., "url": racelist URL,
+    "weather": { weather_meta（beforeinfo） },
+    "entries": [ racelist の entry ... ],
+    "before_entries": { 枠番: beforeinfo の展示 ... },
+    "finish_order": "1-3-2",
+    "payouts": [ {"bet_type": "trifecta", "combo": "1-3-2", "amount": 1230, "popularity": 5}, ... ],
+}
+"""
+from __future__ import annotations
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List
+import json
+import re
+
+from django.db import transaction
+
+from today_races.schedule import rno_to_int
+from .models import HistoricalEntry, HistoricalPayout, HistoricalRace
+
+BATCH_SIZE = 500
+
+RACE_UPDATE_FIELDS = [
+    "deadline", "title", "race_type", "distance", "racelist_url",
+    "weather", "temperature", "water_temp", "wind_speed", "wind_angle", "wave_height",
+    "relative_wind", "finish_order",
+]
+
+
+def _float(v: Any) -> float | None:
+    try:
+        return float(v) if v not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _finish_positions(finish_order: str) -> Dict[int, int]:
+    """"1-3-2" → {1: 1, 3: 2, 2: 3}（枠番 → 着順）"""
+    lanes = [int(x) for x in re.findall(r"\d", finish_order or "")]
+    return {lane: pos for pos, lane in enumerate(lanes, start=1)}
+
+
+# ==========================================================
+# 保存
+# ==========================================================
+def _race_row(rec: Dict[str, Any]) -> HistoricalRace:
+    w = rec.get("weather") or {}
+    return HistoricalRace(
+        date=rec["date"],
+        place=rec["place"],
+        rno=rno_to_int(rec["rno"]),
+        deadline=rec.get("time") or "",
+        title=rec.get("title") or "",
+        race_type=rec.get("type") or "",
+        distance=rec.get("distance") or "",
+        racelist_url=rec.get("url") or "",
+        weather=w.get("weather") or "",
+        temperature=_float(w.get("temperature")),
+        water_temp=_float(w.get("water_temp")),
+        wind_speed=_float(w.get("wind_speed")),
+        wind_angle=_float(w.get("wind_angle")),
+        wave_height=_float(w.get("wave_height")),
+        relative_wind=w.get("relative_wind") or "",
+        finish_order=rec.get("finish_order") or "",
+    )
+
+
+@transaction.atomic
+def save_records(records: Iterable[Dict[str, Any]]) -> int:
+    """records をまとめて upsert する（同じ 日付×会場×R は上書き）。返り値: レース数"""
+    records = list(records)
+    if not records:
+        return 0
+
+    HistoricalRace.objects.bulk_create(
+        [_race_row(rec) for rec in records],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["date", "place", "rno"],
+        update_fields=RACE_UPDATE_FIELDS,
+    )
+
+    # upsert 後の id を引き直す（SQLite の古い版では bulk_create が pk を返さないため）
+    keys = {(rec["date"], rec["place"], rno_to_int(rec["rno"])) for rec in records}
+    ids = {
+        (d, p, r): pk
+        for pk, d, p, r in HistoricalRace.objects.filter(
+            date__in={k[0] for k in keys}, place__in={k[1] for k in keys}
+        ).values_list("id", "date", "place", "rno")
+    }
+
+    entries, payouts, replaced = [], [], set()
+    for rec in records:
+        race_id = ids[(rec["date"], rec["place"], rno_to_int(rec["rno"]))]
+        finish = _finish_positions(rec.get("finish_order"))
+        before = {int(k): v for k, v in (rec.get("before_entries") or {}).items()}
+
+        for e in rec.get("entries") or []:
+            lane = int(e["lane"])
+            entries.append(HistoricalEntry(
+                race_id=race_id,
+                lane=lane,
+                racer_id=str(e.get("racer_id") or ""),
+                racer_name=e.get("racer_name") or "",
+                klass=e.get("klass") or "",
+                motor_no=str(e.get("motor_no") or ""),
+                boat_no=str(e.get("boat_no") or ""),
+                entry_json=json.dumps(e, ensure_ascii=False),
+                before_json=json.dumps(before[lane], ensure_ascii=False) if lane in before else "",
+                finish=finish.get(lane),
+            ))
+
+        if rec.get("payouts"):
+            replaced.add(race_id)  # 払戻はレース単位で差し替える（組番が変わることがある）
+        for p in rec.get("payouts") or []:
+            payouts.append(HistoricalPayout(
+                race_id=race_id,
+                bet_type=p["bet_type"],
+                combo=p["combo"],
+                amount=int(p["amount"]),
+                popularity=p.get("popularity"),
+            ))
+
+    HistoricalEntry.objects.bulk_create(
+        entries,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["race", "lane"],
+        update_fields=["racer_id", "racer_name", "klass", "motor_no", "boat_no",
+                       "entry_json", "before_json", "finish"],
+    )
+    HistoricalPayout.objects.filter(race_id__in=replaced).delete()
+    HistoricalPayout.objects.bulk_create(payouts, batch_size=BATCH_SIZE)
+    return len(records)
+
+
+# ==========================================================
+# 読み出し
+# ==========================================================
+def races_between(start: date, end: date, places: List[str] | None = None,
+                  finished_only: bool = False):
+    """期間（両端含む）のレース QuerySet（日付・会場・R 順）"""
+    qs = HistoricalRace.objects.filter(date__range=(start, end))
+    if places:
+        qs = qs.filter(place__in=places)
+    if finished_only:
+        qs = qs.exclude(finish_order="")
+    return qs.order_by("date", "place", "rno")
+
+
+def to_record(race: HistoricalRace) -> Dict[str, Any]:
+    """HistoricalRace（entries / payouts を prefetch 済み）→ record"""
+    entries = sorted(race.entries.all(), key=lambda e: e.lane)
+    return {
+        "date": race.date,
+        "place": race.place,
+        "rno": race.rno,
+        "time": race.deadline,
+        "title": race.title,
+        "type": race.race_type,
+        "distance": race.distance,
+        "url": race.racelist_url,
+        "weather": {
+            "weather": race.weather,
+            "temperature": race.temperature,
+            "water_temp": race.water_temp,
+            "wind_speed": race.wind_speed,
+            "wind_angle": race.wind_angle,
+            "wave_height": race.wave_height,
+            "relative_wind": race.relative_wind or None,
+        },
+        "entries": [json.loads(e.entry_json) for e in entries],
+        "before_entries": {e.lane: json.loads(e.before_json) for e in entries if e.before_json},
+        "finish_order": race.finish_order,
+        "payouts": [
+            {"bet_type": p.bet_type, "combo": p.combo, "amount": p.amount, "popularity": p.popularity}
+            for p in race.payouts.all()
+        ],
+    }
+
+
+def iter_records(start: date, end: date, places: List[str] | None = None,
+                 finished_only: bool = False, chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """期間の record を chunk_size 件ずつ読みながら返す（シーズン分でもメモリに全部載せない）"""
+    qs = races_between(start, end, places, finished_only).prefetch_related("entries", "payouts")
+    for race in qs.iterator(chunk_size=chunk_size):
+        yield to_record(race)
+
+
+def load_records(start: date, end: date, places: List[str] | None = None,
+                 finished_only: bool = False) -> List[Dict[str, Any]]:
+    return list(iter_records(start, end, places, finished_only))
@@ -0,0 +1,157 @@
+from datetime import date, timedelta
+
+import copy
+
+from django.test import SimpleTestCase, TestCase
+
+from history import calibrate, equipment, racers
+from history.models import EquipmentStat, Racer
+from history.store import iter_records, save_records
+from today_race_detail.features.probability import scores_matrix
+from today_race_detail.features.vectorized import make_feature_tables, make_feature_tables_just
+
+DAYS = [date(2025, 1, 1) + timedelta(days=i) for i in range(3)]
+FINISH = ["1-2-3", "2-1-3", "3-2-1"]   # 日ごとの着順
+
+
+def make_record(day, finish_order):
+    """桐生 1R（1号艇 = 選手 4001・モーター 11・ボート 21）"""
+    return {
+        "date": day, "place": "桐生", "rno": 1, "time": "15:00",
+        "entries": [
+            {"lane": lane, "racer_id": str(4000 + lane), "racer_name": f"選手{lane}", "klass": "A1",
+             "national_win": 6.0 + DAYS.index(day) if lane == 1 else 5.0,
+             "local_win": 7.0 + DAYS.index(day) if lane == 1 else "-",
+             "motor_no": str(10 + lane), "boat_no": str(20 + lane)}
+            for lane in range(1, 7)
+        ],
+        "finish_order": finish_order,
+    }
+
+
+def archive(day, finished=True):
+    """archive_day と同じ順：保存 → 畳み込み"""
+    records = [make_record(day, FINISH[DAYS.index(day)] if finished else "")]
+    save_records(records)
+    racers.update_racers(records)
+    equipment.fold_records(records)
+    return records
+
+
+class EquipmentFoldTests(TestCase):
+    """どの順番で日を畳み込んでも、同じレースは1回だけ数える"""
+
+    def stat(self, kind="motor", number=11):
+        return EquipmentStat.objects.get(kind=kind, place="桐生", number=number)
+
+    def assertCounted(self, kind="motor", number=11):
+        row = self.stat(kind, number)
+        self.assertEqual((row.starts, row.wins, row.top2, row.top3), (3, 1, 2, 3))
+        self.assertEqual((row.since, row.last_date), (DAYS[0], DAYS[-1]))
+
+    def test_oldest_first(self):
+        for day in DAYS:
+            archive(day)
+        self.assertCounted()
+
+    def test_newest_first(self):
+        for day in reversed(DAYS):
+            archive(day)
+        self.assertCounted()
+        self.assertCounted("boat", 21)
+
+    def test_refold_is_idempotent(self):
+        for day in reversed(DAYS):
+            archive(day)
+        archive(DAYS[1])
+        equipment.fold_records(iter_records(DAYS[0], DAYS[-1], finished_only=True))
+        self.assertCounted()
+
+    def test_index_after_archive(self):
+        """アーカイブ済みの日に、索引作成で過去の日を足せる"""
+        archive(DAYS[-1])
+        save_records([make_record(d, FINISH[i]) for i, d in enumerate(DAYS[:-1])])
+        equipment.fold_records(iter_records(DAYS[0], DAYS[-1], finished_only=True))
+        self.assertCounted()
+
+    def test_results_posted_later(self):
+        archive(DAYS[0], finished=False)
+        self.assertFalse(EquipmentStat.objects.exists())
+        for day in DAYS:
+            archive(day)
+        self.assertCounted()
+
+    def test_reset_since(self):
+        for day in DAYS:
+            archive(day)
+        equipment.reset("桐生", "motor", DAYS[1])
+        equipment.fold_records(iter_records(DAYS[0], DAYS[-1], finished_only=True))
+        row = self.stat()
+        self.assertEqual((row.starts, row.since), (2, DAYS[1]))
+        self.assertEqual(self.stat("boat", 21).starts, 3)
+
+
+class RacerFoldTests(TestCase):
+    """どの順番で日を畳み込んでも、直近成績は新しい順・期別成績は最新の出走表の値になる"""
+
+    def setUp(self):
+        racers.clear()
+
+    def assertRacer(self):
+        r = Racer.objects.get(racer_id="4001")
+        self.assertEqual((r.recent_form, r.starts), ("321", 3))
+        self.assertEqual((r.national_win, r.stats_date), (8.0, DAYS[-1]))
+        self.assertEqual(racers.get_racer("4001")["local"]["桐生"]["local_win"], 9.0)
+
+    def test_oldest_first(self):
+        for day in DAYS:
+            archive(day)
+        self.assertRacer()
+
+    def test_newest_first(self):
+        for day in reversed(DAYS):
+            archive(day)
+        self.assertRacer()
+
+    def test_refold_and_rebuild(self):
+        for day in reversed(DAYS):
+            archive(day)
+        archive(DAYS[0])
+        self.assertRacer()
+        racers.clear()
+        racers.rebuild_racers(DAYS[0], DAYS[-1])
+        self.assertRacer()
+
+    def test_results_posted_later(self):
+        archive(DAYS[-1], finished=False)
+        self.assertEqual(Racer.objects.get(racer_id="4001").starts, 0)
+        for day in DAYS:
+            archive(day)
+        self.assertRacer()
+
+    def test_enrich_local(self):
+        archive(DAYS[0])
+        entries = [{"racer_id": "4001", "local_win": "-"}]
+        racers.enrich_entries(entries, "桐生")
+        self.assertEqual(entries[0]["local_win"], 7.0)
+        self.assertNotIn("date", entries[0])
+
+
+class CalibrateTests(SimpleTestCase):
+    """較正の目的関数は本番・backtest と同じスコアで着順を評価する"""
+
+    def setUp(self):
+        self.records = [make_record(day, finish) for day, finish in zip(DAYS, FINISH)]
+        self.data = calibrate.prepare(self.records)
+
+    def test_a_is_scored_like_the_served_path(self):
+        # 本番の A：make_feature_table → make_feature_table_just（丸めの分だけずれる）
+        contexts = [calibrate._context(r) for r in self.records]
+        a_scored = make_feature_tables([copy.deepcopy(r["entries"]) for r in self.records], contexts)
+        served = calibrate._nll(scores_matrix(make_feature_tables_just(a_scored, contexts)), self.data["finish"])
+        self.assertAlmostEqual(calibrate.evaluate(self.data, calibrate.current_params(), ("A",)), served, delta=0.01)
+
+    def test_params_are_kept_per_calculator(self):
+        a, b = calibrate.current_params("A"), calibrate.current_params("B")
+        self.assertNotIn("W_EX", a)
+        self.assertIn("W_EX", b)
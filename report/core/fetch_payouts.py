@@ -1,26 +1,22 @@
 # report/core/fetch_payouts.py
 import re
-import requests
-from bs4 import BeautifulSoup
+from scraping import http_client
+from scraping.parsers import make_soup
 
 PAY_URL = "https://www.boatrace.jp/owpc/pc/race/pay"
 
 
 def fetch_html(url: str) -> str:
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123 Safari/537.36"
-        )
-    }
-    r = requests.get(url, headers=headers, timeout=20)
-    r.raise_for_status()
-    r.encoding = "utf-8"
-    return r.text
-
-
-def parse_all_venues_as_dict(html: str) -> dict:
-    soup = BeautifulSoup(html, "html.parser")
+    return http_client.fetch_text(url, timeout=20)
+
+
+def parse_all_venues_as_dict(html: str, backend: str | None = None, skip_venues=None) -> dict:
+    """
+    pay ページ → { 会場: [(race, combo, pay_text, odds_suffix, pop_suffix, href), ...] }
+    skip_venues の会場（全レース確定済みなど）は列ごと読まずに結果からも外す
+    """
+    skip_venues = set(skip_venues or ())
+    soup = make_soup(html, backend)
     result = {}
     tables = soup.select("div.table1 > table.is-strited1.is-wAuto")
     if not tables:
@@ -35,7 +31,8 @@ def parse_all_venues_as_dict(html: str) -> dict:
             venues.append(img["alt"].strip() if img else "不明")
 
         for v in venues:
-            result.setdefault(v, [])
+            if v not in skip_venues:
+                result.setdefault(v, [])
 
         tbodies = tbl.select("tbody")
         for r_index, tbody in enumerate(tbodies, start=1):
@@ -48,6 +45,8 @@ def parse_all_venues_as_dict(html: str) -> dict:
 
             tds = tr.select("td")
             for i, venue in enumerate(venues):
+                if venue in skip_venues:
+                    continue
                 base = i * 3
                 if base + 2 >= len(tds):
                     continue
@@ -96,42 +95,34 @@ def parse_all_venues_as_dict(html: str) -> dict:
 
 
 def fetch_payouts():
-    """boatrace.jpから払戻データを取得して venues 辞書を返す"""
-    html = fetch_html(PAY_URL)
-    venue_dict = parse_all_venues_as_dict(html)
-    return venue_dict
+    """今日の払戻を venues 辞書で返す（確定済みのレースは PayoutResult から。未確定がある時だけ pay ページを取る）"""
+    from .payout_store import refresh_payouts
+
+    return refresh_payouts()
 
 
 def fetch_payouts_with_time():
     """払戻データに開始時間をマージして返す"""
-    from today_races.models import DailyRaceCache
-    import json
+    from datetime import date
+    from today_races.schedule import rno_to_int, time_map
 
     # 1️⃣ 払戻データ取得
     payouts = fetch_payouts()
 
-    # 2️⃣ 今日のレースデータ（時間付き）を取得
-    cache = DailyRaceCache.objects.first()
-    if not cache:
-        print("⚠️ DailyRaceCache が存在しません。時間は付与されません。")
-        return payouts
-
-    daily_data = json.loads(cache.json_text)
-
-    # 3️⃣ 「場名＋レース番号」→ 時間 のマップを作成
-    time_map = {}
-    for venue in daily_data:
-        name = venue["place"]
-        for race in venue["races"]:
-            key = f"{name}{race['rno']}"   # 例: "戸田3R"
-            time_map[key] = race["time"]
+    # 2️⃣ 今日の (会場, R) → 時間（RaceSchedule を日付の索引で引く）
+    times = time_map(date.today())
+    if not times:
+        print("⚠️ 今日のレース予定がありません。時間は付与されません。")
 
-    # 4️⃣ 払戻データに時間を追加して再構築
+    # 3️⃣ 払戻データに時間を追加して再構築
     merged = {}
     for venue, rows in payouts.items():
         new_rows = []
         for race, combo, pay_text, odds_suffix, pop_suffix, href in rows:
-            time = time_map.get(f"{venue}{race}", "")
+            try:
+                time = times.get((venue, rno_to_int(race)), "")
+            except ValueError:
+                time = ""
             new_rows.append((race, combo, pay_text, odds_suffix, pop_suffix, time, href))
         merged[venue] = new_rows
 
@@ -0,0 +1,126 @@
+# report/core/payout_store.py
+"""
+払戻一覧の保存（PayoutResult）。
+
+- 払戻が出たレースは確定として保存し、以後は取り直さない
+- 全レース確定した会場は pay ページの列ごとパースを飛ばす（parse_all_venues_as_dict の skip_venues）
+- 全会場確定済み、または前回の取得から FETCH_INTERVAL 以内なら pay ページを取りに行かず DB だけで返す
+"""
+from __future__ import annotations
+from datetime import date
+from typing import Dict, List, Set, Tuple
+import re
+import threading
+import time
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from report.models import PayoutResult
+from today_races.models import RaceSchedule
+from today_races.schedule import rno_to_int
+
+RACES_PER_VENUE = 12   # 予定表が無い会場の全レース数
+FETCH_INTERVAL = 30    # 秒。レポート画面を続けて開いても pay ページはこの間隔でしか取らない
+
+_lock = threading.Lock()
+_last_fetch: Dict[date, float] = {}   # 取得に成功した時刻（失敗したらすぐ取り直せるように）
+_fetching: Set[date] = set()
+
+
+def _venue_order(href: str) -> int:
+    """結果ページ URL の jcd（pay ページの会場の並びと同じ）"""
+    m = re.search(r"jcd=(\d+)", href or "")
+    return int(m.group(1)) if m else 99
+
+
+def expected_races(day: date) -> Dict[str, int]:
+    """{ 会場: その日のレース数 }（RaceSchedule から）"""
+    return dict(
+        RaceSchedule.objects.filter(date=day).values("place")
+        .annotate(n=Count("id")).values_list("place", "n")
+    )
+
+
+def complete_venues(day: date) -> Set[str]:
+    """全レースの払戻が確定している会場"""
+    expected = expected_races(day)
+    done = (
+        PayoutResult.objects.filter(date=day).values("place")
+        .annotate(n=Count("id", filter=Q(finalized=True))).values_list("place", "n")
+    )
+    return {place for place, n in done if n >= expected.get(place, RACES_PER_VENUE)}
+
+
+def save_parsed(day: date, venues: Dict[str, List[Tuple]]) -> int:
+    """parse_all_venues_as_dict の結果のうち、まだ確定していないレースだけ保存する。返り値: 保存件数"""
+    finalized = set(
+        PayoutResult.objects.filter(date=day, finalized=True).values_list("place", "rno")
+    )
+    now = timezone.now()
+    rows = []
+    for place, races in venues.items():
+        for race, combo, pay_text, odds_suffix, pop_suffix, href in races:
+            try:
+                rno = rno_to_int(race)
+            except ValueError:
+                continue
+            if (place, rno) in finalized:
+                continue
+            rows.append(PayoutResult(
+                date=day, place=place, rno=rno, venue_order=_venue_order(href), race=race,
+                combo=combo, pay_text=pay_text, odds_suffix=odds_suffix, pop_suffix=pop_suffix,
+                href=href, finalized=bool(combo and pay_text), fetched_at=now,
+            ))
+    PayoutResult.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["date", "place", "rno"],
+        update_fields=["venue_order", "race", "combo", "pay_text", "odds_suffix", "pop_suffix",
+                       "href", "finalized", "fetched_at"],
+    )
+    return len(rows)
+
+
+def stored_payouts(day: date) -> Dict[str, List[Tuple]]:
+    """
+    { 会場: [(race, combo, pay_text, odds_suffix, pop_suffix, href), ...] }（fetch_payouts と同じ形）
+    まだ1レースも確定していない開催場も、pay ページと同じく空リストで入れる
+    """
+    order = {
+        place: _venue_order(url)
+        for place, url in RaceSchedule.objects.filter(date=day).values_list("place", "racelist_url")
+    }
+    rows: Dict[str, List[Tuple]] = {place: [] for place in order}
+    for row in PayoutResult.objects.filter(date=day).order_by("rno"):
+        rows.setdefault(row.place, []).append(row.as_row())
+        order.setdefault(row.place, row.venue_order)
+    return {place: rows[place] for place in sorted(rows, key=lambda p: (order[p], p))}
+
+
+def refresh_payouts(day: date | None = None, force: bool = False) -> Dict[str, List[Tuple]]:
+    """未確定のレースがあれば pay ページを取り直して保存し、保存済みの払戻を返す"""
+    from .fetch_payouts import PAY_URL, fetch_html, parse_all_venues_as_dict
+
+    day = day or date.today()
+    complete = complete_venues(day)
+    expected = expected_races(day)
+    all_done = bool(expected) and set(expected) <= complete
+
+    with _lock:
+        recent = time.monotonic() - _last_fetch.get(day, float("-inf")) < FETCH_INTERVAL
+        fetch = day not in _fetching and (force or not (all_done or recent))
+        if fetch:
+            _fetching.add(day)
+
+    if fetch:
+        try:
+            url = PAY_URL if day == date.today() else f"{PAY_URL}?hd={day:%Y%m%d}"
+            saved = save_parsed(day, parse_all_venues_as_dict(fetch_html(url), skip_venues=complete))
+            with _lock:
+                _last_fetch[day] = time.monotonic()
+            print(f"💴 払戻を取得: 確定済み {len(complete)} 会場はスキップ / {saved} レース更新")
+        finally:
+            with _lock:
+                _fetching.discard(day)
+    return stored_payouts(day)
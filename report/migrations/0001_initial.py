@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('place', models.CharField(max_length=20)),
+                ('rno', models.PositiveSmallIntegerField()),
+                ('venue_order', models.PositiveSmallIntegerField(default=0)),
+                ('race', models.CharField(max_length=10)),
+                ('combo', models.CharField(max_length=20)),
+                ('pay_text', models.CharField(max_length=50)),
+                ('odds_suffix', models.CharField(blank=True, max_length=30)),
+                ('pop_suffix', models.CharField(blank=True, max_length=30)),
+                ('href', models.URLField(blank=True, max_length=300)),
+                ('finalized', models.BooleanField(default=False)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'venue_order', 'rno'], name='idx_payout_date_order')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'place', 'rno'), name='uniq_payout_date_place_rno')],
+            },
+        ),
+    ]
@@ -1,3 +1,35 @@
 from django.db import models
 
-# Create your models here.
+
+class PayoutResult(models.Model):
+    """
+    払戻一覧（pay ページ）の1レース分。
+    払戻が出たレースは確定（finalized）として以後取り直さない。
+    列は parse_all_venues_as_dict の行（race, combo, pay_text, odds_suffix, pop_suffix, href）と同じ。
+    """
+    date = models.DateField()
+    place = models.CharField(max_length=20)
+    rno = models.PositiveSmallIntegerField()
+    venue_order = models.PositiveSmallIntegerField(default=0)   # 会場の並び（結果ページ URL の jcd）
+    race = models.CharField(max_length=10)                      # "3R"
+    combo = models.CharField(max_length=20)
+    pay_text = models.CharField(max_length=50)
+    odds_suffix = models.CharField(max_length=30, blank=True)
+    pop_suffix = models.CharField(max_length=30, blank=True)
+    href = models.URLField(max_length=300, blank=True)
+    finalized = models.BooleanField(default=False)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "place", "rno"], name="uniq_payout_date_place_rno"),
+        ]
+        indexes = [
+            models.Index(fields=["date", "venue_order", "rno"], name="idx_payout_date_order"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.place} {self.race} {self.combo} {self.pay_text}"
+
+    def as_row(self) -> tuple:
+        return (self.race, self.combo, self.pay_text, self.odds_suffix, self.pop_suffix, self.href)
@@ -1,3 +1,62 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from scraping import corpus
+from scraping.corpus import CorpusTestMixin
+
+
+class PayoutExtractorTests(CorpusTestMixin, SimpleTestCase):
+    """pay ページの保存ページに対して parse_all_venues_as_dict を期待値と突き合わせる"""
+
+    page_types = ("pay",)
+
+
+class PayoutStoreTests(TestCase):
+    """PayoutResult への保存と、pay ページを取り直す条件"""
+
+    def setUp(self):
+        from report.core import payout_store
+        from today_races.schedule import sync_schedule
+
+        self.store = payout_store
+        self.day = date.today()
+        sync_schedule(self.day, [
+            {"place": place, "races": [
+                {"rno": f"{r}R", "time": "10:00", "url": f"https://www.boatrace.jp/owpc/pc/race/racelist?rno={r}&jcd={jcd}"}
+                for r in (1, 2)
+            ]}
+            for place, jcd in (("戸田", "02"), ("桐生", "01"), ("江戸川", "03"))
+        ])
+        self.html = (corpus.FIXTURE_DIR / "pay" / "pay.html").read_text(encoding="utf-8")
+        payout_store._last_fetch.clear()
+
+    def test_skip_venues(self):
+        from report.core.fetch_payouts import parse_all_venues_as_dict
+
+        result = parse_all_venues_as_dict(self.html, skip_venues={"桐生"})
+        self.assertEqual(list(result), ["戸田", "江戸川"])
+        self.assertEqual(len(result["戸田"]), 2)
+
+    def test_keeps_venues_without_results(self):
+        with mock.patch("report.core.fetch_payouts.fetch_html", return_value=self.html):
+            venues = self.store.refresh_payouts(self.day)
+        self.assertEqual(list(venues), ["桐生", "戸田", "江戸川"])
+        self.assertEqual(venues["江戸川"], [])
+        self.assertEqual(self.store.complete_venues(self.day), {"桐生", "戸田"})
+
+    def test_skips_complete_venues_and_recent_fetch(self):
+        with mock.patch("report.core.fetch_payouts.fetch_html", return_value=self.html) as fetch:
+            self.store.refresh_payouts(self.day)
+            self.store.refresh_payouts(self.day)   # FETCH_INTERVAL 以内
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_retries_after_failed_fetch(self):
+        with mock.patch("report.core.fetch_payouts.fetch_html", side_effect=OSError("timeout")):
+            with self.assertRaises(OSError):
+                self.store.refresh_payouts(self.day)
+        with mock.patch("report.core.fetch_payouts.fetch_html", return_value=self.html) as fetch:
+            venues = self.store.refresh_payouts(self.day)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(len(venues["桐生"]), 2)
@@ -0,0 +1,135 @@
+# scraping/corpus.py
+"""
+オフライン検証用の保存ページ（fixtures/pages/<種別>/<名前>.html）と、
+種別ごとに通す extractor の一覧。
+<名前>.expected.json があれば、extractor の出力と突き合わせる。
+
+同梱のページは実ページの DOM を写した小さな合成ページで、期待値はページに書いた値から手で起こしたもの。
+各アプリの tests.py（CorpusTestMixin）と bench_extractors がこのコーパスを使う。
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Tuple
+import contextlib
+import io
+import json
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "pages"
+
+PAGE_TYPES = ("racelist", "beforeinfo", "raceindex", "pay", "tenki", "odds3t", "odds2tf", "oddstf")
+
+
+def extractors_for(page_type: str) -> Dict[str, Callable[..., Any]]:
+    """
+    種別 → { extractor名: fn(html, backend) }
+    （Django アプリ側の import は呼ばれたときだけ行う）
+    """
+    if page_type == "racelist":
+        from today_race_detail.extractors.document import HtmlDocument
+        from today_race_detail.extractors.race_meta import extract_race_meta_from_html
+        from today_race_detail.extractors.entry_table import extract_entries_from_racelist_html
+        from today_race_detail.extractors.entry_table_just import extract_entries_from_racelist_just_html
+        return {
+            "race_meta": lambda html, b=None: extract_race_meta_from_html(HtmlDocument(html, parser=b)),
+            "entries": lambda html, b=None: extract_entries_from_racelist_html(HtmlDocument(html, parser=b)),
+            "entries_just": lambda html, b=None: extract_entries_from_racelist_just_html(HtmlDocument(html, parser=b)),
+        }
+    if page_type == "beforeinfo":
+        from today_race_detail.extractors.entry_table_just import (
+            extract_before_entries_from_html,
+            extract_weather_meta_from_html,
+        )
+        return {
+            "before_entries": extract_before_entries_from_html,
+            "weather_meta": extract_weather_meta_from_html,
+        }
+    if page_type == "raceindex":
+        from today_races.views import parse_races_from_raceindex
+        return {"races": parse_races_from_raceindex}
+    if page_type == "pay":
+        from report.core.fetch_payouts import parse_all_venues_as_dict
+        return {"payouts": parse_all_venues_as_dict}
+    if page_type == "tenki":
+        from today_races.views import parse_weather_html
+        return {"weather": lambda html, b=None: parse_weather_html(html, "", b)}
+    if page_type in ("odds3t", "odds2tf", "oddstf"):
+        from today_race_detail.extractors.odds import ODDS_EXTRACTORS
+        return {"odds": ODDS_EXTRACTORS[page_type]}
+    raise ValueError(f"unknown page type: {page_type}")
+
+
+def normalize(value: Any) -> Any:
+    """tuple / int キーなどを JSON と同じ形に揃える（期待値比較用）"""
+    return json.loads(json.dumps(value, ensure_ascii=False))
+
+
+def iter_fixtures(page_types: Tuple[str, ...] = PAGE_TYPES) -> Iterator[Tuple[str, Path]]:
+    for page_type in page_types:
+        for path in sorted((FIXTURE_DIR / page_type).glob("*.html")):
+            yield page_type, path
+
+
+def iter_cases(page_types: Tuple[str, ...] = PAGE_TYPES) -> Iterator[Tuple[str, Callable[..., Any], str, Any]]:
+    """期待値のある (ラベル, extractor, HTML, 期待値) を順に返す（テスト用）"""
+    for page_type, path in iter_fixtures(page_types):
+        html = path.read_text(encoding="utf-8")
+        expected = load_expected(path) or {}
+        for name, fn in extractors_for(page_type).items():
+            if name in expected:
+                yield f"{page_type}/{path.stem}.{name}", fn, html, expected[name]
+
+
+def run_extractor(fn: Callable[..., Any], html: str, backend: str | None = None) -> Any:
+    """extractor を実行して normalize した結果（extractor の print は捨てる）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return normalize(fn(html, backend))
+
+
+class CorpusTestMixin:
+    """
+    各アプリの tests.py 用。SimpleTestCase に混ぜて page_types を並べると、
+    保存ページの extractor 出力を期待値と突き合わせ、html.parser と lxml で同じ結果になるかを試す。
+    """
+    page_types: Tuple[str, ...] = ()
+
+    def test_corpus(self):
+        for page_type in self.page_types:
+            cases = list(iter_cases((page_type,)))
+            self.assertTrue(cases, f"fixture がありません: {page_type}")
+            for label, fn, html, expected in cases:
+                with self.subTest(label):
+                    self.assertEqual(run_extractor(fn, html), expected)
+
+    def test_parser_backends_agree(self):
+        """html.parser と lxml で同じ保存ページから同じ dict が取れる"""
+        from .parsers import compare_backends
+
+        for label, fn, html, expected in iter_cases(self.page_types):
+            with self.subTest(label):
+                results = compare_backends(lambda h, b: run_extractor(fn, h, b), html)
+                self.assertEqual(set(results), {"html.parser", "lxml"})
+                self.assertEqual(results["html.parser"], expected)
+
+
+def expected_path(path: Path) -> Path:
+    return path.with_suffix(".expected.json")
+
+
+def load_expected(path: Path) -> Dict[str, Any] | None:
+    exp = expected_path(path)
+    if not exp.exists():
+        return None
+    with open(exp, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_page(page_type: str, name: str, html: str) -> Path:
+    """ページを保存し、現在の extractor 出力を期待値の下書きとして書き出す（ページと見比べてからコミットする）"""
+    path = FIXTURE_DIR / page_type / f"{name}.html"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(html, encoding="utf-8")
+
+    expected = {name_: normalize(fn(html)) for name_, fn in extractors_for(page_type).items()}
+    with open(expected_path(path), "w", encoding="utf-8") as f:
+        json.dump(expected, f, ensure_ascii=False, indent=2)
+    return path
@@ -0,0 +1,115 @@
+# scraping/http_client.py
+"""
+全スクレイパー共通の HTTP クライアント。
+- プロセス内で Session を1つだけ持ち、ホストごとに keep-alive 接続をプールする
+- ヘッダー / リトライ方針はここで一元管理する
+- fetch_text はディスクキャッシュ（response_cache）を通す
+"""
+from __future__ import annotations
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+from . import response_cache
+
+DEFAULT_TIMEOUT = 20
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123 Safari/537.36"
+    ),
+    "Referer": "https://www.boatrace.jp/",
+    "Accept-Language": "ja",
+}
+
+# ホストごとの接続プールサイズ（並列クロール数に合わせる）
+HOST_POOL_SIZES = {
+    "https://www.boatrace.jp/": 16,
+    "https://tenki.jp/": 8,
+}
+DEFAULT_POOL_SIZE = 4
+
+_session: requests.Session | None = None
+_lock = threading.Lock()
+
+
+def _make_retry() -> Retry:
+    return Retry(
+        connect=3,
+        read=3,
+        status=3,
+        backoff_factor=1.0,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+    )
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+
+    # 既定（その他のホスト）
+    default_adapter = HTTPAdapter(
+        max_retries=_make_retry(),
+        pool_connections=DEFAULT_POOL_SIZE,
+        pool_maxsize=DEFAULT_POOL_SIZE,
+    )
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+
+    # ホスト別（長いプレフィックスが優先される）
+    for prefix, size in HOST_POOL_SIZES.items():
+        session.mount(prefix, HTTPAdapter(
+            max_retries=_make_retry(),
+            pool_connections=1,
+            pool_maxsize=size,
+            pool_block=True,
+        ))
+    return session
+
+
+def get_session() -> requests.Session:
+    """プロセス共通の Session を返す（初回のみ生成）"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get(url: str, timeout: int = DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """共通 Session で GET する（ステータスチェックはしない）"""
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def fetch_text(url: str, timeout: int = DEFAULT_TIMEOUT, encoding: str = "utf-8",
+               use_cache: bool = True) -> str:
+    """
+    GET → ステータスチェック → テキストを返す。
+    use_cache=True のときはページ種別の TTL 内ならネットワークに出ず、
+    TTL 切れでも ETag / Last-Modified があれば条件付き GET で再検証する。
+    """
+    entry = response_cache.load(url) if use_cache else None
+    if entry and response_cache.is_fresh(entry, url):
+        return entry["body"]
+
+    res = get(url, timeout=timeout, headers=response_cache.conditional_headers(entry))
+
+    if res.status_code == 304 and entry:
+        response_cache.touch(url, entry)
+        return entry["body"]
+
+    res.raise_for_status()
+    res.encoding = encoding
+    text = res.text
+
+    if use_cache:
+        response_cache.store(
+            url, text,
+            etag=res.headers.get("ETag"),
+            last_modified=res.headers.get("Last-Modified"),
+        )
+    return text
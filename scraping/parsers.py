@@ -0,0 +1,56 @@
+# scraping/parsers.py
+"""
+extractor 用の HTML パーサーバックエンド切替。
+- 既定は C 実装の lxml（未インストールなら html.parser にフォールバック）
+- settings.SCRAPING_PARSER_BACKEND で全体を切り替えられる
+- compare_backends で「バックエンドを変えても結果が同じか」を確認できる
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable
+
+from bs4 import BeautifulSoup, FeatureNotFound
+
+BACKENDS = ("lxml", "html.parser", "html5lib")
+FALLBACK_BACKEND = "html.parser"
+
+
+@lru_cache(maxsize=None)
+def _available(name: str) -> bool:
+    try:
+        BeautifulSoup("", name)
+        return True
+    except FeatureNotFound:
+        return False
+
+
+def get_backend(name: str | None = None) -> str:
+    """使うバックエンド名を返す（指定 → settings → lxml の順）"""
+    if name is None:
+        try:
+            from django.conf import settings
+            name = getattr(settings, "SCRAPING_PARSER_BACKEND", None)
+        except Exception:
+            name = None
+    name = name or "lxml"
+    if name not in BACKENDS:
+        raise ValueError(f"unknown parser backend: {name}")
+    return name if _available(name) else FALLBACK_BACKEND
+
+
+def make_soup(html: str, backend: str | None = None) -> BeautifulSoup:
+    return BeautifulSoup(html, get_backend(backend))
+
+
+def compare_backends(extractor: Callable[[str, str], Any], html: str,
+                     backends: Iterable[str] = ("html.parser", "lxml")) -> Dict[str, Any]:
+    """
+    extractor(html, backend) を各バックエンドで実行し、結果を返す。
+    すべて一致しない場合は AssertionError。
+    """
+    results = {b: extractor(html, b) for b in backends if _available(b)}
+    values = list(results.values())
+    for backend, value in results.items():
+        if value != values[0]:
+            raise AssertionError(f"parser backend mismatch: {backend}")
+    return results
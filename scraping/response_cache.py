@@ -0,0 +1,176 @@
+# scraping/response_cache.py
+"""
+HTTP レスポンスのディスクキャッシュ（URL キー）。
+- ページ種別ごとに TTL を持つ（racelist / raceindex / beforeinfo / pay ...）
+- ETag / Last-Modified を保存して条件付き GET に使う
+- 合計サイズが上限を超えたら古いものから削除する
+  （ディレクトリの走査は重いので、書き込み量が上限の EVICT_EVERY を超えるごとに1回だけ）
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+# ===== ページ種別ごとの TTL（秒） =====
+PAGE_TTLS = {
+    "index": 10 * 60,        # 開催一覧
+    "raceindex": 6 * 60 * 60,  # 各場のレース一覧（1日ほぼ不変）
+    "racelist": 30 * 60,     # 出走表（日中ほぼ不変）
+    "beforeinfo": 0,         # 直前情報：PrefetchedPage が 60 秒持つので、ここで重ねて古くしない
+    "pay": 60,               # 払戻一覧（増えていくだけ）
+    "tenki": 0,              # tenki.jp 1時間予報：WeatherForecast が WEATHER_TTL 持つので、ここで重ねて古くしない
+}
+DEFAULT_TTL = 0  # 種別不明は保存しない
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+EVICT_EVERY = 0.1   # 上限のこの割合を書き込むたびに evict する
+
+_BOATRACE_PAGE_RE = re.compile(r"/owpc/pc/race/([a-z0-9]+)")
+
+_evict_lock = threading.Lock()
+_written = 0   # 前回の evict 以降に書き込んだバイト数（プロセス内）
+
+
+def page_type(url: str) -> str | None:
+    """URL からページ種別を判定する"""
+    if "tenki.jp" in url:
+        return "tenki"
+    m = _BOATRACE_PAGE_RE.search(url)
+    return m.group(1) if m else None
+
+
+def ttl_for(url: str) -> int:
+    return PAGE_TTLS.get(page_type(url), DEFAULT_TTL)
+
+
+def _settings_value(name: str, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def cache_dir() -> Path:
+    default = Path(__file__).resolve().parent.parent / "data" / "http_cache"
+    return Path(_settings_value("HTTP_CACHE_DIR", default))
+
+
+def max_bytes() -> int:
+    return int(_settings_value("HTTP_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+
+def _path_for(url: str) -> Path:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return cache_dir() / key[:2] / f"{key}.json"
+
+
+def load(url: str) -> Dict[str, Any] | None:
+    path = _path_for(url)
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("url") != url:
+        return None
+    return entry
+
+
+def is_fresh(entry: Dict[str, Any], url: str) -> bool:
+    ttl = ttl_for(url)
+    return ttl > 0 and (time.time() - entry.get("stored_at", 0)) < ttl
+
+
+def conditional_headers(entry: Dict[str, Any] | None) -> Dict[str, str]:
+    """保存済みの検証子から条件付き GET 用ヘッダーを作る"""
+    headers = {}
+    if not entry:
+        return headers
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def store(url: str, body: str, etag: str | None = None,
+          last_modified: str | None = None) -> None:
+    """レスポンスを保存（TTL 0 の種別は保存しない）"""
+    if ttl_for(url) <= 0:
+        return
+
+    path = _path_for(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "url": url,
+        "body": body,
+        "etag": etag,
+        "last_modified": last_modified,
+        "stored_at": time.time(),
+    }
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    size = tmp.stat().st_size
+    os.replace(tmp, path)
+
+    _maybe_evict(size)
+
+
+def _maybe_evict(size: int) -> None:
+    global _written
+    with _evict_lock:
+        _written += size
+        if _written < max_bytes() * EVICT_EVERY:
+            return
+        _written = 0
+    evict()
+
+
+def touch(url: str, entry: Dict[str, Any]) -> None:
+    """304 で再検証できたエントリの保存時刻を更新する"""
+    store(url, entry["body"], entry.get("etag"), entry.get("last_modified"))
+
+
+def evict(limit: int | None = None) -> int:
+    """合計サイズが上限を超えていたら、更新が古い順に削除する。削除数を返す"""
+    limit = max_bytes() if limit is None else limit
+    root = cache_dir()
+    if not root.exists():
+        return 0
+
+    with _evict_lock:
+        files = []
+        total = 0
+        for path in root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        if total <= limit:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= limit:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+def clear() -> None:
+    evict(limit=0)
@@ -0,0 +1,143 @@
+# today_race_detail/bulk.py
+"""
+会場単位 / 1日分のまとめ予想。
+必要な racelist / beforeinfo を先読み済みデータ → 不足分だけ並列取得 の順で揃え、
+各レースを A/B ロジックに通して結果をまとめて返す。
+直前スコアは全レース分を make_feature_tables_just_parallel でまとめて付ける
+（PARALLEL_MIN_RACES 以上ならプロセスプールで全コア、少なければプロセス起動の方が高いので順に）。
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+import copy
+import logging
+
+from today_races.crawler import crawl
+from .features.feature_calculator_b import make_feature_tables_just_parallel
+from .prefetch import (
+    beforeinfo_url_for,
+    load_beforeinfo,
+    load_racelist,
+    save_beforeinfo,
+    save_racelist,
+)
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_MIN_RACES = 48   # 1レース 1ms 弱なので、これ未満はプロセスを起こさず順に計算する
+
+
+def collect_races(sites: List[Dict[str, Any]], place: str | None = None) -> List[Dict[str, Any]]:
+    """sites から posted 形式（raceUrl / place / raceNo / time）のレース一覧を作る"""
+    races = []
+    for site in sites:
+        if place and site.get("place") != place:
+            continue
+        for race in site.get("races", []):
+            if not race.get("url") or not race.get("time"):
+                continue
+            races.append({
+                "raceUrl": race["url"],
+                "place": site.get("place"),
+                "title": site.get("title"),
+                "raceNo": race.get("rno"),
+                "time": race["time"],
+            })
+    return races
+
+
+def _is_b_mode(race_time_str: str, now: datetime, b_mode_minutes: int) -> bool:
+    race_dt = datetime.strptime(f"{now:%Y-%m-%d} {race_time_str}", "%Y-%m-%d %H:%M")
+    return race_dt - now <= timedelta(minutes=b_mode_minutes)
+
+
+def predict_races(races: List[Dict[str, Any]], now: datetime | None = None) -> Dict[str, Any]:
+    """
+    races（posted 形式）をまとめて予想する。
+    返り値: { "races": [予想結果...], "errors": [{raceUrl, error}...] }
+    """
+    from .views import (
+        B_MODE_MINUTES, _race_detail_data, _race_detail_just_data, finish_race_predict, predict_job,
+    )
+
+    now = now or datetime.now()
+
+    # ① 先読み済みデータを集める
+    racelists: Dict[str, Dict[str, Any]] = {}
+    beforeinfos: Dict[str, Dict[str, Any]] = {}
+    b_mode: Dict[str, bool] = {}
+    for posted in races:
+        url = posted["raceUrl"]
+        b_mode[url] = _is_b_mode(posted["time"], now, B_MODE_MINUTES)
+        warm = load_racelist(url)
+        if warm is not None:
+            racelists[url] = warm
+        if b_mode[url]:
+            warm_before = load_beforeinfo(url)
+            if warm_before is not None:
+                beforeinfos[url] = warm_before
+
+    # ② 足りないページだけ並列取得
+    url_map = {url: ("racelist", url) for url in b_mode if url not in racelists}
+    url_map.update({
+        beforeinfo_url_for(url): ("beforeinfo", url)
+        for url, is_b in b_mode.items() if is_b and url not in beforeinfos
+    })
+    pages, fetch_errors = crawl(url_map.keys())
+
+    for page_url, html in pages.items():
+        page_type, url = url_map[page_url]
+        try:
+            if page_type == "racelist":
+                racelists[url] = save_racelist(url, html)
+            else:
+                beforeinfos[url] = save_beforeinfo(url, html)
+        except Exception as e:
+            logger.warning(f"[bulk] {page_type} のパースに失敗 {url}: {e}")
+
+    # ③ 各レースの入力を揃える
+    prepared = []   # (raceUrl, モード, full_data, スコア計算の入力)
+    errors = []
+    for posted in races:
+        url = posted["raceUrl"]
+        racelist = racelists.get(url)
+        if racelist is None:
+            reason = fetch_errors.get(url, "racelist を取得できませんでした")
+            errors.append({"raceUrl": url, "error": reason})
+            continue
+
+        # 同じ racelist を複数レースで使い回さないようにコピー
+        posted = dict(posted)
+        racelist = copy.deepcopy(racelist)
+        try:
+            if b_mode[url]:
+                beforeinfo = beforeinfos.get(url, {"weather_meta": {}, "before_entries": {}})
+                data = _race_detail_just_data(posted, racelist, beforeinfo)
+            else:
+                data = _race_detail_data(posted, racelist)
+            prepared.append((url, "B" if b_mode[url] else "A", data, predict_job(data, racelist.get("content_hash"))))
+        except Exception as e:
+            errors.append({"raceUrl": url, "error": str(e)})
+
+    # ④ 直前スコアは全レースまとめて
+    jobs = [job for _, _, _, job in prepared]
+    try:
+        scored = make_feature_tables_just_parallel(jobs, use_processes=len(jobs) >= PARALLEL_MIN_RACES)
+    except Exception as e:
+        logger.warning(f"[bulk] まとめてのスコア計算に失敗したので1レースずつ計算します: {e}")
+        scored = [None] * len(jobs)
+
+    # ⑤ 買い目を付ける
+    results = []
+    for (url, mode, data, job), entries in zip(prepared, scored):
+        try:
+            if entries is None:
+                entries = make_feature_tables_just_parallel([job], max_workers=1)[0]
+            result = finish_race_predict(data, entries)
+        except Exception as e:
+            errors.append({"raceUrl": url, "error": str(e)})
+            continue
+        result["mode"] = mode
+        results.append(result)
+
+    return {"races": results, "errors": errors}
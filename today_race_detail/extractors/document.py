@@ -0,0 +1,34 @@
+# today_race_detail/extractors/document.py
+from __future__ import annotations
+from bs4 import BeautifulSoup
+
+from scraping.parsers import make_soup
+
+
+class HtmlDocument:
+    """
+    1ページ分の HTML を 1回だけパースして、複数の extractor で共有するための入れ物。
+    soup は最初に参照されたときにだけ構築する。
+    parser=None のときは scraping.parsers の既定バックエンド（lxml）を使う。
+    """
+
+    def __init__(self, html: str, url: str = "", parser: str | None = None):
+        self.html = html
+        self.url = url
+        self.parser = parser
+        self._soup: BeautifulSoup | None = None
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            self._soup = make_soup(self.html, self.parser)
+        return self._soup
+
+
+def as_soup(doc: "HtmlDocument | BeautifulSoup | str", parser: str | None = None) -> BeautifulSoup:
+    """extractor の入力（HTML文字列 / HtmlDocument / soup）を soup に揃える"""
+    if isinstance(doc, HtmlDocument):
+        return doc.soup
+    if isinstance(doc, BeautifulSoup):
+        return doc
+    return make_soup(doc, parser)
@@ -1,8 +1,9 @@
 #scraping/extractors/entry_table.py
 from __future__ import annotations
-from bs4 import BeautifulSoup
 import re
 
+from .document import HtmlDocument, as_soup
+
 # 全角→半角の置換テーブル（数字・ドット・マイナス・コロン・スペース・スラッシュ）
 ZEN2HAN = str.maketrans("０１２３４５６７８９．－：　／", "0123456789.-: /")
 
@@ -52,7 +53,7 @@ def _split_no_2r_3r(cell_text: str):
     r3 = float(nums[2]) if len(nums) > 2 else None
     return no, r2, r3
 
-def extract_entries_from_racelist_html(html: str) -> list[dict]:
+def extract_entries_from_racelist_html(html: "str | HtmlDocument") -> list[dict]:
     """
     出走表（左ブロック）を全艇分抽出して返す。
 
@@ -64,8 +65,10 @@ def extract_entries_from_racelist_html(html: str) -> list[dict]:
       local_win, local_2r, local_3r,
       motor_no, motor_2r, motor_3r,
       boat_no,  boat_2r,  boat_3r
+
+    html には HTML 文字列か、パース済みの HtmlDocument を渡せる
     """
-    soup = BeautifulSoup(html, "lxml")
+    soup = as_soup(html)
 
     # 出走表テーブル（左ブロック）は .table1.is-tableFixed__3rdadd 内の最初の table
     race_table = soup.select_one(".table1.is-tableFixed__3rdadd table")
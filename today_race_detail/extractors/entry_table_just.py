@@ -1,9 +1,10 @@
 #today_race_detail/extractors/entry_table_just.py
 from __future__ import annotations
-from bs4 import BeautifulSoup
 import re
 import os
 
+from .document import HtmlDocument, as_soup
+
 
 # 全角→半角の置換テーブル（数字・ドット・マイナス・コロン・スペース・スラッシュ）
 ZEN2HAN = str.maketrans("０１２３４５６７８９．－：　／", "0123456789.-: /")
@@ -54,7 +55,7 @@ def _split_no_2r_3r(cell_text: str):
     r3 = float(nums[2]) if len(nums) > 2 else None
     return no, r2, r3
 
-def extract_entries_from_racelist_just_html(html: str) -> list[dict]:
+def extract_entries_from_racelist_just_html(html: "str | HtmlDocument") -> list[dict]:
     print(f"👉直前情報得開始")
     """
     出走表（左ブロック）を全艇分抽出して返す。
@@ -67,8 +68,10 @@ def extract_entries_from_racelist_just_html(html: str) -> list[dict]:
       local_win, local_2r, local_3r,
       motor_no, motor_2r, motor_3r,
       boat_no,  boat_2r,  boat_3r
+
+    html には HTML 文字列か、パース済みの HtmlDocument を渡せる
     """
-    soup = BeautifulSoup(html, "lxml")
+    soup = as_soup(html)
 
     # 出走表テーブル（左ブロック）は .table1.is-tableFixed__3rdadd 内の最初の table
     race_table = soup.select_one(".table1.is-tableFixed__3rdadd table")
@@ -174,11 +177,11 @@ def extract_entries_from_racelist_just_html(html: str) -> list[dict]:
     return entries
 
 
-def extract_before_entries_from_html(html: str):
+def extract_before_entries_from_html(html: "str | HtmlDocument", backend: str | None = None):
     print("👉スタート展示取得開始（左側＋右側まとめて抽出）")
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = as_soup(html, backend)
 
         # -------------------------
         # ① 左側テーブル抽出
@@ -291,10 +294,10 @@ def extract_before_entries_from_html(html: str):
 
 
 
-def extract_weather_meta_from_html(html: str):
+def extract_weather_meta_from_html(html: "str | HtmlDocument", backend: str | None = None):
     print(f"👉水面気象報得開始")
 
-    soup = BeautifulSoup(html, "html.parser")
+    soup = as_soup(html, backend)
 
     def _get_text(selector):
         el = soup.select_one(selector)
@@ -0,0 +1,109 @@
+# today_race_detail/extractors/odds.py
+"""
+オッズページ（odds3t / odds2tf / oddstf）の extractor。
+
+オッズは td.oddsPoint に入っていて、ページ内の並び順で組み合わせが決まる。
+そのため HTML 文字列を渡されたときは SoupStrainer で td.oddsPoint だけを
+lxml で組み立てる（ページ全体の soup は作らない）。
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from scraping.parsers import get_backend
+from .document import HtmlDocument
+
+BOATS = range(1, 7)
+
+ODDS_POINT = SoupStrainer("td", class_="oddsPoint")
+
+
+def _others(*used: int) -> List[int]:
+    return [b for b in BOATS if b not in used]
+
+
+# ===== 並び順（ページの td.oddsPoint の出現順 → 組み合わせ） =====
+# 3連単：20行 × 1着6列。列 f の中で 2着（4行ずつ）→ 3着 の昇順
+TRIFECTA_ORDER = [
+    f"{f}-{_others(f)[r // 4]}-{_others(f, _others(f)[r // 4])[r % 4]}"
+    for r in range(20) for f in BOATS
+]
+# 2連単：5行 × 1着6列。列 f の r 行目は f 以外の r 番目
+EXACTA_ORDER = [f"{f}-{_others(f)[r]}" for r in range(5) for f in BOATS]
+# 2連複：三角表。r 行目は (f, f+r+1)
+QUINELLA_ORDER = [f"{f}={f + r + 1}" for r in range(5) for f in BOATS if f + r + 1 <= 6]
+WIN_ORDER = [str(b) for b in BOATS]
+
+
+def _odds_cells(html: "HtmlDocument | BeautifulSoup | str", backend: str | None = None) -> List[str]:
+    if isinstance(html, HtmlDocument):
+        soup = html.soup
+    elif isinstance(html, BeautifulSoup):
+        soup = html
+    else:
+        soup = BeautifulSoup(html, get_backend(backend), parse_only=ODDS_POINT)
+    return [td.get_text(strip=True) for td in soup.find_all("td", class_="oddsPoint")]
+
+
+def _to_odds(text: str) -> float | None:
+    """"12.3" → 12.3 / 欠場・発売前（"-", "欠場" など）→ None"""
+    try:
+        return float(text.replace(",", ""))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _to_range(text: str) -> List[float] | None:
+    """複勝 "1.0-1.4" → [1.0, 1.4]"""
+    parts = [_to_odds(p) for p in (text or "").split("-")]
+    if len(parts) != 2 or None in parts:
+        return None
+    return parts
+
+
+def _zip(order: List[str], cells: List[str], conv=_to_odds) -> Dict[str, Any]:
+    return {key: conv(text) for key, text in zip(order, cells)}
+
+
+# ==========================================================
+# extractor 本体
+# ==========================================================
+def extract_trifecta_odds_from_html(html, backend: str | None = None) -> Dict[str, Dict[str, Any]]:
+    """odds3t → {"trifecta": {"1-2-3": 12.3, ...}}（120点揃わなければ空）"""
+    cells = _odds_cells(html, backend)
+    if len(cells) != len(TRIFECTA_ORDER):
+        return {}
+    return {"trifecta": _zip(TRIFECTA_ORDER, cells)}
+
+
+def extract_exacta_quinella_odds_from_html(html, backend: str | None = None) -> Dict[str, Dict[str, Any]]:
+    """odds2tf → {"exacta": {"1-2": ...}, "quinella": {"1=2": ...}}"""
+    cells = _odds_cells(html, backend)
+    if len(cells) != len(EXACTA_ORDER) + len(QUINELLA_ORDER):
+        return {}
+    n = len(EXACTA_ORDER)
+    return {
+        "exacta": _zip(EXACTA_ORDER, cells[:n]),
+        "quinella": _zip(QUINELLA_ORDER, cells[n:]),
+    }
+
+
+def extract_win_place_odds_from_html(html, backend: str | None = None) -> Dict[str, Dict[str, Any]]:
+    """oddstf → {"win": {"1": 1.5, ...}, "place": {"1": [1.0, 1.2], ...}}"""
+    cells = _odds_cells(html, backend)
+    if len(cells) != len(WIN_ORDER) * 2:
+        return {}
+    n = len(WIN_ORDER)
+    return {
+        "win": _zip(WIN_ORDER, cells[:n]),
+        "place": _zip(WIN_ORDER, cells[n:], _to_range),
+    }
+
+
+# ページ名 → extractor
+ODDS_EXTRACTORS = {
+    "odds3t": extract_trifecta_odds_from_html,
+    "odds2tf": extract_exacta_quinella_odds_from_html,
+    "oddstf": extract_win_place_odds_from_html,
+}
@@ -1,12 +1,13 @@
-from bs4 import BeautifulSoup
 import re
 
+from .document import HtmlDocument, as_soup
+
 ZEN_TO_HAN = str.maketrans("０１２３４５６７８９：　／", "0123456789: /")
 
 def _safe_text(el) -> str:
     return (el.get_text(" ", strip=True) if el else "").translate(ZEN_TO_HAN)
 
-def extract_race_meta_from_html(html: str, race_url: str = "") -> dict:
+def extract_race_meta_from_html(html: "str | HtmlDocument", race_url: str = "") -> dict:
     """
     レース詳細スクレイピング（必要最小限）
     取得：
@@ -14,9 +15,10 @@ def extract_race_meta_from_html(html: str, race_url: str = "") -> dict:
     - day_text: 例 "３日目"
     - type: 例 "予選"
     - distance: 例 "1800m"
+    html には HTML 文字列か、パース済みの HtmlDocument を渡せる
     """
 
-    soup = BeautifulSoup(html, "lxml")
+    soup = as_soup(html)
 
     # ▼ 開催日 & ○日目
     active_tab = soup.select_one(".tab2.is-type1__3rdadd .tab2_tabs li.is-active2 .tab2_inner")
@@ -0,0 +1,63 @@
+# today_race_detail/features/base_cache.py
+"""
+B スコアの基礎部分（展示・天候に依存しない部分）のメモリ内 LRU。
+
+キーは racelist の content_hash ＋ 基礎部分の入力（BASE_FIELDS）の指紋。
+racelist が変わらない限り、beforeinfo が届く / 更新されるたびに再計算するのは
+展示スコア・天候補正・コンテキスト補正だけになる。
+選手マスタ・モーター成績で埋めた値が変わったとき（索引の更新）や、
+A モードで書き換わった entries が来たときは指紋が変わるので作り直す。
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Dict, List
+import hashlib
+import threading
+
+from .feature_calculator_b import BASE_FIELDS, compute_base_components
+
+MAX_RACES = 512  # 1日最大 24場 × 12R = 288 レースが収まる大きさ
+
+_lock = threading.Lock()
+_cache: "OrderedDict[str, Dict[Any, Dict[str, float]]]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _key(content_hash: str, entries: List[Dict[str, Any]]) -> str:
+    inputs = repr([tuple(e.get(f) for f in BASE_FIELDS) for e in entries])
+    return f"{content_hash}:{hashlib.sha1(inputs.encode('utf-8')).hexdigest()[:16]}"
+
+
+def get_base_components(content_hash: str | None,
+                        entries: List[Dict[str, Any]]) -> Dict[Any, Dict[str, float]]:
+    """(content_hash, 入力) に対応する基礎部分を返す（無ければ entries から計算して保存）"""
+    if not content_hash:
+        return compute_base_components(entries)
+
+    key = _key(content_hash, entries)
+    with _lock:
+        components = _cache.get(key)
+        # 枠が揃っていなければ（想定外の entries）使わずに計算し直す
+        if components is not None and all(e.get("lane") in components for e in entries):
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return components
+        _stats["misses"] += 1
+
+    components = compute_base_components(entries)
+    with _lock:
+        _cache[key] = components
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_RACES:
+            _cache.popitem(last=False)
+    return components
+
+
+def cache_info() -> Dict[str, int]:
+    return {"size": len(_cache), "max": MAX_RACES, **_stats}
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+        _stats.update(hits=0, misses=0)
@@ -3,6 +3,8 @@ from __future__ import annotations
 from typing import Dict, Any, List, Tuple
 import re
 
+from .params import apply_params, load_params
+
 Number = float
 
 # ===== 欠損時の安全デフォルト =====
@@ -67,6 +69,19 @@ TYPE_BIAS = {
     "優勝戦":    {"A1": 1.0,  "A2": 0.5,  "B1": 0.2,  "B2": 0.0},
 }
 
+# ===== 重み設定（直前版と同じ思想のベース部分） =====
+W = {
+    "lane": 0.22,
+    "st": 0.20,
+    "win": 0.20,
+    "two_natloc": 0.15,
+    "two_mecha": 0.12,
+    "three_mix": 0.11,
+}
+
+# ===== パラメータファイル（params/vNNN.json があれば上の手調整値を上書き） =====
+PARAMS_VERSION = apply_params({"W": W, "PLACE_BIAS": PLACE_BIAS, "TYPE_BIAS": TYPE_BIAS}, load_params(), "A")
+
 # ===== 共通関数 =====
 def _to_float(v: Any, default: Number, key: str = "") -> Number:
     try:
@@ -199,16 +214,6 @@ def make_feature_table(entries: List[Dict[str, Any]],
     mot3_lo, mot3_hi = _safe_minmax(mot3)
     bot3_lo, bot3_hi = _safe_minmax(bot3)
 
-    # ===== 重み設定（直前版と同じ思想のベース部分） =====
-    W = {
-        "lane": 0.22,
-        "st": 0.20,
-        "win": 0.20,
-        "two_natloc": 0.15,
-        "two_mecha": 0.12,
-        "three_mix": 0.11,
-    }
-
     # ===== 各艇スコア算出 =====
     for e in entries:
         f_lane = _norm_inverse(_to_float(e.get("lane"), SAFE_DEFAULTS["lane"]), ln_lo, ln_hi)
@@ -1,8 +1,13 @@
 # today_race_detail/features/feature_calculator_b.py
 from __future__ import annotations
 from typing import Dict, Any, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
 import re
 
+from .params import apply_params, load_params
+
 Number = float
 
 # ===== 欠損時の安全デフォルト =====
@@ -65,6 +70,29 @@ TYPE_BIAS = {
     "優勝戦":    {"A1": 1.0,  "A2": 0.5,  "B1": 0.2,  "B2": 0.0},
 }
 
+# ===== 重み設定 =====
+W = {
+    "lane": 0.22,
+    "st": 0.20,
+    "win": 0.20,
+    "two_natloc": 0.15,
+    "two_mecha": 0.12,
+    "three_mix": 0.11,
+}
+W_EX = {
+    "exhibit_time": 0.08,
+    "tilt": 0.03,
+    "course": 0.04,
+    "st_display": 0.06,
+    "adjust_weight": 0.02,
+    "weather_factor": 0.05,
+}
+
+# ===== パラメータファイル（params/vNNN.json があれば上の手調整値を上書き） =====
+PARAMS_VERSION = apply_params(
+    {"W": W, "W_EX": W_EX, "PLACE_BIAS": PLACE_BIAS, "TYPE_BIAS": TYPE_BIAS}, load_params(), "B"
+)
+
 # ===== 共通関数 =====
 def _to_float(v: Any, default: Number, key: str = "") -> Number:
     try:
@@ -194,7 +222,12 @@ def _dynamic_place_bias(
 
 def _make_context_bias(place: str | None, distance_text: str | None,
                        race_type: str | None, lane: int | None = None,
-                       klass: str | None = None) -> float:
+                       klass: str | None = None,
+                       context: Dict[str, Any] | None = None) -> float:
+    """
+    context: そのレースの条件（風速・風向・波高・気温）。
+    グローバルは使わないので、複数レースを同時に計算しても混ざらない。
+    """
     bias = 0.0
 
     # --- race_typeの正規化（公式の文字化け・抜け対策） ---
@@ -213,10 +246,11 @@ def _make_context_bias(place: str | None, distance_text: str | None,
         race_type = "一般"
 
     # ===== 動的場補正を取得 =====
-    wind_speed = float((globals().get("CURRENT_CONTEXT", {}) or {}).get("wind_speed", 0.0))
-    wind_angle = float((globals().get("CURRENT_CONTEXT", {}) or {}).get("wind_angle", 0.0))
-    wave_height = float((globals().get("CURRENT_CONTEXT", {}) or {}).get("wave_height", 0.0))
-    temperature = float((globals().get("CURRENT_CONTEXT", {}) or {}).get("temperature", 15.0))
+    ctx = context or {}
+    wind_speed = float(ctx.get("wind_speed", 0.0))
+    wind_angle = float(ctx.get("wind_angle", 0.0))
+    wave_height = float(ctx.get("wave_height", 0.0))
+    temperature = float(ctx.get("temperature", 15.0))
 
     dynamic_bias = _dynamic_place_bias(place, wind_speed, wind_angle, wave_height, temperature)
     if lane in dynamic_bias:
@@ -237,20 +271,21 @@ def _make_context_bias(place: str | None, distance_text: str | None,
 
     return bias
 
-# ===== メイン処理 =====
-def make_feature_table_just(entries: List[Dict[str, Any]], context: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
-    print("💥make_feature_table_just 開始")
+# ===== 基礎部分（展示・天候に依存しない。A と同じ base） =====
 
-    if not entries:
-        return []
-
-    # コンテキストをグローバル参照用に退避（動的バイアスで使用）
-    globals()["CURRENT_CONTEXT"] = context or {}
-
-    place = (context or {}).get("place")
-    distance_text = (context or {}).get("distance")
-    race_type = (context or {}).get("type")
+# compute_base_components が読む entries のキー（base_cache のキーに入れる）
+BASE_FIELDS = (
+    "lane", "avg_st", "national_win", "local_win",
+    "national_2r", "local_2r", "motor_2r", "boat_2r",
+    "national_3r", "local_3r", "motor_3r", "boat_3r",
+)
 
+def compute_base_components(entries: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Number]]:
+    """
+    racelist の entries だけで決まる基礎部分を枠ごとに返す。
+    返り値: { lane: {"lane": ..., "st": ..., ..., "three_mix": ..., "base": ...} }（丸め前）
+    同じ racelist なら beforeinfo が何度変わっても再利用できる。
+    """
     # ===== 基本特性の抽出 =====
     lanes   = [_to_float(e.get("lane"), SAFE_DEFAULTS["lane"]) for e in entries]
     st_vals = [_to_float(e.get("avg_st"), SAFE_DEFAULTS["avg_st"]) for e in entries]
@@ -266,32 +301,6 @@ def make_feature_table_just(entries: List[Dict[str, Any]], context: Dict[str, An
     nat3, loc3 = [safe_val(e, "national_3r") for e in entries], [safe_val(e, "local_3r") for e in entries]
     mot3, bot3 = [safe_val(e, "motor_3r") for e in entries], [safe_val(e, "boat_3r") for e in entries]
 
-    # ===== 直前展示データ =====
-    exhibit_vals = [
-        _to_float(e.get("exhibit_info", {}).get("exhibit_time"), 7.00)
-        for e in entries
-    ]
-
-    tilt_vals = [
-        _to_float(e.get("exhibit_info", {}).get("tilt"), 0.0)
-        for e in entries
-    ]
-
-    st_disp_vals = [
-        _to_float(e.get("exhibit_info", {}).get("st"), 0.2)
-        for e in entries
-    ]
-
-    course_vals = [
-        _to_float(e.get("exhibit_info", {}).get("course"), e.get("lane"))
-        for e in entries
-    ]
-
-    adj_w_vals = [
-        _to_float(e.get("exhibit_info", {}).get("adjust_weight"), 0.0)
-        for e in entries
-    ]
-
     # ===== 正規化範囲 =====
     ln_lo, ln_hi = _safe_minmax(lanes)
     st_lo, st_hi = _safe_minmax(st_vals)
@@ -305,31 +314,7 @@ def make_feature_table_just(entries: List[Dict[str, Any]], context: Dict[str, An
     mot3_lo, mot3_hi = _safe_minmax(mot3)
     bot3_lo, bot3_hi = _safe_minmax(bot3)
 
-    ex_lo, ex_hi = _safe_minmax(exhibit_vals)
-    st_d_lo, st_d_hi = _safe_minmax(st_disp_vals)
-    course_lo, course_hi = _safe_minmax(course_vals)
-    tilt_lo, tilt_hi = _safe_minmax(tilt_vals)
-    adj_lo, adj_hi = _safe_minmax(adj_w_vals)
-
-    # ===== 重み設定 =====
-    W = {
-        "lane": 0.22,
-        "st": 0.20,
-        "win": 0.20,
-        "two_natloc": 0.15,
-        "two_mecha": 0.12,
-        "three_mix": 0.11,
-    }
-    W_EX = {
-        "exhibit_time": 0.08,
-        "tilt": 0.03,
-        "course": 0.04,
-        "st_display": 0.06,
-        "adjust_weight": 0.02,
-        "weather_factor": 0.05,
-    }
-
-    # ===== 各艇スコア算出 =====
+    components = {}
     for e in entries:
         f_lane = _norm_inverse(_to_float(e.get("lane"), SAFE_DEFAULTS["lane"]), ln_lo, ln_hi)
         f_st   = _norm_inverse(_to_float(e.get("avg_st"), SAFE_DEFAULTS["avg_st"]), st_lo, st_hi)
@@ -364,6 +349,78 @@ def make_feature_table_just(entries: List[Dict[str, Any]], context: Dict[str, An
             W["three_mix"] * f_three
         ) * 100.0
 
+        components[e.get("lane")] = {
+            "lane": W["lane"] * f_lane * 100,
+            "st": W["st"] * f_st * 100,
+            "win": W["win"] * f_win * 100,
+            "two_natloc": W["two_natloc"] * f_natloc2 * 100,
+            "two_mecha": W["two_mecha"] * f_mecha2 * 100,
+            "three_mix": W["three_mix"] * f_three * 100,
+            "base": base,
+        }
+
+    return components
+
+# ===== メイン処理 =====
+def make_feature_table_just(entries: List[Dict[str, Any]], context: Dict[str, Any] | None = None,
+                            base_components: Dict[Any, Dict[str, Number]] | None = None) -> List[Dict[str, Any]]:
+    """
+    直前スコア。base_components（compute_base_components の結果）を渡すと基礎部分は再計算せず、
+    展示スコア・天候補正・コンテキスト補正だけを計算する。
+    """
+    print("💥make_feature_table_just 開始")
+
+    if not entries:
+        return []
+
+    # コンテキストは引数で最後まで持ち回す（スレッド間で共有しない）
+    context = context or {}
+
+    place = context.get("place")
+    distance_text = context.get("distance")
+    race_type = context.get("type")
+
+    if base_components is None:
+        base_components = compute_base_components(entries)
+
+    # ===== 直前展示データ =====
+    exhibit_vals = [
+        _to_float(e.get("exhibit_info", {}).get("exhibit_time"), 7.00)
+        for e in entries
+    ]
+
+    tilt_vals = [
+        _to_float(e.get("exhibit_info", {}).get("tilt"), 0.0)
+        for e in entries
+    ]
+
+    st_disp_vals = [
+        _to_float(e.get("exhibit_info", {}).get("st"), 0.2)
+        for e in entries
+    ]
+
+    course_vals = [
+        _to_float(e.get("exhibit_info", {}).get("course"), e.get("lane"))
+        for e in entries
+    ]
+
+    adj_w_vals = [
+        _to_float(e.get("exhibit_info", {}).get("adjust_weight"), 0.0)
+        for e in entries
+    ]
+
+    # ===== 正規化範囲 =====
+    ex_lo, ex_hi = _safe_minmax(exhibit_vals)
+    st_d_lo, st_d_hi = _safe_minmax(st_disp_vals)
+    course_lo, course_hi = _safe_minmax(course_vals)
+    tilt_lo, tilt_hi = _safe_minmax(tilt_vals)
+    adj_lo, adj_hi = _safe_minmax(adj_w_vals)
+
+    # ===== 各艇スコア算出 =====
+    for e in entries:
+        comp = base_components[e.get("lane")]
+        base = comp["base"]
+
         # ===== 展示スコア =====
         ex = e.get("exhibit_info", {})
 
@@ -384,10 +441,10 @@ def make_feature_table_just(entries: List[Dict[str, Any]], context: Dict[str, An
         base_total = base + exhibit_score
 
         # ===== 天候補正（8方位＋連続角度対応） =====
-        wind = _to_float((context or {}).get("wind_speed"), 0.0)
-        wave = _to_float((context or {}).get("wave_height"), 0.0)
-        rel_wind = (context or {}).get("relative_wind")
-        rel_angle = _to_float((context or {}).get("relative_angle"), 0.0)
+        wind = _to_float(context.get("wind_speed"), 0.0)
+        wave = _to_float(context.get("wave_height"), 0.0)
+        rel_wind = context.get("relative_wind")
+        rel_angle = _to_float(context.get("relative_angle"), 0.0)
 
         mult_weather = 1.0
 
@@ -431,18 +488,18 @@ def make_feature_table_just(entries: List[Dict[str, Any]], context: Dict[str, An
 
         # ===== コンテキスト補正 =====
         mult_context = 1.0 + _make_context_bias(place, distance_text, race_type,
-                                                e.get("lane"), e.get("klass"))
+                                                e.get("lane"), e.get("klass"), context)
 
         final = round(base_total * mult_context * mult_weather, 1)
 
         # ===== 出力 =====
         e["score_breakdown"] = {
-            "lane": round(W["lane"] * f_lane * 100, 1),
-            "st": round(W["st"] * f_st * 100, 1),
-            "win": round(W["win"] * f_win * 100, 1),
-            "two_natloc": round(W["two_natloc"] * f_natloc2 * 100, 1),
-            "two_mecha": round(W["two_mecha"] * f_mecha2 * 100, 1),
-            "three_mix": round(W["three_mix"] * f_three * 100, 1),
+            "lane": round(comp["lane"], 1),
+            "st": round(comp["st"], 1),
+            "win": round(comp["win"], 1),
+            "two_natloc": round(comp["two_natloc"], 1),
+            "two_mecha": round(comp["two_mecha"], 1),
+            "three_mix": round(comp["three_mix"], 1),
             "exhibit": round(exhibit_score, 1),
             "context_mult": round(mult_context, 4),
             "weather_mult": round(mult_weather, 4),
@@ -452,11 +509,42 @@ def make_feature_table_just(entries: List[Dict[str, Any]], context: Dict[str, An
 
 
         # 風速が弱い時の静水補正（例：内枠信頼度をわずかに上げる）
-        ctx = globals().get("CURRENT_CONTEXT", {}) or {}
-        wind_speed = float(ctx.get("wind_speed", 0.0))
+        wind_speed = float(context.get("wind_speed", 0.0))
         if wind_speed < 3:
             lane = int(e.get("lane", 3))
             e["score"] *= 1.0 + (0.03 * (4 - lane) / 3)
 
     entries.sort(key=lambda x: _to_float(x.get("lane"), SAFE_DEFAULTS["lane"]))
-    return entries
\ No newline at end of file
+    return entries
+
+# ===== まとめ計算（複数レースを並列に） =====
+Job = Tuple[Any, ...]  # (entries, context) または (entries, context, base_components)
+
+
+def _score_job(job: Job) -> List[Dict[str, Any]]:
+    return make_feature_table_just(*job)
+
+
+def make_feature_tables_just_parallel(jobs: List[Job],
+                                      max_workers: int | None = None,
+                                      use_processes: bool = True,
+                                      chunksize: int = 8) -> List[List[Dict[str, Any]]]:
+    """
+    jobs = [(entries, context[, base_components]), ...] を並列にスコア付けし、同じ順番で返す。
+    - use_processes=True : プロセスプールで全コアを使う（entries はコピーされるので返り値を使うこと）
+      Web サーバーのスレッドから呼ばれても安全なように、ワーカーは forkserver で作る
+    - use_processes=False: スレッドプール（entries はその場で書き換わる）
+    """
+    if not jobs:
+        return []
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(jobs) == 1:
+        return [_score_job(job) for job in jobs]
+
+    if use_processes:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("forkserver")) as pool:
+            return list(pool.map(_score_job, jobs, chunksize=chunksize))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_score_job, jobs))
@@ -0,0 +1,111 @@
+# today_race_detail/features/params.py
+"""
+A/B 計算機の重み・バイアス（W / W_EX / PLACE_BIAS / TYPE_BIAS）のパラメータファイル。
+
+params/v001.json, v002.json ... のように版番号付きで保存し、
+feature_calculator_a / _b は import 時に最新版（環境変数 BOATRACE_PARAMS_VERSION で固定可）を読んで
+コード内の手調整値を上書きする。
+ファイルは計算機ごとの節 {"A": {...}, "B": {...}} を持ち、A は "A" だけ、B は "B" だけを読む
+（節の無い古い形式のファイルは両方に同じ値を当てる）。ファイルが無い・読めない・壊れている場合は手調整値のまま動く
+（import 時に読むので、ここで例外を出すと計算機ごと import できなくなる）。
+"""
+from __future__ import annotations
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+PARAMS_DIR = Path(os.environ.get("BOATRACE_PARAMS_DIR") or Path(__file__).resolve().parent / "params")
+VERSION_ENV = "BOATRACE_PARAMS_VERSION"
+PARAM_KEYS = ("W", "W_EX", "PLACE_BIAS", "TYPE_BIAS")
+CALCULATORS = ("A", "B")
+
+_FILE_RE = re.compile(r"^v(\d+)\.json$")
+
+
+def _path(version: int) -> Path:
+    return PARAMS_DIR / f"v{version:03d}.json"
+
+
+def list_versions() -> List[int]:
+    if not PARAMS_DIR.is_dir():
+        return []
+    return sorted(int(m.group(1)) for p in PARAMS_DIR.iterdir() if (m := _FILE_RE.match(p.name)))
+
+
+def _sectioned(params: Dict[str, Any]) -> bool:
+    return any(c in params for c in CALCULATORS)
+
+
+def _from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON では枠番のキーが文字列になるので int に戻す"""
+    for section in [data[c] for c in CALCULATORS if c in data] if _sectioned(data) else [data]:
+        if "PLACE_BIAS" in section:
+            section["PLACE_BIAS"] = {
+                place: {int(lane): float(v) for lane, v in lanes.items()}
+                for place, lanes in section["PLACE_BIAS"].items()
+            }
+    return data
+
+
+def load_params(version: int | None = None) -> Dict[str, Any] | None:
+    """
+    version 指定 → その版、未指定 → 環境変数 BOATRACE_PARAMS_VERSION、それも無ければ最新版。
+    版が1つも無い（または "0" 指定）なら None（手調整値を使う）。
+    版の指定が不正・ファイルが読めない・JSON が壊れている場合も警告を出して None。
+    """
+    try:
+        if version is None:
+            env = os.environ.get(VERSION_ENV)
+            if env:
+                version = int(env)
+            else:
+                versions = list_versions()
+                version = versions[-1] if versions else 0
+        if not version:
+            return None
+        with open(_path(version), encoding="utf-8") as f:
+            return _from_json(json.load(f))
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"[params] パラメータ v{version} を読めないので手調整値を使います: {e}")
+        return None
+
+
+def save_params(params: Dict[str, Dict[str, Any]], meta: Dict[str, Any] | None = None) -> int:
+    """params = {"A": {...}, "B": {...}} を次の版番号で保存する。返り値: 版番号"""
+    versions = list_versions()
+    version = (versions[-1] if versions else 0) + 1
+    data = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        **(meta or {}),
+        **{c: {k: params[c][k] for k in PARAM_KEYS if k in params[c]} for c in CALCULATORS if c in params},
+    }
+    PARAMS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(_path(version), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return version
+
+
+def apply_params(tables: Dict[str, Dict], params: Dict[str, Any] | None, calculator: str) -> int:
+    """
+    tables = {"W": W, "PLACE_BIAS": PLACE_BIAS, ...}（計算機のモジュール変数）を
+    ファイルの calculator（"A" / "B"）の節の値で上書きする。
+    dict 自体は同じオブジェクトのままなので、import 済みの参照もそのまま新しい値になる。
+    ファイルに無いキー（節ごと無い場合も）は手調整値のまま。
+    返り値: 適用した版（0 = 手調整値のまま）
+    """
+    if not params:
+        return 0
+    section = (params.get(calculator) or {}) if _sectioned(params) else params
+    if not section:
+        return 0
+    for key, table in tables.items():
+        if key in section:
+            table.update(section[key])
+    return int(params.get("version", 0))
@@ -0,0 +1,151 @@
+# today_race_detail/features/probability.py
+"""
+着順確率モデル（Plackett-Luce / Harville）。
+
+各艇のスコアを勝ちやすさ（強さ）に変換し、
+  P(i→j→k) = p_i × p_j / (1 - p_i) × p_k / (1 - p_i - p_j)
+で 3連単 120通り・3連複 20通り・2連単 30通り・2連複 15通り・単勝 6通りの確率を出す。
+
+組み合わせの添字表は import 時に1回だけ作り、
+(レース数 × 6艇) の配列に対して添字参照と掛け算だけで全レース分をまとめて計算する。
+2着・3着の条件付き確率 p_j / (1 - p_i) は、残りの艇だけの softmax として対数のまま計算する
+（1艇の1着確率が 1 に丸まるほどスコア差が大きくても 1 - p_i が 0 にならない）。
+スコアの合計と違い確率なのでオッズと比べられる（期待値 = 確率 × オッズ）。
+"""
+from __future__ import annotations
+from itertools import combinations, permutations
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+MAX_BOATS = 6
+
+# スコア → 強さ の温度。スコア差 TEMPERATURE で強さが e 倍になる
+TEMPERATURE = 10.0
+
+# ===== 前計算の添字表（艇インデックス = 枠番 - 1） =====
+TRIFECTA_IDX = np.array(list(permutations(range(MAX_BOATS), 3)))    # (120, 3)
+EXACTA_IDX = np.array(list(permutations(range(MAX_BOATS), 2)))      # (30, 2)
+TRIO_IDX = np.array(list(combinations(range(MAX_BOATS), 3)))        # (20, 3)
+QUINELLA_IDX = np.array(list(combinations(range(MAX_BOATS), 2)))    # (15, 2)
+
+# 3連複 / 2連複 は、対応する 3連単 / 2連単（並べ替え全部）の和
+_TRIFECTA_POS = {tuple(t): i for i, t in enumerate(TRIFECTA_IDX.tolist())}
+_EXACTA_POS = {tuple(t): i for i, t in enumerate(EXACTA_IDX.tolist())}
+TRIO_FROM_TRIFECTA = np.array([
+    [_TRIFECTA_POS[p] for p in permutations(c)] for c in TRIO_IDX.tolist()
+])                                                                  # (20, 6)
+QUINELLA_FROM_EXACTA = np.array([
+    [_EXACTA_POS[p] for p in permutations(c)] for c in QUINELLA_IDX.tolist()
+])                                                                  # (15, 2)
+
+LABELS = {
+    "win": [str(i + 1) for i in range(MAX_BOATS)],
+    "exacta": ["-".join(str(i + 1) for i in t) for t in EXACTA_IDX.tolist()],
+    "quinella": ["=".join(str(i + 1) for i in t) for t in QUINELLA_IDX.tolist()],
+    "trifecta": ["-".join(str(i + 1) for i in t) for t in TRIFECTA_IDX.tolist()],
+    "trio": ["=".join(str(i + 1) for i in t) for t in TRIO_IDX.tolist()],
+}
+
+
+# 2着・3着の候補から外す艇（1着 / 1-2着）
+WIN_EXCLUDE = np.arange(MAX_BOATS)[:, None]                         # (6, 1)
+EXACTA_PAIR = np.array([_EXACTA_POS[tuple(t[:2])] for t in TRIFECTA_IDX.tolist()])   # 3連単 → 1-2着の 2連単の列
+
+
+# ==========================================================
+# スコア → 強さ
+# ==========================================================
+def scores_matrix(races: Iterable[List[Dict[str, Any]]]) -> np.ndarray:
+    """entries のリスト → (R, 6) のスコア配列（欠艇は NaN、列は枠番順）"""
+    rows = []
+    for entries in races:
+        row = [np.nan] * MAX_BOATS
+        for e in entries:
+            try:
+                lane = int(e.get("lane"))
+            except (TypeError, ValueError):
+                continue
+            if 1 <= lane <= MAX_BOATS and e.get("score") is not None:
+                row[lane - 1] = float(e["score"])
+        rows.append(row)
+    return np.array(rows, dtype=float).reshape(-1, MAX_BOATS)
+
+
+def _log_strength(scores: np.ndarray, temperature: float = TEMPERATURE) -> np.ndarray:
+    """(R, 6) のスコア → 対数の強さ（欠艇は -inf）"""
+    scores = np.asarray(scores, dtype=float)
+    return np.where(np.isnan(scores), -np.inf, scores / temperature)
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    """最後の軸の softmax（全部 -inf の行は 0）"""
+    z_max = np.max(z, axis=-1, keepdims=True)
+    z_max = np.where(np.isfinite(z_max), z_max, 0.0)
+    w = np.exp(z - z_max)
+    total = w.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, w / total, 0.0)
+
+
+def _conditional(z: np.ndarray, exclude: np.ndarray) -> np.ndarray:
+    """(R, 6) と外す艇の表 (M, t) → 残りの艇の中での着順確率 (R, M, 6)（外した艇・欠艇は 0）"""
+    mask = np.ones((len(exclude), MAX_BOATS), dtype=bool)
+    np.put_along_axis(mask, exclude, False, axis=1)
+    return _softmax(np.where(mask, z[:, None, :], -np.inf))
+
+
+def win_probabilities(scores: np.ndarray, temperature: float = TEMPERATURE) -> np.ndarray:
+    """(R, 6) のスコア → 1着確率（softmax、欠艇は 0）"""
+    return _softmax(_log_strength(scores, temperature))
+
+
+# ==========================================================
+# 着順確率（Harville）
+# ==========================================================
+def exacta_probabilities(z: np.ndarray) -> np.ndarray:
+    """z = 対数の強さ (R, 6) → 2連単 (R, 30)：P(i) × P(j | i が1着)"""
+    first = _softmax(z)
+    second = _conditional(z, WIN_EXCLUDE)                          # (R, 6, 6)
+    i, j = EXACTA_IDX[:, 0], EXACTA_IDX[:, 1]
+    return first[:, i] * second[:, i, j]
+
+
+def trifecta_probabilities(z: np.ndarray) -> np.ndarray:
+    """z = 対数の強さ (R, 6) → 3連単 (R, 120)：P(i→j) × P(k | i, j が1-2着)"""
+    exacta = exacta_probabilities(z)
+    third = _conditional(z, EXACTA_IDX)                            # (R, 30, 6)
+    return exacta[:, EXACTA_PAIR] * third[:, EXACTA_PAIR, TRIFECTA_IDX[:, 2]]
+
+
+def finish_probabilities(scores: np.ndarray, temperature: float = TEMPERATURE) -> Dict[str, np.ndarray]:
+    """
+    (R, 6) のスコア → 式別ごとの確率配列
+      win (R,6) / exacta (R,30) / quinella (R,15) / trifecta (R,120) / trio (R,20)
+    列の並びは LABELS[式別] と同じ。
+    """
+    z = _log_strength(scores, temperature)
+    p = _softmax(z)
+    exacta = exacta_probabilities(z)
+    trifecta = trifecta_probabilities(z)
+    return {
+        "win": p,
+        "exacta": exacta,
+        "quinella": exacta[:, QUINELLA_FROM_EXACTA].sum(axis=2),
+        "trifecta": trifecta,
+        "trio": trifecta[:, TRIO_FROM_TRIFECTA].sum(axis=2),
+    }
+
+
+def race_probabilities(entries: List[Dict[str, Any]], bet_type: str = "trifecta",
+                       temperature: float = TEMPERATURE) -> Dict[str, float]:
+    """1レース分：{ "1-2-3": 確率, ... }（確率の高い順）"""
+    probs = finish_probabilities(scores_matrix([entries]), temperature)[bet_type][0]
+    order = np.argsort(-probs, kind="stable")
+    return {LABELS[bet_type][i]: float(probs[i]) for i in order if probs[i] > 0}
+
+
+def expected_values(probs: np.ndarray, odds: np.ndarray) -> np.ndarray:
+    """確率 × オッズ（オッズ欠損 NaN / 0 は 0 扱い）"""
+    odds = np.nan_to_num(np.asarray(odds, dtype=float), nan=0.0)
+    return probs * odds
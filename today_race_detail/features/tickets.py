@@ -0,0 +1,280 @@
+# today_race_detail/features/tickets.py
+"""
+買い目エンジン。スコア付きの entries から式別 × 方式ごとの買い目を作る。
+
+- 式別: trifecta(3連単) / trio(3連複) / exacta(2連単) / quinella(2連複) / win(単勝) / place(複勝)
+- 方式: normal(通常) / 1axle(1艇軸流し) / 2axle(2艇軸流し) / 3box〜5box(ボックス) / formation
+- 英語コードと画面の日本語ラベル（"3連単", "1軸流し" など）のどちらでも受け付ける
+
+組み合わせは「スコア順位」に対する順列 / 組合せ表を前計算しておき、
+各買い目はスコア合計で heapq.nlargest により上位 k 点だけ取り出す（全件ソートしない）。
+nlargest は sorted(..., reverse=True)[:k] と同じ順序（同点は元の並び順）になる。
+"""
+from __future__ import annotations
+from itertools import combinations, permutations
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+import heapq
+
+MAX_BOATS = 6
+
+# ===== 式別 =====
+# code: (艇数, 着順あり)
+BET_TYPES: Dict[str, Tuple[int, bool]] = {
+    "trifecta": (3, True),
+    "trio": (3, False),
+    "exacta": (2, True),
+    "quinella": (2, False),
+    "win": (1, True),
+    "place": (1, False),
+}
+BET_TYPE_LABELS = {
+    "3連単": "trifecta", "3連複": "trio",
+    "2連単": "exacta", "2連複": "quinella",
+    "単勝": "win", "複勝": "place",
+}
+
+# ===== 方式 =====
+METHODS = ("normal", "1axle", "2axle", "3box", "4box", "5box", "formation")
+METHOD_LABELS = {
+    "通常": "normal",
+    "1軸流し": "1axle", "1艇軸流し": "1axle",
+    "2軸流し": "2axle", "2艇軸流し": "2axle",
+    "3艇ボックス": "3box", "4艇ボックス": "4box", "5艇ボックス": "5box",
+    "フォーメーション": "formation",
+}
+
+DEFAULT_POINTS = 10
+
+# ===== 前計算：順位（0=1番手）に対する順列 / 組合せ表 =====
+# TABLES[(艇数 n, 選ぶ数 k, 着順あり)] = ((0, 1, 2), (0, 1, 3), ...)
+TABLES: Dict[Tuple[int, int, bool], Tuple[Tuple[int, ...], ...]] = {
+    (n, k, ordered): tuple((permutations if ordered else combinations)(range(n), k))
+    for n in range(1, MAX_BOATS + 1)
+    for k in range(1, 4)
+    for ordered in (True, False)
+}
+
+
+def normalize_bet_type(bet_type: str | None) -> str:
+    code = BET_TYPE_LABELS.get(bet_type or "", bet_type or "trifecta")
+    if code not in BET_TYPES:
+        raise ValueError(f"未対応の式別です: {bet_type}")
+    return code
+
+
+def normalize_method(method: str | None) -> str:
+    code = METHOD_LABELS.get(method or "", method or "normal")
+    if code not in METHODS:
+        raise ValueError(f"未対応の方式です: {method}")
+    return code
+
+
+def format_ticket(lanes: Sequence[Any], ordered: bool) -> str:
+    """着順ありは "1-2-3"、なしは枠番昇順で "1=2=3" """
+    if ordered:
+        return "-".join(str(x) for x in lanes)
+    return "=".join(str(x) for x in sorted(lanes))
+
+
+# ==========================================================
+# 候補の生成（すべて順位インデックスのタプルで返す）
+# ==========================================================
+def _normal(n: int, size: int, ordered: bool) -> Iterable[Tuple[int, ...]]:
+    return TABLES[(n, size, ordered)]
+
+
+def _box(n: int, size: int, ordered: bool, box: int) -> Iterable[Tuple[int, ...]]:
+    return TABLES[(min(box, n), size, ordered)]
+
+
+def _axle(n: int, size: int, ordered: bool, axes: List[int], rivals: List[int]):
+    """
+    軸 + 相手の流し（点数は予想画面の計算と同じ）
+      1軸: 3連単 n(n-1) / 3連複 nC2 / 2連単・2連複 n
+      2軸: 3連単 2n（軸2艇が1-2着の表裏）/ 3連複 n / 2連単 2 / 2連複 1
+    """
+    if len(axes) >= size:
+        # 軸だけで埋まる（2軸の2連単 / 2連複、1軸の単勝 / 複勝）
+        pool = axes[:size]
+        yield from (permutations(pool) if ordered else [tuple(pool)])
+        return
+
+    rest = size - len(axes)
+    for picked in permutations(rivals, rest) if ordered else combinations(rivals, rest):
+        if ordered:
+            for head in permutations(axes):
+                yield tuple(head) + picked
+        else:
+            yield tuple(axes) + picked
+
+
+def _axle_count(method: str, size: int, ordered: bool, rivals: int) -> int:
+    """相手数 rivals の流しの点数（_axle と同じ数え方）"""
+    n_axes = int(method[0])
+    if n_axes >= size:
+        return len(list(permutations(range(size)))) if ordered else 1
+    rest = size - n_axes
+    picks = len(TABLES[(rivals, rest, ordered)]) if rivals >= rest else 0
+    return picks * (len(list(permutations(range(n_axes)))) if ordered else 1)
+
+
+def rivals_for_points(method: str, bet_type: str, points: int | None) -> int | None:
+    """相手数の指定が無いとき、点数 points を満たす最小の相手数（画面の点数計算の逆）"""
+    method, bet_type = normalize_method(method), normalize_bet_type(bet_type)
+    if method not in ("1axle", "2axle") or not points:
+        return None
+    size, ordered = BET_TYPES[bet_type]
+    for rivals in range(1, MAX_BOATS - int(method[0]) + 1):
+        if _axle_count(method, size, ordered, rivals) >= points:
+            return rivals
+    return None
+
+
+def _lanes(values: Any) -> List[Any]:
+    """枠番の指定（1 / "1" / "1,2" / ["1", 2]）→ int のリスト"""
+    if values is None:
+        return []
+    if isinstance(values, str):
+        values = values.replace("、", ",").split(",")
+    elif not isinstance(values, (list, tuple)):
+        values = [values]
+    lanes = []
+    for v in values:
+        try:
+            lanes.append(int(str(v).strip()))
+        except ValueError:
+            continue
+    return lanes
+
+
+def _formation(size: int, ordered: bool, rows: List[List[int]]):
+    """rows[i] = i 着に置く順位インデックスの一覧（重複艇・着順なしの重複は除く）"""
+    seen = set()
+    for combo in _product(rows[:size]):
+        if len(set(combo)) != size:
+            continue
+        key = combo if ordered else tuple(sorted(combo))
+        if key in seen:
+            continue
+        seen.add(key)
+        yield key
+
+
+def _product(rows: List[List[int]]):
+    if not rows:
+        yield ()
+        return
+    for head in rows[0]:
+        for tail in _product(rows[1:]):
+            yield (head,) + tail
+
+
+# ==========================================================
+# 買い目作成
+# ==========================================================
+def make_tickets(entries: List[Dict[str, Any]],
+                 bet_type: str | None = "trifecta",
+                 method: str | None = "normal",
+                 points: int | None = None,
+                 rivals: int | None = None,
+                 axis: Sequence[Any] | None = None,
+                 formation: Sequence[Sequence[Any]] | None = None,
+                 with_scores: bool = False) -> List[Any]:
+    """
+    entries（score 付き）から買い目を作る。
+    - points   : 上位何点まで（通常は既定 10 点、ボックス・流しは省略時は全点）
+    - rivals   : 流しの相手数（省略時は points から決める。points も無ければ軸以外すべて）
+    - axis     : 軸にする枠番（1 / "1" / [1, 2] / "1,2"。省略時はスコア上位から）
+    - formation: [[1着の枠番...], [2着...], [3着...]]（省略時は上位1 / 上位3 / 上位5）
+    - with_scores=True なら [{"ticket", "lanes", "score"}] で返す
+    """
+    bet_type = normalize_bet_type(bet_type)
+    method = normalize_method(method)
+    size, ordered = BET_TYPES[bet_type]
+
+    if not entries or len(entries) < size:
+        return []
+
+    # スコア順（同点は元の並び順）→ 上位6艇
+    ranked = sorted(entries, key=lambda e: e.get("score", 0), reverse=True)[:MAX_BOATS]
+    lanes = [e["lane"] for e in ranked]
+    scores = [e.get("score", 0) for e in ranked]
+    n = len(ranked)
+    rank_of = {x: i for i, lane in enumerate(lanes) for x in _lanes(lane)}   # 枠番（int）→ 順位
+
+    if method == "normal":
+        candidates = _normal(n, size, ordered)
+        if points is None:
+            points = DEFAULT_POINTS
+    elif method.endswith("box"):
+        candidates = _box(n, size, ordered, int(method[0]))
+    elif method in ("1axle", "2axle"):
+        n_axes = int(method[0])
+        axes = [rank_of[x] for x in _lanes(axis) if x in rank_of][:n_axes]
+        if len(axes) < n_axes:
+            # 指定が足りない分はスコア上位から
+            axes += [i for i in range(n) if i not in axes][:n_axes - len(axes)]
+        others = [i for i in range(n) if i not in axes]
+        if rivals is None:
+            rivals = rivals_for_points(method, bet_type, points)
+        candidates = _axle(n, size, ordered, axes, others[:rivals] if rivals else others)
+    else:
+        if formation:
+            rows = [[rank_of[x] for x in _lanes(row) if x in rank_of] for row in formation]
+        else:
+            rows = [list(range(min(k, n))) for k in (1, 3, 5)]
+        if len(rows) < size:
+            raise ValueError(f"フォーメーションは {size} 着分の指定が必要です")
+        candidates = _formation(size, ordered, rows)
+
+    def total(idx: Tuple[int, ...]) -> float:
+        s = scores[idx[0]]
+        for i in idx[1:]:
+            s = s + scores[i]
+        return s
+
+    if points is None:
+        picked = sorted(candidates, key=total, reverse=True)
+    else:
+        picked = heapq.nlargest(points, candidates, key=total)
+
+    if with_scores:
+        return [
+            {
+                "ticket": format_ticket([lanes[i] for i in idx], ordered),
+                "lanes": [lanes[i] for i in idx],
+                "score": round(total(idx), 1),
+            }
+            for idx in picked
+        ]
+    return [format_ticket([lanes[i] for i in idx], ordered) for idx in picked]
+
+
+def make_tickets_batch(races: Iterable[List[Dict[str, Any]]], **options) -> List[List[Any]]:
+    """1日分など複数レースの entries に同じ条件で make_tickets を掛ける"""
+    return [make_tickets(entries, **options) for entries in races]
+
+
+def tickets_from_request(entries: List[Dict[str, Any]], data: Dict[str, Any]) -> List[Any] | None:
+    """
+    posted の betType / method / points / rivalCount から買い目を作る（指定がなければ None）。
+    単勝・複勝や相手数などは予想画面の選択肢に合わせている。
+    """
+    if not data.get("betType") and not data.get("method"):
+        return None
+
+    def _int(v):
+        try:
+            return int(v)
+        except (TypeError, ValueError):
+            return None
+
+    return make_tickets(
+        entries,
+        bet_type=data.get("betType"),
+        method=data.get("method"),
+        points=_int(data.get("points")),
+        rivals=_int(data.get("rivalCount")),
+        axis=data.get("axis"),
+        formation=data.get("formation"),
+    )
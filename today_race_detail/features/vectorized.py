@@ -0,0 +1,406 @@
+# today_race_detail/features/vectorized.py
+"""
+A/B スコアの一括計算（NumPy 版）。
+
+複数レースの entries を (レース数 × 6艇 × 特徴量) の配列に詰め、
+正規化・重み付け・コンテキスト補正・天候補正を配列演算でまとめて行う。
+欠艇（6艇未満）のマスは NaN にして min/max から除外する。
+
+計算式・デフォルト値・演算順は feature_calculator_a / _b と同じで、
+make_feature_tables / make_feature_tables_just の結果は
+make_feature_table / make_feature_table_just と一致する（round も Python の round）。
+"""
+from __future__ import annotations
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+
+from . import feature_calculator_a as calc_a
+from . import feature_calculator_b as calc_b
+
+MAX_BOATS = 6
+
+# 基礎特性（A/B 共通）
+BASE_KEYS = (
+    "lane", "avg_st", "national_win", "local_win",
+    "national_2r", "local_2r", "motor_2r", "boat_2r",
+    "national_3r", "local_3r", "motor_3r", "boat_3r",
+)
+# 直前展示（B のみ）: (exhibit_info のキー, 欠損時デフォルト)
+EXHIBIT_KEYS = (
+    ("exhibit_time", 7.00),
+    ("tilt", 0.0),
+    ("st", 0.2),
+    ("course", None),          # None → 枠番にフォールバック
+    ("adjust_weight", 0.0),
+)
+
+KLASSES = ("A1", "A2", "B1", "B2")
+RACE_TYPES = tuple(calc_a.TYPE_BIAS.keys())
+PLACES = tuple(calc_a.PLACE_BIAS.keys())
+
+_HEADWIND = ("向かい風（完全）", "斜め向かい風（アウト→イン寄り）", "斜め向かい風（イン→アウト寄り）")
+_TAILWIND = ("追い風（完全）", "斜め追い風（アウト→イン寄り）", "斜め追い風（イン→アウト寄り）")
+
+
+# ===== 参照テーブル（先頭行/列は「該当なし＝0」） =====
+def _place_table(place_bias: Dict[str, Dict[int, float]]) -> np.ndarray:
+    table = np.zeros((len(PLACES) + 1, MAX_BOATS + 1))
+    for p, place in enumerate(PLACES, start=1):
+        for lane, v in place_bias.get(place, {}).items():
+            table[p, lane] = v
+    return table
+
+
+def _type_table(type_bias: Dict[str, Dict[str, float]]) -> np.ndarray:
+    table = np.zeros((len(RACE_TYPES), len(KLASSES) + 1))
+    for t, race_type in enumerate(RACE_TYPES):
+        for k, klass in enumerate(KLASSES, start=1):
+            table[t, k] = type_bias.get(race_type, {}).get(klass, 0.0)
+    return table
+
+
+def compile_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """{"W", "W_EX", "PLACE_BIAS", "TYPE_BIAS"} → score_a / score_b が使う形（候補パラメータの評価用）"""
+    return {
+        "W": params["W"],
+        "W_EX": params.get("W_EX", {}),
+        "place": _place_table(params["PLACE_BIAS"]),
+        "type": _type_table(params["TYPE_BIAS"]),
+    }
+
+
+PLACE_TABLE_A = _place_table(calc_a.PLACE_BIAS)
+PLACE_TABLE_B = _place_table(calc_b.PLACE_BIAS)
+TYPE_TABLE_A = _type_table(calc_a.TYPE_BIAS)
+TYPE_TABLE_B = _type_table(calc_b.TYPE_BIAS)
+
+# 計算機に読み込まれている値（パラメータファイル適用後）
+PARAMS_A = {"W": calc_a.W, "W_EX": {}, "place": PLACE_TABLE_A, "type": TYPE_TABLE_A}
+PARAMS_B = {"W": calc_b.W, "W_EX": calc_b.W_EX, "place": PLACE_TABLE_B, "type": TYPE_TABLE_B}
+
+_PLACE_INDEX = {p: i for i, p in enumerate(PLACES, start=1)}
+_TYPE_INDEX = {t: i for i, t in enumerate(RACE_TYPES)}
+_KLASS_INDEX = {k: i for i, k in enumerate(KLASSES, start=1)}
+
+_TYPE_FACTOR = {"イン強": 1.2, "センター伸び": 1.0, "アウト伸び": 0.5, "フラット": 0.8}
+_PLACE_TYPE_FACTOR = np.array([1.0] + [
+    next((_TYPE_FACTOR[g] for g, places in calc_b.PLACE_GROUPS.items() if p in places), 1.0)
+    for p in PLACES
+])
+
+
+def _lane_index(lane: Any) -> int:
+    """dict.get(lane) と同じく 1〜6 に一致する値だけ枠として扱う"""
+    try:
+        if lane in range(1, MAX_BOATS + 1):
+            return int(lane)
+    except TypeError:
+        pass
+    return 0
+
+
+def _dist_bias(distance_text: str | None) -> float:
+    dist = calc_a._distance_to_int(distance_text)
+    if dist:
+        if dist <= 1700:
+            return 0.004
+        if dist >= 2000:
+            return 0.002
+    return 0.0
+
+
+# ===== 配列への詰め込み =====
+def build_batch(races: Sequence[List[Dict[str, Any]]],
+                contexts: Sequence[Dict[str, Any] | None],
+                with_exhibit: bool = False) -> Dict[str, np.ndarray]:
+    """
+    races[i] = entries, contexts[i] = {"place", "distance", "type", ...}
+    返り値: 特徴量配列 X (R, 6, F) / 有効マス valid (R, 6) / 枠・級別・会場などの索引
+    """
+    n = len(races)
+    keys = BASE_KEYS + (tuple(k for k, _ in EXHIBIT_KEYS) if with_exhibit else ())
+    X = np.full((n, MAX_BOATS, len(keys)), np.nan)
+    valid = np.zeros((n, MAX_BOATS), dtype=bool)
+    lane_idx = np.zeros((n, MAX_BOATS), dtype=np.int64)
+    klass_idx = np.zeros((n, MAX_BOATS), dtype=np.int64)
+    course_int = np.full((n, MAX_BOATS), 3, dtype=np.int64)   # 天候補正の進入（B）
+    calm_lane = np.full((n, MAX_BOATS), 3, dtype=np.int64)    # 静水補正の枠（B）
+
+    to_float = calc_a._to_float
+    defaults = calc_a.SAFE_DEFAULTS
+    for r, entries in enumerate(races):
+        if len(entries) > MAX_BOATS:
+            raise ValueError(f"1レース {MAX_BOATS} 艇までです（{len(entries)} 艇）")
+        for b, e in enumerate(entries):
+            row = X[r, b]
+            row[0] = to_float(e.get("lane"), defaults["lane"])
+            row[1] = to_float(e.get("avg_st"), defaults["avg_st"])
+            row[2] = to_float(e.get("national_win"), defaults["national_win"])
+            row[3] = to_float(e.get("local_win"), defaults["local_win"])
+            for f in range(4, len(BASE_KEYS)):
+                key = BASE_KEYS[f]
+                row[f] = to_float(e.get(key), defaults[key], key)
+
+            if with_exhibit:
+                ex = e.get("exhibit_info", {})
+                for j, (key, default) in enumerate(EXHIBIT_KEYS, start=len(BASE_KEYS)):
+                    v = to_float(ex.get(key), e.get("lane") if default is None else default)
+                    row[j] = np.nan if v is None else v
+                course_int[r, b] = int(e.get("course") or e.get("lane") or 3)
+                calm_lane[r, b] = int(e.get("lane", 3))
+
+            valid[r, b] = True
+            lane_idx[r, b] = _lane_index(e.get("lane"))
+            klass_idx[r, b] = _KLASS_INDEX.get(e.get("klass"), 0)
+
+    ctxs = [c or {} for c in contexts]
+    batch = {
+        "X": X,
+        "valid": valid,
+        "lane_idx": lane_idx,
+        "klass_idx": klass_idx,
+        "place_idx": np.array([_PLACE_INDEX.get(c.get("place"), 0) for c in ctxs], dtype=np.int64),
+        "has_place": np.array([bool(c.get("place")) for c in ctxs]),
+        "type_idx": np.array([_TYPE_INDEX[calc_a._normalize_race_type(c.get("type"))] for c in ctxs],
+                             dtype=np.int64),
+        "dist_bias": np.array([_dist_bias(c.get("distance")) for c in ctxs]),
+    }
+    if with_exhibit:
+        batch.update(_weather_arrays(ctxs))
+        batch["course_int"] = course_int
+        batch["calm_lane"] = calm_lane
+    return batch
+
+
+def _weather_arrays(ctxs: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """レース単位の気象値（B の天候補正・動的場補正・静水補正で使う）"""
+    to_float = calc_b._to_float
+    wind = [to_float(c.get("wind_speed"), 0.0) for c in ctxs]
+    wave = [to_float(c.get("wave_height"), 0.0) for c in ctxs]
+    return {
+        # 天候補正の減衰量（** は Python と同じ結果にするためレース単位で計算）
+        "wind_decay": np.array([0.015 * ((w - 6) ** 1.2) if w > 6 else 0.0 for w in wind]),
+        "wave_decay": np.array([0.015 * ((w - 10) / 10) if w > 10 else 0.0 for w in wave]),
+        "rel_wind": np.array([
+            1 if c.get("relative_wind") in _HEADWIND else
+            2 if c.get("relative_wind") in _TAILWIND else
+            3 if c.get("relative_wind") == "横風（アウト→イン）" else
+            4 if c.get("relative_wind") == "横風（イン→アウト）" else 0
+            for c in ctxs
+        ], dtype=np.int64),
+        # 動的場補正・静水補正は float() で読む（feature_calculator_b と同じ）
+        "ctx_wind": np.array([float(c.get("wind_speed", 0.0)) for c in ctxs]),
+        "ctx_angle": np.array([float(c.get("wind_angle", 0.0)) for c in ctxs]),
+        "ctx_wave": np.array([float(c.get("wave_height", 0.0)) for c in ctxs]),
+        "ctx_temp": np.array([float(c.get("temperature", 15.0)) for c in ctxs]),
+    }
+
+
+# ===== 正規化（レースごとの min/max） =====
+def _minmax(v: np.ndarray):
+    """_safe_minmax と同じ：全艇同値なら hi = lo + |lo|（lo=0 なら +1）"""
+    all_nan = np.all(np.isnan(v), axis=1, keepdims=True)
+    lo = np.nanmin(np.where(all_nan, 0.0, v), axis=1, keepdims=True)
+    hi = np.nanmax(np.where(all_nan, 1.0, v), axis=1, keepdims=True)
+    same = lo == hi
+    hi = np.where(same, lo + np.where(lo != 0, np.abs(lo), 1.0), hi)
+    return lo, hi
+
+
+def _norm_direct(v: np.ndarray) -> np.ndarray:
+    lo, hi = _minmax(v)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(hi != lo, (v - lo) / (hi - lo), 0.5)
+
+
+def _norm_inverse(v: np.ndarray) -> np.ndarray:
+    lo, hi = _minmax(v)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(hi != lo, (hi - v) / (hi - lo), 0.5)
+
+
+def _base_components(X: np.ndarray, W: Dict[str, float]) -> Dict[str, np.ndarray]:
+    f_lane = _norm_inverse(X[..., 0])
+    f_st = _norm_inverse(X[..., 1])
+    f_win = _norm_direct(0.7 * X[..., 2] + 0.3 * X[..., 3])
+    f_natloc2 = 0.5 * _norm_direct(X[..., 4]) + 0.5 * _norm_direct(X[..., 5])
+    f_mecha2 = 0.5 * _norm_direct(X[..., 6]) + 0.5 * _norm_direct(X[..., 7])
+    f_three = (
+        0.25 * _norm_direct(X[..., 8]) +
+        0.25 * _norm_direct(X[..., 9]) +
+        0.25 * _norm_direct(X[..., 10]) +
+        0.25 * _norm_direct(X[..., 11])
+    )
+    base = (
+        W["lane"] * f_lane +
+        W["st"] * f_st +
+        W["win"] * f_win +
+        W["two_natloc"] * f_natloc2 +
+        W["two_mecha"] * f_mecha2 +
+        W["three_mix"] * f_three
+    ) * 100.0
+    return {
+        "lane": W["lane"] * f_lane * 100,
+        "st": W["st"] * f_st * 100,
+        "win": W["win"] * f_win * 100,
+        "two_natloc": W["two_natloc"] * f_natloc2 * 100,
+        "two_mecha": W["two_mecha"] * f_mecha2 * 100,
+        "three_mix": W["three_mix"] * f_three * 100,
+        "base": base,
+    }
+
+
+def _type_bias(batch, type_table: np.ndarray) -> np.ndarray:
+    return type_table[batch["type_idx"][:, None], batch["klass_idx"]]
+
+
+# ===== A：事前スコア =====
+def score_a(batch: Dict[str, np.ndarray], params: Dict[str, Any] | None = None) -> Dict[str, np.ndarray]:
+    """make_feature_table と同じ計算を配列で行う（final は未丸め）。params は compile_params の結果"""
+    params = params or PARAMS_A
+    comps = _base_components(batch["X"], params["W"])
+
+    lane_bias = params["place"][batch["place_idx"][:, None], batch["lane_idx"]]
+    lane_bias = np.where(batch["has_place"][:, None], lane_bias, 0.0)
+    bias = lane_bias * 0.03 + _type_bias(batch, params["type"]) * 0.01 + batch["dist_bias"][:, None]
+    context_mult = 1.0 + np.clip(bias, -0.05, 0.05)
+
+    comps["context_mult"] = context_mult
+    comps["final"] = comps["base"] * context_mult
+    return comps
+
+
+# ===== B：直前スコア =====
+def _dynamic_place_bias(batch, place_table: np.ndarray) -> np.ndarray:
+    """feature_calculator_b._dynamic_place_bias をレース方向にまとめたもの (R, 7)"""
+    place_idx = batch["place_idx"]
+    base = place_table[place_idx]
+    wind, angle = batch["ctx_wind"][:, None], batch["ctx_angle"][:, None]
+    wave, temp = batch["ctx_wave"][:, None], batch["ctx_temp"][:, None]
+    tf = _PLACE_TYPE_FACTOR[place_idx][:, None]
+
+    steps = 0.12 * np.array([0.0, 3, 2, 1, 0, -1, -2]) / 3 * tf
+    center = np.zeros((1, MAX_BOATS + 1))
+    center[0, 3] = center[0, 4] = 1.0
+
+    head = ((0 <= angle) & (angle < 45)) | ((315 <= angle) & (angle <= 360))
+    tail = (135 <= angle) & (angle <= 225)
+    right = (45 <= angle) & (angle < 135)
+    left = (225 < angle) & (angle < 315)
+
+    bias = base + np.where(head, steps, 0.0)
+    bias = bias - np.where(tail, steps, 0.0)
+    bias = bias + np.where(right, center * (0.06 * tf), 0.0)
+    bias = bias - np.where(left, 0.02 * tf, 0.0)
+
+    factor = np.minimum(1.0 + (wind - 7) * 0.03, 1.15)
+    bias = bias + np.where(wind > 7, (factor - 1.0) * 0.5, 0.0)
+    bias = bias - np.where(wave >= 4, 0.025, 0.0)
+    bias = bias - np.where(temp <= 10, center * 0.03, 0.0)
+    bias = np.clip(bias, -1.0, 1.0)
+
+    active = (batch["has_place"] & (batch["ctx_wind"] != 0))[:, None]
+    return np.where(active, bias, base)
+
+
+def score_b(batch: Dict[str, np.ndarray], params: Dict[str, Any] | None = None) -> Dict[str, np.ndarray]:
+    """make_feature_table_just と同じ計算を配列で行う（raw は未丸め）。params は compile_params の結果"""
+    params = params or PARAMS_B
+    X = batch["X"]
+    W_EX = params["W_EX"]
+    comps = _base_components(X, params["W"])
+
+    n = len(BASE_KEYS)
+    f_ex = _norm_inverse(X[..., n])
+    f_tilt = 1 - np.minimum(np.abs(X[..., n + 1]) / 1.5, 1.0)
+    f_st_d = _norm_inverse(X[..., n + 2])
+    f_course = _norm_inverse(X[..., n + 3])
+    f_adj = _norm_inverse(X[..., n + 4])
+    exhibit = (
+        W_EX["exhibit_time"] * f_ex +
+        W_EX["tilt"] * f_tilt +
+        W_EX["course"] * f_course +
+        W_EX["st_display"] * f_st_d +
+        W_EX["adjust_weight"] * f_adj
+    ) * 100.0
+    base_total = comps["base"] + exhibit
+
+    # --- 天候補正 ---
+    course = batch["course_int"]
+    rel = batch["rel_wind"][:, None]
+    weather = 1.0 - batch["wind_decay"][:, None]
+    weather = weather - batch["wave_decay"][:, None]
+    weather = weather + np.select(
+        [rel == 1, rel == 2, rel == 3, rel == 4],
+        [
+            0.02 * np.where(course <= 3, 1, -0.5),
+            0.015 * np.where(course >= 4, 1, -0.5),
+            0.01 * np.where(course <= 2, 1, -0.5),
+            0.01 * np.where(course >= 5, 1, -0.5),
+        ],
+        0.0,
+    )
+    weather = np.clip(weather, 0.75, 1.25)
+
+    # --- コンテキスト補正（動的場補正 ×0.10、クランプなし） ---
+    dyn = np.take_along_axis(_dynamic_place_bias(batch, params["place"]), batch["lane_idx"], axis=1)
+    dyn = np.where(batch["lane_idx"] > 0, dyn, 0.0)
+    bias = dyn * 0.10 + _type_bias(batch, params["type"]) * 0.01 + batch["dist_bias"][:, None]
+    context_mult = 1.0 + bias
+
+    comps["base"] = base_total
+    comps["exhibit"] = exhibit
+    comps["context_mult"] = context_mult
+    comps["weather_mult"] = weather
+    comps["raw"] = base_total * context_mult * weather
+
+    # --- 静水補正（丸め後に掛ける） ---
+    calm = batch["ctx_wind"][:, None] < 3
+    comps["calm_mult"] = np.where(calm, 1.0 + (0.03 * (4 - batch["calm_lane"]) / 3), 1.0)
+    return comps
+
+
+# ===== entries への書き戻し =====
+_BREAKDOWN_1 = ("lane", "st", "win", "two_natloc", "two_mecha", "three_mix")
+
+
+def _write_back(races, comps, keys_1, keys_4, final) -> List[List[Dict[str, Any]]]:
+    lists = {k: comps[k].tolist() for k in keys_1 + keys_4 + ("base",)}
+    final = final.tolist()
+    out = []
+    for r, entries in enumerate(races):
+        for b, e in enumerate(entries):
+            bd = {k: round(lists[k][r][b], 1) for k in keys_1}
+            bd.update({k: round(lists[k][r][b], 4) for k in keys_4})
+            bd["base"] = round(lists["base"][r][b], 1)
+            e["score_breakdown"] = bd
+            e["score"] = final[r][b]
+        entries.sort(key=lambda x: calc_a._to_float(x.get("lane"), calc_a.SAFE_DEFAULTS["lane"]))
+        out.append(entries)
+    return out
+
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    # np.round は x*10 を経由するため、端数で Python の round とずれることがある
+    return np.array([[round(v, 1) for v in row] for row in values.tolist()])
+
+
+def make_feature_tables(races: Sequence[List[Dict[str, Any]]],
+                        contexts: Sequence[Dict[str, Any] | None]) -> List[List[Dict[str, Any]]]:
+    """複数レース分の make_feature_table（entries を書き換えて返す）"""
+    if not races:
+        return []
+    comps = score_a(build_batch(races, contexts))
+    return _write_back(races, comps, _BREAKDOWN_1, ("context_mult",), _round1(comps["final"]))
+
+
+def make_feature_tables_just(races: Sequence[List[Dict[str, Any]]],
+                             contexts: Sequence[Dict[str, Any] | None]) -> List[List[Dict[str, Any]]]:
+    """複数レース分の make_feature_table_just（entries を書き換えて返す）"""
+    if not races:
+        return []
+    comps = score_b(build_batch(races, contexts, with_exhibit=True))
+    final = _round1(comps["raw"]) * comps["calm_mult"]
+    return _write_back(races, comps, _BREAKDOWN_1 + ("exhibit",),
+                       ("context_mult", "weather_mult"), final)
@@ -0,0 +1,292 @@
+# today_race_detail/live.py
+"""
+レース当日のライブ更新（Server-Sent Events）。
+
+- プロセス内のブローカー：接続ごとに queue.Queue を1つ持ち、会場 / レースで購読を絞る
+- 上流の取得は1本の poller スレッドだけが行い、全接続に配る（接続数が増えても取得は増えない）
+- poller は購読者がいる間だけ動き、POLL_SECONDS ごとに
+    countdown   … 締切 COUNTDOWN_WINDOW 以内のレースの残り秒数
+    beforeinfo  … 直前情報（展示・気象）が出た / 変わった
+    score       … 直前情報の変化でスコア・参考買い目が変わった
+    payout      … 払戻が確定した
+  を publish する
+- 接続直後に、購読範囲の最新の beforeinfo / score / payout をまとめて送る（取り直しの再読込が要らない）
+
+本文はサーバーの種類で使い分ける（views.live_stream が request から選ぶ）:
+- WSGI（runserver・gunicorn sync）… stream()：同期ジェネレータ。1接続が1スレッドを切断まで使い続けるので、
+  同時接続は MAX_SUBSCRIBERS までに抑える（runserver の他のリクエストが詰まらないように）
+- ASGI（uvicorn / daphne）… astream()：非同期ジェネレータ。キューを ASYNC_POLL_SECONDS ごとに覗くだけで
+  スレッドは持たない（Django は同期イテレータを ASGI で流すと最後まで読んでから送るので、stream() は使えない）
+"""
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+import asyncio
+import json
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections
+
+from .prefetch import AFTER_DEADLINE, BEFOREINFO_WINDOW
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 15
+HEARTBEAT_SECONDS = 15                     # 切断はこの間隔の書き込みで気づく
+COUNTDOWN_WINDOW = timedelta(minutes=30)   # 締切何分前から countdown を流すか
+QUEUE_SIZE = 500                           # 溢れたら古いイベントから捨てる（遅い接続で他を止めない）
+RETRY_MS = 5000                            # EventSource の再接続間隔
+MAX_SUBSCRIBERS = 32                       # 同時接続の上限（WSGI では1接続1スレッド。runserver のスレッドを使い切らない）
+ASYNC_POLL_SECONDS = 0.5                   # astream がキューを覗く間隔
+
+RaceKey = Tuple[str, int]
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+# ==========================================================
+# ブローカー
+# ==========================================================
+class Subscription:
+    def __init__(self, place: str | None = None, rno: int | None = None):
+        self.place = place
+        self.rno = rno
+        self.queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        if self.place is not None and event["data"].get("place") != self.place:
+            return False
+        return self.rno is None or event["data"].get("rno") == self.rno
+
+    def put(self, event: Dict[str, Any]) -> None:
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+_lock = threading.Lock()
+_subscribers: List[Subscription] = []
+_latest: Dict[Tuple[str, str, int], Dict[str, Any]] = {}   # (種類, 会場, R) → 最後のイベント
+_poller: threading.Thread | None = None
+
+
+def publish(kind: str, data: Dict[str, Any], keep: bool = True) -> None:
+    """イベントを購読者に配る。keep なら接続直後の初期送信にも使う"""
+    event = {"event": kind, "data": data}
+    with _lock:
+        if keep:
+            _latest[(kind, data.get("place"), data.get("rno"))] = event
+        subscribers = list(_subscribers)
+    for sub in subscribers:
+        if sub.wants(event):
+            sub.put(event)
+
+
+def subscribe(place: str | None = None, rno: int | None = None) -> Subscription:
+    global _poller
+    sub = Subscription(place, rno)
+    with _lock:
+        if len(_subscribers) >= MAX_SUBSCRIBERS:
+            raise TooManySubscribers(f"同時接続が上限（{MAX_SUBSCRIBERS}）に達しています")
+        for event in _latest.values():
+            if sub.wants(event):
+                sub.put(event)
+        _subscribers.append(sub)
+        if _poller is None or not _poller.is_alive():
+            _poller = threading.Thread(target=_poll_loop, name="live-poller", daemon=True)
+            _poller.start()
+    return sub
+
+
+def unsubscribe(sub: Subscription) -> None:
+    with _lock:
+        if sub in _subscribers:
+            _subscribers.remove(sub)
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    data = json.dumps(event["data"], ensure_ascii=False, default=str)
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+
+def stream(sub: Subscription) -> Iterator[str]:
+    """SSE の本文。切断でジェネレータが閉じられると購読を外す"""
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                event = sub.queue.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        unsubscribe(sub)
+
+
+async def astream(sub: Subscription) -> AsyncIterator[str]:
+    """ASGI 用の SSE の本文（スレッドを持たない）。切断でタスクが止められると購読を外す"""
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        idle = 0.0
+        while True:
+            try:
+                event = sub.queue.get_nowait()
+            except queue.Empty:
+                await asyncio.sleep(ASYNC_POLL_SECONDS)
+                idle += ASYNC_POLL_SECONDS
+                if idle >= HEARTBEAT_SECONDS:
+                    idle = 0.0
+                    yield ": ping\n\n"
+                continue
+            idle = 0.0
+            yield format_event(event)
+    finally:
+        unsubscribe(sub)
+
+
+# ==========================================================
+# poller（上流の取得は1本だけ）
+# ==========================================================
+_state: Dict[str, Dict[RaceKey, Any]] = {"beforeinfo": {}, "score": {}}
+_paid: set = set()
+_day: date | None = None
+_stop = threading.Event()   # テスト・終了用
+
+
+def _watched_places() -> set | None:
+    """購読されている会場（全会場の購読が1つでもあれば None）"""
+    with _lock:
+        subscribers = list(_subscribers)
+    places = set()
+    for sub in subscribers:
+        if sub.place is None:
+            return None
+        places.add(sub.place)
+    return places
+
+
+def _reset_day(today: date) -> None:
+    global _day
+    if _day != today:
+        _day = today
+        with _lock:
+            _latest.clear()
+        _paid.clear()
+        for seen in _state.values():
+            seen.clear()
+
+
+def _poll_loop() -> None:
+    print("📡 ライブ更新 poller 開始")
+    while _subscribers and not _stop.is_set():
+        try:
+            poll_once()
+        except Exception as e:
+            logger.warning(f"[live] poll に失敗: {e}")
+        finally:
+            close_old_connections()
+        _stop.wait(POLL_SECONDS)
+    print("📡 ライブ更新 poller 停止（購読者なし）")
+
+
+def poll_once(now: datetime | None = None) -> None:
+    from today_races.schedule import day_races
+
+    now = now or datetime.now()
+    _reset_day(now.date())
+    places = _watched_places()
+    races = [r for r in day_races(now.date()) if places is None or r[0] in places]
+
+    # --- countdown（保持しない：接続直後は次の poll で届く） ---
+    for place, rno, url, deadline in races:
+        if now - AFTER_DEADLINE <= deadline <= now + COUNTDOWN_WINDOW:
+            publish("countdown", {
+                "place": place, "rno": rno, "raceUrl": url,
+                "deadline": f"{deadline:%H:%M}",
+                "seconds": int((deadline - now).total_seconds()),
+            }, keep=False)
+
+    # --- beforeinfo / score ---
+    window = [
+        r for r in races
+        if r[2] and r[3] - BEFOREINFO_WINDOW <= now <= r[3] + AFTER_DEADLINE
+    ]
+    if window:
+        _poll_beforeinfo(window)
+
+    # --- payout ---
+    _poll_payouts(now.date(), places)
+
+
+def _poll_beforeinfo(races: List[Tuple[str, int, str, datetime]]) -> None:
+    from .prefetch import get_beforeinfo
+
+    changed = []
+    for place, rno, url, deadline in races:
+        try:
+            info = get_beforeinfo(url)
+        except Exception as e:
+            logger.warning(f"[live] beforeinfo の取得に失敗 {url}: {e}")
+            continue
+        if not info.get("before_entries"):
+            continue  # 未公開
+        if _state["beforeinfo"].get((place, rno)) == info.get("content_hash"):
+            continue
+        _state["beforeinfo"][(place, rno)] = info.get("content_hash")
+        publish("beforeinfo", {
+            "place": place, "rno": rno, "raceUrl": url,
+            "weather": info.get("weather_meta", {}),
+            "entries": info["before_entries"],
+        })
+        changed.append({"raceUrl": url, "place": place, "raceNo": f"{rno}R", "time": f"{deadline:%H:%M}"})
+
+    if changed:
+        _publish_scores(changed)
+
+
+def _publish_scores(races: List[Dict[str, Any]]) -> None:
+    from today_races.schedule import rno_to_int
+    from .bulk import predict_races
+
+    for race in predict_races(races)["races"]:
+        key = (race.get("place"), rno_to_int(race.get("raceNo")))
+        scores = {int(e["lane"]): round(e.get("score", 0.0), 4) for e in race.get("entries", [])}
+        if _state["score"].get(key) == scores:
+            continue
+        _state["score"][key] = scores
+        publish("score", {
+            "place": key[0], "rno": key[1], "raceUrl": race.get("raceUrl"),
+            "mode": race.get("mode"),
+            "scores": scores,
+            "reference_picks": race.get("reference_picks", []),
+        })
+
+
+def _poll_payouts(day: date, places: set | None) -> None:
+    from report.core.payout_store import refresh_payouts
+    from today_races.schedule import rno_to_int
+
+    # refresh_payouts 自体が FETCH_INTERVAL と確定済みで取得を間引く
+    for place, rows in refresh_payouts(day).items():
+        if places is not None and place not in places:
+            continue
+        for race, combo, pay_text, odds_suffix, pop_suffix, href in rows:
+            key = (place, rno_to_int(race))
+            if key in _paid:
+                continue
+            _paid.add(key)
+            publish("payout", {
+                "place": place, "rno": key[1], "combo": combo, "pay_text": pay_text,
+                "odds": odds_suffix, "popularity": pop_suffix, "href": href,
+            })
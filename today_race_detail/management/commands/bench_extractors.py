@@ -0,0 +1,86 @@
+# today_race_detail/management/commands/bench_extractors.py
+import contextlib
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scraping import corpus
+from scraping.parsers import compare_backends, get_backend
+
+
+class Command(BaseCommand):
+    help = "保存ページに対して各 extractor の速度を測り、期待値・パーサー間の一致を検証する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="1ページあたりの繰り返し回数")
+        parser.add_argument("--type", action="append", dest="types", choices=corpus.PAGE_TYPES,
+                            help="対象のページ種別（複数指定可）")
+        parser.add_argument("--backend", default=None, help="計測に使うパーサー（既定は settings）")
+        parser.add_argument("--baseline", default=None, help="比較用の前回結果 JSON")
+        parser.add_argument("--save", default=None, help="今回の結果を JSON で保存")
+        parser.add_argument("--max-slowdown", type=float, default=1.5,
+                            help="baseline 比でこの倍率より遅くなったら失敗")
+
+    def handle(self, *args, **opts):
+        types = tuple(opts["types"] or corpus.PAGE_TYPES)
+        backend = get_backend(opts["backend"])
+        fixtures = list(corpus.iter_fixtures(types))
+        if not fixtures:
+            raise CommandError(f"fixture がありません: {corpus.FIXTURE_DIR}（capture_fixtures で作成）")
+
+        timings = {}   # "種別.extractor" → [秒/回, ...]
+        failures = []
+
+        for page_type, path in fixtures:
+            html = path.read_text(encoding="utf-8")
+            expected = corpus.load_expected(path) or {}
+
+            for name, fn in corpus.extractors_for(page_type).items():
+                key = f"{page_type}.{name}"
+                # extractor の print は計測結果に混ぜない
+                with contextlib.redirect_stdout(io.StringIO()):
+                    # ✅ 正しさ：期待値 & パーサー間一致
+                    try:
+                        result = corpus.normalize(fn(html, backend))
+                        compare_backends(lambda h, b: corpus.normalize(fn(h, b)), html)
+                    except AssertionError as e:
+                        failures.append(f"{path.name} {key}: {e}")
+                        continue
+                    if name in expected and expected[name] != result:
+                        failures.append(f"{path.name} {key}: 期待値と一致しません")
+
+                    # ⏱ 速度
+                    start = time.perf_counter()
+                    for _ in range(opts["repeat"]):
+                        fn(html, backend)
+                    elapsed = (time.perf_counter() - start) / opts["repeat"]
+                timings.setdefault(key, []).append(elapsed)
+
+        summary = {}
+        self.stdout.write(f"backend={backend}  repeat={opts['repeat']}")
+        for key, values in sorted(timings.items()):
+            avg = sum(values) / len(values)
+            summary[key] = avg
+            self.stdout.write(f"{key:32s} {avg * 1000:9.2f} ms/page  {1 / avg:9.1f} pages/s  (n={len(values)})")
+
+        if opts["baseline"]:
+            with open(opts["baseline"], encoding="utf-8") as f:
+                baseline = json.load(f)
+            for key, avg in summary.items():
+                before = baseline.get(key)
+                if not before:
+                    continue
+                ratio = avg / before
+                self.stdout.write(f"{key:32s} x{before / avg:5.2f} vs baseline")
+                if ratio > opts["max_slowdown"]:
+                    failures.append(f"{key}: baseline 比 {ratio:.2f} 倍遅くなりました")
+
+        if opts["save"]:
+            with open(opts["save"], "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        if failures:
+            raise CommandError("extractor 検証に失敗:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("✅ すべての extractor が期待値と一致しました"))
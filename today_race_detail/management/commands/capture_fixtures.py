@@ -0,0 +1,53 @@
+# today_race_detail/management/commands/capture_fixtures.py
+from django.core.management.base import BaseCommand, CommandError
+
+from scraping import corpus, http_client
+from today_races.views import (
+    INDEX_URL,
+    WEATHER_URL_DEFAULTS,
+    parse_races_from_raceindex,
+    parse_sites_from_index,
+)
+from report.core.fetch_payouts import PAY_URL
+
+
+class Command(BaseCommand):
+    help = "boatrace.jp / tenki.jp の現在のページを保存して extractor のオフライン用コーパスを作る"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--venues", type=int, default=2, help="保存する会場数")
+        parser.add_argument("--races", type=int, default=2, help="会場ごとに保存するレース数")
+
+    def handle(self, *args, **opts):
+        fetch = lambda url: http_client.fetch_text(url, use_cache=False)
+
+        sites = parse_sites_from_index(fetch(INDEX_URL))
+        if not sites:
+            raise CommandError("開催一覧から会場を取得できませんでした")
+
+        saved = []
+        for site in sites[:opts["venues"]]:
+            place = site["place"]
+            index_html = fetch(site["raceindex_url"])
+            saved.append(corpus.save_page("raceindex", place, index_html))
+
+            for race in parse_races_from_raceindex(index_html)[:opts["races"]]:
+                if not race.get("url"):
+                    continue
+                name = f"{place}_{race['rno']}"
+                saved.append(corpus.save_page("racelist", name, fetch(race["url"])))
+                before_url = race["url"].replace("racelist", "beforeinfo")
+                saved.append(corpus.save_page("beforeinfo", name, fetch(before_url)))
+                for odds_page in ("odds3t", "odds2tf", "oddstf"):
+                    odds_url = race["url"].replace("racelist", odds_page)
+                    saved.append(corpus.save_page(odds_page, name, fetch(odds_url)))
+
+            weather_url = WEATHER_URL_DEFAULTS.get(place)
+            if weather_url:
+                saved.append(corpus.save_page("tenki", place, fetch(weather_url)))
+
+        saved.append(corpus.save_page("pay", "pay", fetch(PAY_URL)))
+
+        for path in saved:
+            self.stdout.write(f"💾 {path.relative_to(corpus.FIXTURE_DIR)}")
+        self.stdout.write(self.style.SUCCESS(f"{len(saved)} ページ保存しました"))
@@ -0,0 +1,39 @@
+# today_race_detail/management/commands/poll_odds.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from today_race_detail.odds import ODDS_PAGES, run_odds_cycle
+
+
+class Command(BaseCommand):
+    help = "今日のレースのオッズを締切が近いほど頻繁に取得し、変化があったときだけ保存する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="常駐して繰り返す（ワーカー用）")
+        parser.add_argument("--tick", type=int, default=10, help="予定を確認する間隔（秒）")
+        parser.add_argument("--pages", nargs="+", choices=ODDS_PAGES, default=list(ODDS_PAGES),
+                            help="取得するオッズページ")
+
+    def handle(self, *args, **opts):
+        last_polled = {}  # racelist URL → 最後に取りに行った時刻
+        pages = tuple(opts["pages"])
+
+        while True:
+            started = time.monotonic()
+            try:
+                stats = run_odds_cycle(last_polled, pages=pages)
+                if stats["races"]:
+                    self.stdout.write(
+                        f"💹 races={stats['races']} changed={stats['changed']} "
+                        f"unchanged={stats['unchanged']} errors={stats['errors']}"
+                    )
+            except Exception as e:
+                self.stderr.write(f"⚠️ オッズ取得に失敗: {e}")
+            finally:
+                close_old_connections()
+
+            if not opts["loop"]:
+                break
+            time.sleep(max(0, opts["tick"] - (time.monotonic() - started)))
@@ -0,0 +1,36 @@
+# today_race_detail/management/commands/prefetch_races.py
+import contextlib
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from today_race_detail.prefetch import run_prefetch_cycle
+
+
+class Command(BaseCommand):
+    help = "今日のレースの racelist / beforeinfo を締切に合わせて先読み・パースして保存する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="常駐して繰り返す（ワーカー用）")
+        parser.add_argument("--interval", type=int, default=30, help="ループ間隔（秒）")
+
+    def handle(self, *args, **opts):
+        while True:
+            started = time.monotonic()
+            try:
+                # extractor の print はワーカーのログに出さない
+                with contextlib.redirect_stdout(io.StringIO()):
+                    saved = run_prefetch_cycle()
+                self.stdout.write(
+                    f"🗂 racelist={saved['racelist']} beforeinfo={saved['beforeinfo']} errors={saved['errors']}"
+                )
+            except Exception as e:
+                self.stderr.write(f"⚠️ 先読みに失敗: {e}")
+            finally:
+                close_old_connections()
+
+            if not opts["loop"]:
+                break
+            time.sleep(max(0, opts["interval"] - (time.monotonic() - started)))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefetchedPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('race_url', models.URLField(max_length=300)),
+                ('page_type', models.CharField(choices=[('racelist', '出走表'), ('beforeinfo', '直前情報')], max_length=20)),
+                ('content_hash', models.CharField(max_length=40)),
+                ('parsed_json', models.TextField()),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('race_url', 'page_type'), name='uniq_prefetched_page')],
+            },
+        ),
+    ]
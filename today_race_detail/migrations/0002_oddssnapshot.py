@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('today_race_detail', '0001_prefetchedpage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OddsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('race_url', models.URLField(max_length=300)),
+                ('page', models.CharField(choices=[('odds3t', '3連単'), ('odds2tf', '2連単・2連複'), ('oddstf', '単勝・複勝')], max_length=10)),
+                ('odds_hash', models.CharField(max_length=40)),
+                ('odds_json', models.TextField()),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['race_url', 'page', '-fetched_at'], name='idx_odds_latest')],
+            },
+        ),
+    ]
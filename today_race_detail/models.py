@@ -1,3 +1,54 @@
 from django.db import models
 
-# Create your models here.
+
+class PrefetchedPage(models.Model):
+    """
+    先読みしてパース済みのレースページ（racelist / beforeinfo）。
+    race_url は racelist の URL（beforeinfo もこの URL で引く）。
+    """
+    PAGE_RACELIST = "racelist"
+    PAGE_BEFOREINFO = "beforeinfo"
+    PAGE_CHOICES = [
+        (PAGE_RACELIST, "出走表"),
+        (PAGE_BEFOREINFO, "直前情報"),
+    ]
+
+    race_url = models.URLField(max_length=300)
+    page_type = models.CharField(max_length=20, choices=PAGE_CHOICES)
+    content_hash = models.CharField(max_length=40)
+    parsed_json = models.TextField()
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["race_url", "page_type"], name="uniq_prefetched_page"),
+        ]
+
+    def __str__(self):
+        return f"{self.page_type} {self.race_url}"
+
+
+class OddsSnapshot(models.Model):
+    """
+    オッズページ1枚分のスナップショット。
+    直前のスナップショットからオッズが変わったときだけ行を追加する。
+    """
+    PAGE_CHOICES = [
+        ("odds3t", "3連単"),
+        ("odds2tf", "2連単・2連複"),
+        ("oddstf", "単勝・複勝"),
+    ]
+
+    race_url = models.URLField(max_length=300)  # racelist の URL
+    page = models.CharField(max_length=10, choices=PAGE_CHOICES)
+    odds_hash = models.CharField(max_length=40)  # パース結果（オッズ値）のハッシュ
+    odds_json = models.TextField()
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["race_url", "page", "-fetched_at"], name="idx_odds_latest"),
+        ]
+
+    def __str__(self):
+        return f"{self.page} {self.race_url} {self.fetched_at:%H:%M:%S}"
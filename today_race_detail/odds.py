@@ -0,0 +1,145 @@
+# today_race_detail/odds.py
+"""
+オッズの取り込み（締切が近いほど頻繁にポーリング）。
+- 各レースの odds3t / odds2tf / oddstf を取得して td.oddsPoint だけパース
+- 直前のスナップショットとオッズが同じなら保存しない（変化分だけ履歴に残る）
+- 予想側は latest_odds で保存済みの最新オッズを引く（リクエスト経路ではスクレイピングしない）
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+import logging
+
+from django.utils import timezone
+
+from today_races.crawler import crawl
+from .extractors.odds import ODDS_EXTRACTORS
+from .models import OddsSnapshot
+from .prefetch import today_races, AFTER_DEADLINE
+
+logger = logging.getLogger(__name__)
+
+ODDS_PAGES = tuple(ODDS_EXTRACTORS)
+
+# 締切までの残り時間 → ポーリング間隔（上から順に判定）
+POLL_SCHEDULE = (
+    (timedelta(minutes=3), timedelta(seconds=20)),
+    (timedelta(minutes=10), timedelta(seconds=60)),
+    (timedelta(minutes=30), timedelta(minutes=2)),
+    (timedelta(minutes=60), timedelta(minutes=5)),
+)
+FAR_INTERVAL = timedelta(minutes=10)
+
+
+def odds_url_for(race_url: str, page: str) -> str:
+    return race_url.replace("racelist", page)
+
+
+def poll_interval(deadline: datetime, now: datetime) -> timedelta | None:
+    """締切までの残りに応じた間隔（締切 + AFTER_DEADLINE を過ぎたら None＝もう取らない）"""
+    remaining = deadline - now
+    if remaining < -AFTER_DEADLINE:
+        return None
+    for within, interval in POLL_SCHEDULE:
+        if remaining <= within:
+            return interval
+    return FAR_INTERVAL
+
+
+# ==========================================================
+# パース / 保存
+# ==========================================================
+def parse_odds(page: str, html: str, backend: str | None = None) -> Dict[str, Any]:
+    return ODDS_EXTRACTORS[page](html, backend)
+
+
+def _odds_hash(odds: Dict[str, Any]) -> str:
+    text = json.dumps(odds, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def save_odds(race_url: str, page: str, html: str) -> bool:
+    """パースして、直前と違うときだけスナップショットを追加する。返り値: 保存したか"""
+    odds = parse_odds(page, html)
+    if not odds:
+        return False  # 発売前・欠場などで表が揃っていない
+
+    odds_hash = _odds_hash(odds)
+    last_hash = (
+        OddsSnapshot.objects.filter(race_url=race_url, page=page)
+        .order_by("-fetched_at")
+        .values_list("odds_hash", flat=True)
+        .first()
+    )
+    if last_hash == odds_hash:
+        return False
+
+    OddsSnapshot.objects.create(
+        race_url=race_url,
+        page=page,
+        odds_hash=odds_hash,
+        odds_json=json.dumps(odds, ensure_ascii=False),
+        fetched_at=timezone.now(),
+    )
+    return True
+
+
+def latest_odds(race_url: str, pages: Tuple[str, ...] = ODDS_PAGES) -> Dict[str, Any]:
+    """保存済みの最新オッズ: {"trifecta": {...}, "exacta": {...}, ..., "fetched_at": {page: 時刻}}"""
+    result: Dict[str, Any] = {"fetched_at": {}}
+    for page in pages:
+        snap = (
+            OddsSnapshot.objects.filter(race_url=race_url, page=page)
+            .order_by("-fetched_at")
+            .first()
+        )
+        if snap:
+            result.update(json.loads(snap.odds_json))
+            result["fetched_at"][page] = snap.fetched_at.isoformat()
+    return result
+
+
+# ==========================================================
+# ポーリング
+# ==========================================================
+def plan_odds_poll(races, last_polled: Dict[str, datetime],
+                   now: datetime | None = None) -> List[str]:
+    """今回取りに行く racelist URL（前回から poll_interval 以上経ったレースだけ）"""
+    now = now or datetime.now()
+    due = []
+    for _, url, deadline in races:
+        interval = poll_interval(deadline, now)
+        if interval is None:
+            continue
+        last = last_polled.get(url)
+        if last is None or now - last >= interval:
+            due.append(url)
+    return due
+
+
+def run_odds_cycle(last_polled: Dict[str, datetime], now: datetime | None = None,
+                   pages: Tuple[str, ...] = ODDS_PAGES) -> Dict[str, int]:
+    """1サイクル分（期限の来たレースのオッズを並列取得 → 変化があれば保存）"""
+    now = now or datetime.now()
+    due = plan_odds_poll(today_races(), last_polled, now)
+
+    url_map = {odds_url_for(url, page): (page, url) for url in due for page in pages}
+    fetched, errors = crawl(url_map.keys())
+
+    stats = {"races": len(due), "changed": 0, "unchanged": 0, "errors": len(errors)}
+    for page_url, html in fetched.items():
+        page, race_url = url_map[page_url]
+        try:
+            if save_odds(race_url, page, html):
+                stats["changed"] += 1
+            else:
+                stats["unchanged"] += 1
+        except Exception as e:
+            stats["errors"] += 1
+            logger.warning(f"[odds] {page} の保存に失敗 {race_url}: {e}")
+
+    for url in due:
+        last_polled[url] = now
+    return stats
@@ -0,0 +1,216 @@
+# today_race_detail/prefetch.py
+"""
+締切時刻に合わせたレースページの先読み。
+- racelist は早めに1回（以後 RACELIST_MAX_AGE ごと）取得・パースして保存
+- beforeinfo は締切 BEFOREINFO_WINDOW 分前から毎サイクル取り直す
+- get_race_detail は load_racelist / load_beforeinfo で保存済みデータを先に見る
+"""
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+import logging
+
+from django.utils import timezone
+
+from scraping import http_client
+from today_races.crawler import crawl
+from .extractors.document import HtmlDocument
+from .extractors.race_meta import extract_race_meta_from_html
+from .extractors.entry_table import extract_entries_from_racelist_html
+from .extractors.entry_table_just import (
+    extract_weather_meta_from_html,
+    extract_before_entries_from_html,
+)
+from .models import PrefetchedPage
+
+logger = logging.getLogger(__name__)
+
+RACELIST_MAX_AGE = timedelta(minutes=60)
+BEFOREINFO_MAX_AGE = timedelta(seconds=60)
+BEFOREINFO_WINDOW = timedelta(minutes=15)   # 締切何分前から beforeinfo を追うか
+AFTER_DEADLINE = timedelta(minutes=2)       # 締切後もしばらくは追う（締切延長対策）
+
+NO_RACE_TEXT = "該当するレース情報はありません"
+
+
+def beforeinfo_url_for(race_url: str) -> str:
+    return race_url.replace("racelist", "beforeinfo")
+
+
+def _hash(html: str) -> str:
+    return hashlib.sha1(html.encode("utf-8")).hexdigest()
+
+
+# ==========================================================
+# パース（HTML → 保存用 dict）
+# ==========================================================
+def parse_racelist(html: str, race_url: str = "") -> Dict[str, Any]:
+    """racelist → { meta, entries, content_hash }（A/B の entries 抽出は同一仕様）"""
+    doc = HtmlDocument(html, race_url)
+    meta = extract_race_meta_from_html(doc, race_url)
+    return {
+        "meta": {
+            "date_text": meta.get("date_text"),
+            "day_text": meta.get("day_text"),
+            "type": meta.get("type"),
+            "distance": meta.get("distance"),
+        },
+        "entries": extract_entries_from_racelist_html(doc),
+        "content_hash": _hash(html),
+    }
+
+
+def parse_beforeinfo(html: str, race_url: str = "") -> Dict[str, Any]:
+    """beforeinfo → { weather_meta, before_entries, content_hash }（未公開なら空）"""
+    weather_meta: Dict[str, Any] = {}
+    before_entries: Dict[int, Any] = {}
+    if html.strip() and NO_RACE_TEXT not in html:
+        doc = HtmlDocument(html, beforeinfo_url_for(race_url))
+        weather_meta = extract_weather_meta_from_html(doc)
+        before_entries = extract_before_entries_from_html(doc)
+    return {
+        "weather_meta": weather_meta,
+        "before_entries": before_entries,
+        "content_hash": _hash(html),
+    }
+
+
+# ==========================================================
+# 保存 / 読み出し
+# ==========================================================
+def _save(race_url: str, page_type: str, payload: Dict[str, Any]) -> None:
+    # 保存できなくても（DB ロック等）リクエスト自体は続行する
+    try:
+        PrefetchedPage.objects.update_or_create(
+            race_url=race_url,
+            page_type=page_type,
+            defaults={
+                "content_hash": payload.get("content_hash", ""),
+                "parsed_json": json.dumps(payload, ensure_ascii=False),
+                "fetched_at": timezone.now(),
+            },
+        )
+    except Exception as e:
+        logger.warning(f"[prefetch] {page_type} の保存に失敗 {race_url}: {e}")
+
+
+def _load(race_url: str, page_type: str, max_age: timedelta) -> Dict[str, Any] | None:
+    row = PrefetchedPage.objects.filter(
+        race_url=race_url,
+        page_type=page_type,
+        fetched_at__gte=timezone.now() - max_age,
+    ).first()
+    return json.loads(row.parsed_json) if row else None
+
+
+def save_racelist(race_url: str, html: str) -> Dict[str, Any]:
+    payload = parse_racelist(html, race_url)
+    _save(race_url, PrefetchedPage.PAGE_RACELIST, payload)
+    return payload
+
+
+def save_beforeinfo(race_url: str, html: str) -> Dict[str, Any]:
+    payload = parse_beforeinfo(html, race_url)
+    _save(race_url, PrefetchedPage.PAGE_BEFOREINFO, payload)
+    return _with_int_lanes(payload)
+
+
+def load_racelist(race_url: str, max_age: timedelta = RACELIST_MAX_AGE) -> Dict[str, Any] | None:
+    return _load(race_url, PrefetchedPage.PAGE_RACELIST, max_age)
+
+
+def load_beforeinfo(race_url: str, max_age: timedelta = BEFOREINFO_MAX_AGE) -> Dict[str, Any] | None:
+    payload = _load(race_url, PrefetchedPage.PAGE_BEFOREINFO, max_age)
+    return _with_int_lanes(payload) if payload else None
+
+
+def _with_int_lanes(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON で文字列になった枠番キーを int に戻す"""
+    payload["before_entries"] = {int(k): v for k, v in payload.get("before_entries", {}).items()}
+    return payload
+
+
+# ==========================================================
+# リクエスト経路用：保存済みがあればそれ、無ければ取得して保存
+# ==========================================================
+def get_racelist(race_url: str) -> Dict[str, Any]:
+    warm = load_racelist(race_url)
+    if warm is not None:
+        print("📦 先読み済み racelist を使用")
+        return warm
+    return save_racelist(race_url, http_client.fetch_text(race_url, timeout=20))
+
+
+def get_beforeinfo(race_url: str) -> Dict[str, Any]:
+    warm = load_beforeinfo(race_url)
+    if warm is not None:
+        print("📦 先読み済み beforeinfo を使用")
+        return warm
+    try:
+        html = http_client.fetch_text(beforeinfo_url_for(race_url), timeout=20)
+    except Exception as e:
+        print(f"⚠️ beforeinfo 取得失敗: {e}")
+        return {"weather_meta": {}, "before_entries": {}, "content_hash": ""}
+    return save_beforeinfo(race_url, html)
+
+
+# ==========================================================
+# 先読みスケジューラ
+# ==========================================================
+def today_races() -> List[Tuple[str, str, datetime]]:
+    """RaceSchedule から (会場, racelist URL, 締切) の一覧を作る（今日の分が無ければ取得して登録）"""
+    from today_races.schedule import deadlines
+    from today_races.views import get_today_sites
+
+    today = date.today()
+    races = deadlines(today)
+    if not races:
+        get_today_sites()
+        races = deadlines(today)
+    return races
+
+
+def plan_prefetch(races, now: datetime | None = None) -> Tuple[List[str], List[str]]:
+    """今回のサイクルで取る racelist / beforeinfo の racelist URL を返す"""
+    now = now or datetime.now()
+    urls = [url for _, url, deadline in races if deadline + AFTER_DEADLINE >= now]
+
+    fresh_racelists = set(
+        PrefetchedPage.objects.filter(
+            race_url__in=urls,
+            page_type=PrefetchedPage.PAGE_RACELIST,
+            fetched_at__gte=timezone.now() - RACELIST_MAX_AGE,
+        ).values_list("race_url", flat=True)
+    )
+    racelists = [url for url in urls if url not in fresh_racelists]
+
+    beforeinfos = [
+        url for _, url, deadline in races
+        if deadline - BEFOREINFO_WINDOW <= now <= deadline + AFTER_DEADLINE
+    ]
+    return racelists, beforeinfos
+
+
+def run_prefetch_cycle(now: datetime | None = None) -> Dict[str, int]:
+    """1サイクル分の先読み（並列取得 → パース → 保存）"""
+    racelists, beforeinfos = plan_prefetch(today_races(), now)
+
+    url_map = {url: ("racelist", url) for url in racelists}
+    url_map.update({beforeinfo_url_for(url): ("beforeinfo", url) for url in beforeinfos})
+    pages, errors = crawl(url_map.keys())
+
+    saved = {"racelist": 0, "beforeinfo": 0, "errors": len(errors)}
+    for page_url, html in pages.items():
+        page_type, race_url = url_map[page_url]
+        try:
+            if page_type == "racelist":
+                save_racelist(race_url, html)
+            else:
+                save_beforeinfo(race_url, html)
+            saved[page_type] += 1
+        except Exception as e:
+            saved["errors"] += 1
+            logger.warning(f"[prefetch] {page_type} のパースに失敗 {race_url}: {e}")
+    return saved
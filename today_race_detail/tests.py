@@ -1,3 +1,453 @@
-from django.test import TestCase
+from datetime import date, datetime, time
+from pathlib import Path
+from itertools import permutations
+import contextlib
+import copy
+import io
+import random
 
-# Create your tests here.
+import numpy as np
+from tempfile import TemporaryDirectory
+from unittest import mock
+import os
+
+from django.test import SimpleTestCase, TestCase
+
+from today_race_detail import bulk, live, views
+from today_race_detail.features import vectorized
+from today_race_detail.features.feature_calculator_a import make_feature_table
+from today_race_detail.features.feature_calculator_b import make_feature_table_just, make_feature_tables_just_parallel
+
+from scraping import corpus
+from scraping.corpus import CorpusTestMixin
+from today_race_detail.features import params, probability, tickets
+from today_races.models import RaceSchedule
+
+RACE_URL = "https://www.boatrace.jp/owpc/pc/race/racelist?rno=1&jcd=01&hd=20250101"
+
+
+class ExtractorCorpusTests(CorpusTestMixin, SimpleTestCase):
+    """保存ページ（scraping/fixtures/pages）に対して extractor の出力を期待値と突き合わせる"""
+
+    page_types = ("racelist", "beforeinfo", "odds3t", "odds2tf", "oddstf")
+
+
+class LoadParamsTests(SimpleTestCase):
+    """パラメータファイルが無い・壊れているときは None（手調整値）に戻る"""
+
+    def load(self, files, env=None):
+        with TemporaryDirectory() as tmp:
+            for name, text in files.items():
+                Path(tmp, name).write_text(text, encoding="utf-8")
+            environ = {k: v for k, v in os.environ.items() if k != params.VERSION_ENV}
+            if env is not None:
+                environ[params.VERSION_ENV] = env
+            with mock.patch.object(params, "PARAMS_DIR", Path(tmp)), mock.patch.dict(os.environ, environ, clear=True):
+                return params.load_params()
+
+    def test_latest(self):
+        loaded = self.load({"v001.json": '{"version": 1}', "v002.json": '{"version": 2, "PLACE_BIAS": {"桐生": {"1": 0.5}}}'})
+        self.assertEqual(loaded, {"version": 2, "PLACE_BIAS": {"桐生": {1: 0.5}}})
+
+    def test_none_without_files(self):
+        self.assertIsNone(self.load({}))
+
+    def test_broken_file_falls_back(self):
+        with self.assertLogs("today_race_detail.features.params", "WARNING"):
+            self.assertIsNone(self.load({"v001.json": "{broken"}))
+
+    def test_bad_version_falls_back(self):
+        with self.assertLogs("today_race_detail.features.params", "WARNING"):
+            self.assertIsNone(self.load({}, env="latest"))
+        with self.assertLogs("today_race_detail.features.params", "WARNING"):
+            self.assertIsNone(self.load({}, env="7"))   # 無い版
+
+
+class ApplyParamsTests(SimpleTestCase):
+    """パラメータファイルの A / B の節はそれぞれの計算機にだけ当てる"""
+
+    def tables(self):
+        return {"W": {"lane": 0.2, "st": 0.2}, "PLACE_BIAS": {"桐生": {1: 0.0}}}
+
+    def test_sections(self):
+        loaded = {"version": 3, "A": {"W": {"lane": 0.3}}, "B": {"PLACE_BIAS": {"桐生": {1: 0.5}}}}
+        a, b = self.tables(), self.tables()
+        self.assertEqual(params.apply_params(a, loaded, "A"), 3)
+        self.assertEqual(params.apply_params(b, loaded, "B"), 3)
+        self.assertEqual(a, {"W": {"lane": 0.3, "st": 0.2}, "PLACE_BIAS": {"桐生": {1: 0.0}}})
+        self.assertEqual(b, {"W": {"lane": 0.2, "st": 0.2}, "PLACE_BIAS": {"桐生": {1: 0.5}}})
+
+    def test_missing_section_keeps_defaults(self):
+        tables = self.tables()
+        self.assertEqual(params.apply_params(tables, {"version": 3, "B": {"W": {"lane": 0.3}}}, "A"), 0)
+        self.assertEqual(tables, self.tables())
+
+    def test_flat_file_applies_to_both(self):
+        for calculator in params.CALCULATORS:
+            tables = self.tables()
+            params.apply_params(tables, {"version": 1, "W": {"lane": 0.3}}, calculator)
+            self.assertEqual(tables["W"]["lane"], 0.3)
+
+    def test_save_and_load_sections(self):
+        with TemporaryDirectory() as tmp, mock.patch.object(params, "PARAMS_DIR", Path(tmp)), \
+                mock.patch.dict(os.environ, {params.VERSION_ENV: ""}):
+            version = params.save_params({"A": {"W": {"lane": 0.3}}, "B": {"PLACE_BIAS": {"桐生": {1: 0.5}}, "x": 1}})
+            loaded = params.load_params()
+        self.assertEqual(version, 1)
+        self.assertEqual(loaded["A"], {"W": {"lane": 0.3}})
+        self.assertEqual(loaded["B"], {"PLACE_BIAS": {"桐生": {1: 0.5}}})
+
+
+class RaceDetailAsyncTests(TestCase):
+    """/api/race/detail/（非同期版）で time を送らないときは予定表から締切を引く"""
+
+    @classmethod
+    def setUpTestData(cls):
+        RaceSchedule.objects.create(date=date.today(), place="桐生", rno=1, start_time=time(23, 59), racelist_url=RACE_URL)
+
+    async def post(self, body):
+        racelist = {"meta": {}, "entries": [], "content_hash": "x"}
+        with mock.patch("today_race_detail.views.get_racelist", return_value=racelist), \
+                mock.patch("today_race_detail.views.get_beforeinfo", return_value={}), \
+                mock.patch("today_race_detail.views._run_race_detail_logic", side_effect=lambda posted, rl: {"mode": "A", **posted}), \
+                mock.patch("today_race_detail.views._run_race_detail_just_logic", side_effect=lambda posted, rl, bi: {"mode": "B", **posted}):
+            return await self.async_client.post("/api/race/detail/", body, content_type="application/json")
+
+    async def test_time_from_schedule(self):
+        res = await self.post({"raceUrl": RACE_URL})
+        self.assertEqual(res.status_code, 200)
+        data = res.json()
+        self.assertEqual((data["time"], data["place"], data["raceNo"]), ("23:59", "桐生", "1R"))
+
+    async def test_time_from_deadline(self):
+        res = await self.post({"raceUrl": RACE_URL, "deadline": "00:00", "place": "桐生"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.json()["time"], res.json()["mode"]), ("00:00", "B"))
+
+    async def test_unknown_race(self):
+        res = await self.post({"raceUrl": RACE_URL.replace("rno=1", "rno=2")})
+        self.assertEqual(res.status_code, 400)
+
+
+@mock.patch.object(live, "_poll_loop", lambda: None)   # 上流には取りに行かない
+class LiveStreamTests(SimpleTestCase):
+    """SSE：接続直後に保持済みのイベントが最初に届き、切断で購読が外れる"""
+
+    EVENT = {"place": "桐生", "rno": 1, "combo": "1-2-3"}
+
+    def setUp(self):
+        live._latest.clear()
+        live._subscribers.clear()
+        live.publish("payout", self.EVENT)
+
+    def tearDown(self):
+        live._latest.clear()
+        live._subscribers.clear()
+
+    def assertFirstEvent(self, chunks):
+        self.assertTrue(chunks[0].startswith("retry:"))
+        self.assertEqual(chunks[1], live.format_event({"event": "payout", "data": self.EVENT}))
+
+    def test_stream(self):
+        body = live.stream(live.subscribe("桐生", 1))
+        self.assertFirstEvent([next(body), next(body)])
+        body.close()
+        self.assertEqual(live._subscribers, [])
+
+    async def test_astream(self):
+        body = live.astream(live.subscribe("桐生", 1))
+        self.assertFirstEvent([await anext(body), await anext(body)])
+        await body.aclose()
+        self.assertEqual(live._subscribers, [])
+
+    def test_view_wsgi(self):
+        res = self.client.get("/api/live/", {"place": "桐生", "rno": "1"})
+        self.assertFalse(res.is_async)
+        body = res.streaming_content
+        self.assertFirstEvent([next(body).decode(), next(body).decode()])
+        res.close()
+
+    async def test_view_asgi(self):
+        """ASGI では非同期イテレータで返す（同期のままだと Django が読み切るまで何も送らない）"""
+        res = await self.async_client.get("/api/live/", {"place": "桐生", "rno": "1"})
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        self.assertTrue(res.is_async)
+        body = res.streaming_content
+        self.assertFirstEvent([(await anext(body)).decode(), (await anext(body)).decode()])
+        await body.aclose()
+
+
+def fixture_race():
+    """保存ページの桐生 1R：racelist の entries に beforeinfo の展示をマージしたものと、A/B 共通の context"""
+    racelist = corpus.load_expected(corpus.FIXTURE_DIR / "racelist" / "桐生_1R.html")
+    beforeinfo = corpus.load_expected(corpus.FIXTURE_DIR / "beforeinfo" / "桐生_1R.html")
+    entries = racelist["entries"]
+    for e in entries:
+        e.update(beforeinfo["before_entries"][str(e["lane"])])
+    return entries, {**racelist["race_meta"], "place": "桐生", **beforeinfo["weather_meta"]}
+
+
+class VectorizedEquivalenceTests(SimpleTestCase):
+    """vectorized.make_feature_tables / _just が通常版の計算機と同じ entries（スコア・内訳）を返す"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        entries, context = fixture_race()
+        missing = copy.deepcopy(entries)
+        del missing[0]["avg_st"]
+        missing[1].update(motor_2r="-", local_win=None, klass="")
+        del missing[2]["exhibit_info"]
+        missing[3]["exhibit_info"].update(exhibit_time=None, course=None, st="F")
+        cls.cases = {
+            "fixture": (entries, context),
+            "4艇": (entries[:4], context),
+            "欠番": ([entries[i] for i in (0, 1, 3, 5)], context),
+            "欠損": (missing, context),
+            "未知の会場・種別": (entries, {**context, "place": "未知", "type": "謎戦", "distance": None}),
+            "会場なし": (entries, {"type": context["type"]}),
+            "強風・高波・低温": (entries, {**context, "wind_speed": 9.0, "wave_height": 12.0, "temperature": 5.0,
+                                     "relative_wind": "向かい風（完全）", "wind_angle": 20}),
+            "横風": (entries, {**context, "wind_speed": 8.0, "relative_wind": "横風（アウト→イン）", "wind_angle": 100}),
+            "横風（逆）": (entries, {**context, "wind_speed": 8.0, "relative_wind": "横風（イン→アウト）", "wind_angle": 270}),
+            "追い風": (entries, {**context, "wind_speed": 7.5, "relative_wind": "斜め追い風（イン→アウト寄り）", "wind_angle": 180}),
+        }
+
+    def assertSameTables(self, scalar, batch):
+        names = list(self.cases)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = [scalar(copy.deepcopy(e), dict(c)) for e, c in self.cases.values()]
+            # 全ケースを1バッチで（レースごとの min/max・補正が混ざらないこと）
+            actual = batch([copy.deepcopy(e) for e, _ in self.cases.values()], [dict(c) for _, c in self.cases.values()])
+        for name, exp, act in zip(names, expected, actual):
+            with self.subTest(name):
+                self.assertEqual(act, exp)
+
+    def test_a(self):
+        self.assertSameTables(make_feature_table, vectorized.make_feature_tables)
+
+    def test_b(self):
+        self.assertSameTables(make_feature_table_just, vectorized.make_feature_tables_just)
+
+
+class ParallelScoringTests(TestCase):
+    """まとめ計算：同時に計算しても各レースの context（風・波など）が混ざらない"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        entries, context = fixture_race()
+        cls.entries, cls.context = entries, context
+        winds = ("向かい風（完全）", "追い風（完全）", "横風（アウト→イン）", "横風（イン→アウト）", None)
+        cls.jobs = [
+            (copy.deepcopy(entries), {**context, "wind_speed": float(i % 10), "wave_height": float(i * 3 % 15),
+                       "wind_angle": i * 37 % 360, "temperature": 5.0 + i, "relative_wind": winds[i % len(winds)]})
+            for i in range(24)
+        ]
+
+    def score(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return make_feature_tables_just_parallel(copy.deepcopy(self.jobs), **kwargs)
+
+    def test_threads_match_sequential(self):
+        expected = self.score(max_workers=1)
+        self.assertGreater(len({str(e) for e in expected}), len(expected) // 2)   # context でスコアが変わる
+        self.assertEqual(self.score(max_workers=4, use_processes=False), expected)
+
+    def test_processes_match_sequential(self):
+        self.assertEqual(self.score(max_workers=2, chunksize=5), self.score(max_workers=1))
+
+    def test_predict_races_scores_in_one_batch(self):
+        """bulk.predict_races は全レースを1回でスコア付けし、1レースずつの API と同じ結果を返す"""
+        racelist = {
+            "meta": corpus.load_expected(corpus.FIXTURE_DIR / "racelist" / "桐生_1R.html")["race_meta"],
+            "entries": [{k: v for k, v in e.items() if k != "exhibit_info"} for e in self.entries],
+            "content_hash": "fixture",
+        }
+        beforeinfo = corpus.load_expected(corpus.FIXTURE_DIR / "beforeinfo" / "桐生_1R.html")
+        beforeinfo["before_entries"] = {int(k): v for k, v in beforeinfo["before_entries"].items()}
+        races = [
+            {"raceUrl": f"{RACE_URL}&n={i}", "place": "桐生", "raceNo": f"{i}R", "time": t}
+            for i, t in enumerate(("23:59", "00:00", "23:58"), start=1)
+        ]
+        now = datetime.combine(date.today(), time(12, 0))
+        with mock.patch.object(bulk, "load_racelist", side_effect=lambda url: copy.deepcopy(racelist)), \
+                mock.patch.object(bulk, "load_beforeinfo", side_effect=lambda url: copy.deepcopy(beforeinfo)), \
+                mock.patch.object(bulk, "crawl", return_value=({}, {})), \
+                mock.patch.object(bulk, "make_feature_tables_just_parallel",
+                                  wraps=make_feature_tables_just_parallel) as batch, \
+                contextlib.redirect_stdout(io.StringIO()):
+            result = bulk.predict_races(races, now=now)
+            expected = [
+                views._run_race_detail_logic(dict(races[0]), copy.deepcopy(racelist)),
+                {**views._run_race_detail_just_logic(dict(races[1]), copy.deepcopy(racelist), copy.deepcopy(beforeinfo)),
+                 "mode": "B"},
+                views._run_race_detail_logic(dict(races[2]), copy.deepcopy(racelist)),
+            ]
+        self.assertEqual(batch.call_count, 1)
+        self.assertEqual(len(batch.call_args.args[0]), 3)
+        self.assertEqual(result["errors"], [])
+        self.assertEqual(result["races"], expected)
+
+
+def scored(*scores):
+    """枠番 1〜n にスコアを付けた entries"""
+    return [{"lane": lane, "score": score} for lane, score in enumerate(scores, start=1)]
+
+
+def old_reference_trifecta(entries, points=10):
+    """買い目エンジン以前の参考3連単（views.run_race_predict_logic にあったもの）"""
+    sorted_entries = sorted(entries, key=lambda e: e.get("score", 0), reverse=True)
+    lanes = [e["lane"] for e in sorted_entries[:6]]
+    combos = list(permutations(lanes, 3))
+    score_map = {e["lane"]: e["score"] for e in sorted_entries}
+    combos.sort(key=lambda t: score_map[t[0]] + score_map[t[1]] + score_map[t[2]], reverse=True)
+    return [f"{a}-{b}-{c}" for a, b, c in combos[:points]]
+
+
+class TicketTests(SimpleTestCase):
+    ENTRIES = scored(60, 50, 40, 30, 20, 10)
+
+    def count(self, bet_type, method, **kwargs):
+        return len(tickets.make_tickets(self.ENTRIES, bet_type, method, **kwargs))
+
+    def test_box_counts(self):
+        expected = {
+            "3box": {"trifecta": 6, "trio": 1, "exacta": 6, "quinella": 3, "win": 3, "place": 3},
+            "4box": {"trifecta": 24, "trio": 4, "exacta": 12, "quinella": 6, "win": 4, "place": 4},
+            "5box": {"trifecta": 60, "trio": 10, "exacta": 20, "quinella": 10, "win": 5, "place": 5},
+        }
+        for method, counts in expected.items():
+            for bet_type, n in counts.items():
+                with self.subTest(method=method, bet_type=bet_type):
+                    self.assertEqual(self.count(bet_type, method), n)
+
+    def test_axle_counts(self):
+        # 相手は軸以外すべて（1軸は5艇、2軸は4艇）
+        expected = {
+            "1axle": {"trifecta": 20, "trio": 10, "exacta": 5, "quinella": 5, "win": 1, "place": 1},
+            "2axle": {"trifecta": 8, "trio": 4, "exacta": 2, "quinella": 1},
+        }
+        for method, counts in expected.items():
+            for bet_type, n in counts.items():
+                with self.subTest(method=method, bet_type=bet_type):
+                    self.assertEqual(self.count(bet_type, method), n)
+        self.assertEqual(self.count("trifecta", "1axle", rivals=3), 6)
+        self.assertEqual(self.count("trio", "2axle", rivals=2), 2)
+
+    def test_axle_axis(self):
+        self.assertEqual(tickets.make_tickets(self.ENTRIES, "exacta", "1axle", axis="3", rivals=2), ["3-1", "3-2"])
+        self.assertEqual(tickets.make_tickets(self.ENTRIES, "exacta", "2axle", axis=["4", 6]), ["4-6", "6-4"])
+        # 軸の指定が足りなければスコア上位から
+        self.assertEqual(tickets.make_tickets(self.ENTRIES, "quinella", "2axle", axis=5), ["1=5"])
+
+    def test_formation(self):
+        self.assertEqual(self.count("trifecta", "formation"), 6)   # 上位1 / 上位3 / 上位5
+        self.assertEqual(
+            tickets.make_tickets(self.ENTRIES, "trifecta", "formation", formation=[["1"], "2,3", [2, 3, 4]]),
+            ["1-2-3", "1-3-2", "1-2-4", "1-3-4"],
+        )
+        self.assertEqual(
+            tickets.make_tickets(self.ENTRIES, "trio", "formation", formation=[[1, 2], [1, 2], [3]]), ["1=2=3"],
+        )
+        with self.assertRaises(ValueError):
+            tickets.make_tickets(self.ENTRIES, "trifecta", "formation", formation=[[1], [2]])
+
+    def test_labels(self):
+        for label, code in tickets.BET_TYPE_LABELS.items():
+            with self.subTest(label):
+                self.assertEqual(tickets.make_tickets(self.ENTRIES, label, "通常"),
+                                 tickets.make_tickets(self.ENTRIES, code, "normal"))
+        for label, code in tickets.METHOD_LABELS.items():
+            with self.subTest(label):
+                self.assertEqual(tickets.make_tickets(self.ENTRIES, "3連単", label),
+                                 tickets.make_tickets(self.ENTRIES, "trifecta", code))
+        with self.assertRaises(ValueError):
+            tickets.normalize_bet_type("4連単")
+        with self.assertRaises(ValueError):
+            tickets.normalize_method("6艇ボックス")
+
+    def test_rivals_for_points(self):
+        self.assertEqual(tickets.rivals_for_points("1axle", "trifecta", 6), 3)
+        self.assertEqual(tickets.rivals_for_points("1軸流し", "3連単", 7), 4)
+        self.assertEqual(tickets.rivals_for_points("1axle", "trio", 3), 3)
+        self.assertEqual(tickets.rivals_for_points("1axle", "exacta", 2), 2)
+        self.assertEqual(tickets.rivals_for_points("2axle", "trifecta", 6), 3)
+        self.assertEqual(tickets.rivals_for_points("2axle", "quinella", 1), 1)
+        self.assertIsNone(tickets.rivals_for_points("1axle", "trifecta", 100))
+        self.assertIsNone(tickets.rivals_for_points("1axle", "trifecta", None))
+        self.assertIsNone(tickets.rivals_for_points("3box", "trifecta", 6))
+
+    def test_tickets_from_request(self):
+        data = {"betType": "3連単", "method": "1軸流し", "points": "6", "rivalCount": "", "axis": "2"}
+        self.assertEqual(tickets.tickets_from_request(self.ENTRIES, data),
+                         ["2-1-3", "2-3-1", "2-1-4", "2-4-1", "2-3-4", "2-4-3"])
+        data["rivalCount"] = "2"
+        self.assertEqual(len(tickets.tickets_from_request(self.ENTRIES, data)), 2)
+        self.assertIsNone(tickets.tickets_from_request(self.ENTRIES, {}))
+
+    def test_normal_matches_old_reference_picks(self):
+        rng = random.Random(0)
+        cases = [self.ENTRIES, scored(50, 50, 40, 40, 30, 30), scored(10, 20, 30, 40, 50, 60), scored(3, 2, 1, 9)]
+        cases += [scored(*(rng.choice((1.5, 2.5, 3.5, 40.0, 41.2)) for _ in range(6))) for _ in range(200)]
+        for entries in cases:
+            for points in (1, 10, 120):
+                self.assertEqual(tickets.make_tickets(entries, "trifecta", "normal", points=points),
+                                 old_reference_trifecta(entries, points))
+
+
+class ProbabilityTests(SimpleTestCase):
+    """着順確率：各式別の確率の和が 1、欠艇を含む組は 0"""
+
+    RACES = [
+        scored(60, 50, 40, 30, 20, 10),
+        scored(55, 55, 55, 55, 55, 55),
+        scored(900, -900, 0, 1e6, 3, 4),                                   # 極端な差でも NaN にしない
+        [{"lane": 1, "score": 50}, {"lane": 3, "score": 40}, {"lane": 6, "score": 45}, {"lane": 4, "score": None}],
+        [{"lane": "2", "score": 30}, {"lane": 5, "score": 31}, {"lane": 7, "score": 99}, {"lane": "-", "score": 1}],
+    ]
+    ABSENT = [set(), set(), set(), {2, 4, 5}, {1, 3, 4, 6}]   # 欠艇・パディング・スコアなしの枠番
+
+    def setUp(self):
+        self.probs = probability.finish_probabilities(probability.scores_matrix(self.RACES))
+
+    def test_sums_to_one(self):
+        for bet_type in ("win", "exacta", "quinella", "trifecta", "trio"):
+            for r, absent in enumerate(self.ABSENT):
+                needed = {"win": 1, "exacta": 2, "quinella": 2, "trifecta": 3, "trio": 3}[bet_type]
+                if 6 - len(absent) < needed:
+                    continue
+                with self.subTest(bet_type=bet_type, race=r):
+                    row = self.probs[bet_type][r]
+                    self.assertFalse(np.isnan(row).any())
+                    self.assertAlmostEqual(row.sum(), 1.0, places=9)
+
+    def test_absent_boats_are_zero(self):
+        for bet_type, labels in probability.LABELS.items():
+            for r, absent in enumerate(self.ABSENT):
+                for label, prob in zip(labels, self.probs[bet_type][r]):
+                    if {int(x) for x in label.replace("=", "-").split("-")} & absent:
+                        with self.subTest(bet_type=bet_type, race=r, label=label):
+                            self.assertEqual(prob, 0.0)
+
+    def test_two_boats(self):
+        """2艇しかいなければ 2連単・2連複は埋まり、3連単・3連複は全部 0"""
+        probs = probability.finish_probabilities(probability.scores_matrix([scored(None, 10, None, None, 20)]))
+        self.assertAlmostEqual(probs["exacta"][0].sum(), 1.0)
+        self.assertEqual(probs["trifecta"][0].sum(), 0.0)
+        self.assertEqual(probs["trio"][0].sum(), 0.0)
+
+    def test_order_follows_score(self):
+        ranked = list(probability.race_probabilities(self.RACES[0], "trifecta"))
+        self.assertEqual(ranked[0], "1-2-3")
+        self.assertEqual(len(probability.race_probabilities(self.RACES[3], "trio")), 1)   # 1=3=6 だけ
+
+    def test_expected_values(self):
+        probs = self.probs["win"][:2]
+        odds = np.array([[2.0, np.nan, 0.0, 5.5, 10.0, 30.0], [1.5] * 6])
+        ev = probability.expected_values(probs, odds)
+        self.assertEqual(ev.shape, probs.shape)
+        self.assertEqual((ev[0, 1], ev[0, 2]), (0.0, 0.0))
+        np.testing.assert_allclose(ev[0, [0, 3, 4, 5]], probs[0, [0, 3, 4, 5]] * [2.0, 5.5, 10.0, 30.0])
+        np.testing.assert_allclose(ev[1], probs[1] * 1.5)
+        self.assertFalse(np.isnan(probability.expected_values(probs, [[np.nan] * 6] * 2)).any())
@@ -1,25 +1,28 @@
 # today_race_detail/views.py
+import asyncio
 import json
 import os
 from datetime import datetime
 
-import requests
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from requests.adapters import HTTPAdapter, Retry
-
-from .extractors.race_meta import extract_race_meta_from_html
-from .extractors.entry_table import extract_entries_from_racelist_html
-from .extractors.entry_table_just import (
-    extract_entries_from_racelist_just_html,
-    extract_weather_meta_from_html,
-    extract_before_entries_from_html,
-)
+
+from .prefetch import get_racelist, get_beforeinfo
+from .odds import latest_odds
+from . import live
 from today_race_detail.features.feature_calculator_a import make_feature_table
 from today_race_detail.features.feature_calculator_b import make_feature_table_just
+from today_race_detail.features.base_cache import get_base_components
+from today_race_detail.features.tickets import make_tickets, tickets_from_request
+from history import equipment, racers
+from today_races.schedule import find_by_url, rno_to_int
 
 TEST_MODE = True  # ★ テストするときだけ True、本番は False
 
+B_MODE_MINUTES = 15  # 締切まで何分以内なら B（直前）モードか
+
 
 # ==========================================================
 # A/B 共通：racelist → meta / entries 抽出 → 時間で分岐
@@ -31,6 +34,130 @@ def get_race_detail(request):
     # ---------------------------
     # ① posted の取得
     # ---------------------------
+    posted, error = _read_posted(request)
+    if error:
+        return error
+
+    race_url = posted.get("raceUrl")
+
+    # ---------------------------
+    # ② racelist（先読み済みならそれ、無ければ取得してパース）
+    # ---------------------------
+    racelist = get_racelist(race_url)
+
+    # ---------------------------
+    # ③ A/B 時間判定
+    # ---------------------------
+    diff_min = _minutes_to_deadline(posted.get("time"))
+
+    # ---------------------------
+    # A：15分以上前（事前）
+    # ---------------------------
+    if diff_min > B_MODE_MINUTES:
+        result = _run_race_detail_logic(posted, racelist)
+        return JsonResponse(result, safe=False)
+
+    # ---------------------------
+    # B：15分以内（直前）
+    # ---------------------------
+    result = _run_race_detail_just_logic(posted, racelist, get_beforeinfo(race_url))
+    return JsonResponse(result, safe=False)
+
+
+# ==========================================================
+# 非同期版：B モードでは racelist と beforeinfo を同時に取得
+# ==========================================================
+@csrf_exempt
+async def get_race_detail_async(request):
+    print("✅ レース情報取得開始（非同期：A/B前処理）")
+
+    # time が無いときは予定表（ORM）を引くので、同期側で読む
+    posted, error = await sync_to_async(_read_posted)(request)
+    if error:
+        return error
+
+    race_url = posted.get("raceUrl")
+    diff_min = _minutes_to_deadline(posted.get("time"))
+
+    # --- A：racelist だけ取得 → スコアはスレッドで ---
+    if diff_min > B_MODE_MINUTES:
+        racelist = await asyncio.to_thread(get_racelist, race_url)
+        result = await asyncio.to_thread(_run_race_detail_logic, posted, racelist)
+        return JsonResponse(result, safe=False)
+
+    # --- B：racelist / beforeinfo を並列取得（beforeinfo URL は racelist URL から決まる） ---
+    racelist, beforeinfo = await asyncio.gather(
+        asyncio.to_thread(get_racelist, race_url),
+        asyncio.to_thread(get_beforeinfo, race_url),
+    )
+    result = await asyncio.to_thread(_run_race_detail_just_logic, posted, racelist, beforeinfo)
+    return JsonResponse(result, safe=False)
+
+
+# ==========================================================
+# ライブ更新（SSE）：?place=桐生&rno=12 で会場 / レースに絞る（無指定は全会場）
+# ==========================================================
+def live_stream(request):
+    place = request.GET.get("place") or None
+    rno = request.GET.get("rno") or None
+    if rno is not None:
+        try:
+            rno = rno_to_int(rno)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        if place is None:
+            return JsonResponse({"error": "rno を指定するときは place も必要です"}, status=400)
+
+    try:
+        sub = live.subscribe(place, rno)
+    except live.TooManySubscribers as e:
+        return JsonResponse({"error": str(e)}, status=503)
+
+    print(f"📡 ライブ購読: {place or '全会場'} {f'{rno}R' if rno else ''}")
+    # ASGI では非同期イテレータでないと流れない（同期のままだと最後まで読み切ろうとして何も送らない）
+    body = live.astream(sub) if isinstance(request, ASGIRequest) else live.stream(sub)
+    response = StreamingHttpResponse(body, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"   # nginx でバッファさせない
+    return response
+
+
+# ==========================================================
+# まとめ予想：会場 or 1日分の全レースを1回で返す
+# ==========================================================
+@csrf_exempt
+def get_races_bulk(request):
+    from today_races.views import get_today_sites
+    from .bulk import collect_races, predict_races
+
+    if request.method == "POST":
+        try:
+            params = json.loads(request.body or b"{}")
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "JSON が不正です"}, status=400)
+    else:
+        params = request.GET
+
+    place = params.get("place") or None
+    races = collect_races(get_today_sites(), place)
+    if place and not races:
+        return JsonResponse({"error": f"{place} のレースがありません"}, status=404)
+
+    print(f"📚 まとめ予想開始: {place or '全会場'} {len(races)} レース")
+    result = predict_races(races)
+
+    return JsonResponse({
+        "place": place,
+        "count": len(result["races"]),
+        **result,
+    }, safe=False)
+
+
+# ==========================================================
+# 共通の前処理
+# ==========================================================
+def _read_posted(request):
+    """POST の JSON を読む。返り値: (posted, エラー時の JsonResponse)"""
     if request.method != "POST":
         if TEST_MODE:
             print("⚠️ テストモード：固定データで処理します")
@@ -41,131 +168,85 @@ def get_race_detail(request):
                 "time": "22:41",
             }
         else:
-            return JsonResponse({"error": "POSTだけです"}, status=400)
+            return None, JsonResponse({"error": "POSTだけです"}, status=400)
     else:
         try:
             posted = json.loads(request.body)
         except json.JSONDecodeError:
-            return JsonResponse({"error": "JSON が不正です"}, status=400)
-
-    race_url = posted.get("raceUrl")
-    race_time_str = posted.get("time")
-
-    if not race_url:
-        return JsonResponse({"error": "raceUrl がありません"}, status=400)
-    if not race_time_str:
-        return JsonResponse({"error": "time がありません"}, status=400)
+            return None, JsonResponse({"error": "JSON が不正です"}, status=400)
 
-    # ---------------------------
-    # ② racelist HTML 取得（ここだけで1回だけ）
-    # ---------------------------
-    session = requests.Session()
-    retry = Retry(connect=3, read=3, backoff_factor=1.0)
-    session.mount("https://", HTTPAdapter(max_retries=retry))
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Referer": "https://www.boatrace.jp/",
-        "Accept-Language": "ja",
-    }
-
-    res = session.get(race_url, headers=headers, timeout=20)
-    res.raise_for_status()
-    html = res.text
-
-    # ---------------------------
-    # ③ meta / entries 抽出
-    # ---------------------------
-    meta = extract_race_meta_from_html(html, race_url)
-    trimmed_meta = {
-        "date_text": meta.get("date_text"),
-        "day_text": meta.get("day_text"),
-        "type": meta.get("type"),
-        "distance": meta.get("distance"),
-    }
+    if not posted.get("raceUrl"):
+        return None, JsonResponse({"error": "raceUrl がありません"}, status=400)
+    if not posted.get("time") and posted.get("deadline"):
+        posted["time"] = posted["deadline"]   # 予想画面は締切を deadline で送ってくる
+    if not posted.get("time"):
+        # 画面から time が来なければ予定表から引く
+        race = find_by_url(posted["raceUrl"])
+        if not race or not race.start_time:
+            return None, JsonResponse({"error": "time がありません"}, status=400)
+        posted["time"] = race.time_text
+        posted.setdefault("place", race.place)
+        posted.setdefault("raceNo", f"{race.rno}R")
 
-    # A 用（通常）
-    entries_for_a = extract_entries_from_racelist_html(html)
+    return posted, None
 
-    # B 用（直前版）
-    entries_for_b = extract_entries_from_racelist_just_html(html)
 
-    # ---------------------------
-    # ④ A/B 時間判定
-    # ---------------------------
+def _minutes_to_deadline(race_time_str):
     now = datetime.now()
     today_str = now.strftime("%Y-%m-%d")
     race_dt = datetime.strptime(f"{today_str} {race_time_str}", "%Y-%m-%d %H:%M")
     diff_min = (race_dt - now).total_seconds() / 60
 
     print(f"⏱ 現在: {now}, レース: {race_dt}, diff_min = {diff_min:.2f}")
+    return diff_min
 
-    # ---------------------------
-    # A：15分以上前（事前）
-    # ---------------------------
-    if diff_min > 15:
-        print("🟢 Aモード（事前予想）")
-
-        context = {
-            "place": posted.get("place"),
-            "distance": trimmed_meta.get("distance"),
-            "type": trimmed_meta.get("type"),
-        }
 
-        # 事前スコア付与
-        scored_entries = make_feature_table(entries_for_a, context)
+# ==========================================================
+# A専用：racelist だけで事前スコア → 買い目
+# ==========================================================
+def _run_race_detail_logic(posted, racelist):
+    print("🟢 Aモード（事前予想）")
 
-        # B と同じ構造に合わせる
-        full_data = {**posted, **trimmed_meta, "entries": scored_entries}
+    # B と同じ買い目ロジックへ
+    result = run_race_predict_logic(_race_detail_data(posted, racelist), racelist.get("content_hash"))
+    result["mode"] = "A"
+    return result
 
-        # B と同じ買い目ロジックへ
-        result = run_race_predict_logic(full_data)
-        result["mode"] = "A"
 
-        return JsonResponse(result, safe=False)
+def _race_detail_data(posted, racelist):
+    """A：出走表に事前スコアを付けて、B と同じ構造（full_data）にする"""
+    trimmed_meta = racelist["meta"]
+    _enrich(racelist["entries"], posted.get("place"))
 
-    # ---------------------------
-    # B：15分以内（直前）
-    # ---------------------------
-    print("🔵 Bモード（直前予想）")
+    context = {
+        "place": posted.get("place"),
+        "distance": trimmed_meta.get("distance"),
+        "type": trimmed_meta.get("type"),
+    }
 
-    result = _run_race_detail_just_logic(
-        posted=posted,
-        trimmed_meta=trimmed_meta,
-        entries=entries_for_b,
-    )
-    return JsonResponse(result, safe=False)
+    # 事前スコア付与
+    scored_entries = make_feature_table(racelist["entries"], context)
 
+    # B と同じ構造に合わせる
+    return {**posted, **trimmed_meta, "entries": scored_entries}
 
 
 # ==========================================================
 # B専用：beforeinfo / weather をマージして買い目10点へ
 # ==========================================================
-def _run_race_detail_just_logic(posted, trimmed_meta, entries):
-
-    race_url = posted.get("raceUrl")
-
-    # --- beforeinfo ---
-    session = requests.Session()
-    retry = Retry(connect=3, read=3, backoff_factor=1.0)
-    session.mount("https://", HTTPAdapter(max_retries=retry))
-    headers = {"User-Agent": "Mozilla/5.0", "Referer": "https://www.boatrace.jp/", "Accept-Language": "ja"}
-
-    beforeinfo_url = race_url.replace("racelist", "beforeinfo")
+def _run_race_detail_just_logic(posted, racelist, beforeinfo):
+    print("🔵 Bモード（直前予想）")
 
-    weather_meta = {}
-    before_entries = {}
+    # --- 直前ロジック（買い目10点）：基礎部分は racelist 単位で使い回す ---
+    return run_race_predict_logic(_race_detail_just_data(posted, racelist, beforeinfo), racelist.get("content_hash"))
 
-    try:
-        res2 = session.get(beforeinfo_url, headers=headers, timeout=20)
-        res2.raise_for_status()
-        before_html = res2.text
 
-        if before_html.strip() and "該当するレース情報はありません" not in before_html:
-            weather_meta = extract_weather_meta_from_html(before_html)
-            before_entries = extract_before_entries_from_html(before_html)
-    except Exception as e:
-        before_entries = {}
-        weather_meta = {}
+def _race_detail_just_data(posted, racelist, beforeinfo):
+    """B：出走表に直前展示・気象をマージした full_data"""
+    trimmed_meta = racelist["meta"]
+    entries = _enrich(racelist["entries"], posted.get("place"))
+    weather_meta = beforeinfo.get("weather_meta", {})
+    before_entries = beforeinfo.get("before_entries", {})
 
     # --- entries に直前展示情報を統合 ---
     for e in entries:
@@ -174,70 +255,75 @@ def _run_race_detail_just_logic(posted, trimmed_meta, entries):
             e.update(before_entries[lane])
 
     # --- full データにまとめる ---
-    full_data = {**posted, **trimmed_meta, **weather_meta, "entries": entries}
+    return {**posted, **trimmed_meta, **weather_meta, "entries": entries}
 
-    # --- 直前ロジック（買い目10点） ---
-    return run_race_predict_logic(full_data)
 
 
+def _enrich(entries, place):
+    """選手マスタ・モーター/ボート成績で出走表の欠損を補う（引けなくても予想は続ける）"""
+    try:
+        racers.enrich_entries(entries, place)
+        equipment.enrich_entries(entries, place)
+    except Exception as e:
+        print(f"⚠️ 選手・モーター成績を参照できません: {e}")
+    return entries
+
 
 # スコア順の3連単10点
-def run_race_predict_logic(data):
+def run_race_predict_logic(data, racelist_hash=None):
     """
     直前データにスコア付与 → 参考3連単10点 → return data
     A/B どちらからも使える “共通ロジック” として配置
+    racelist_hash があれば、展示に依存しない基礎部分はキャッシュから使う
     """
 
     try:
         print("💥 直前ロジック開始")
+        entries, context, base_components = predict_job(data, racelist_hash)
+        return finish_race_predict(data, make_feature_table_just(entries, context, base_components))
 
-        # ---------------------------
-        # entries + context
-        # ---------------------------
-        entries = data.get("entries", [])
-        context = {
-            "place": data.get("place"),
-            "distance": data.get("distance"),
-            "type": data.get("type"),
-        }
-
-        # ---------------------------
-        # スコア付与（直前）
-        # ---------------------------
-        new_entries = make_feature_table_just(entries, context)
-        data["entries"] = new_entries
-
-        # ---------------------------
-        # 参考3連単10点 作成
-        # ---------------------------
-        def make_reference_trifecta(entries, points=10):
-            if not entries or len(entries) < 3:
-                return []
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
 
-            from itertools import permutations
 
-            # スコア順
-            sorted_entries = sorted(entries, key=lambda e: e.get("score", 0), reverse=True)
+def predict_job(data, racelist_hash=None):
+    """
+    スコア付け（直前）の入力：(entries, context, base_components)
+    まとめ予想（bulk.predict_races）は全レース分をまとめて make_feature_tables_just_parallel に渡す
+    """
+    entries = data.get("entries", [])
+    context = {
+        "place": data.get("place"),
+        "distance": data.get("distance"),
+        "type": data.get("type"),
+    }
+    base_components = get_base_components(racelist_hash, entries) if entries else None
+    return entries, context, base_components
 
-            # 上位6艇
-            lanes = [e["lane"] for e in sorted_entries[:6]]
-            combos = list(permutations(lanes, 3))
 
-            # スコア合計でソート
-            score_map = {e["lane"]: e["score"] for e in sorted_entries}
-            combos.sort(
-                key=lambda t: score_map[t[0]] + score_map[t[1]] + score_map[t[2]],
-                reverse=True,
-            )
+def finish_race_predict(data, new_entries):
+    """スコア付け済みの entries → 参考3連単10点・オッズ・指定の買い目を付けて data を返す"""
+    data["entries"] = new_entries
 
-            return [f"{a}-{b}-{c}" for a, b, c in combos[:points]]
+    # ---------------------------
+    # 参考3連単10点（スコア合計順）
+    # ---------------------------
+    data["reference_picks"] = make_tickets(new_entries, "trifecta", "normal", points=10)
 
-        # 参考買い目セット
-        data["reference_picks"] = make_reference_trifecta(new_entries, points=10)
+    # 保存済みの最新オッズがあれば参考買い目に付ける（ここではスクレイピングしない）
+    if data.get("raceUrl"):
+        trifecta_odds = latest_odds(data["raceUrl"], ("odds3t",)).get("trifecta")
+        if trifecta_odds:
+            data["reference_odds"] = {t: trifecta_odds.get(t) for t in data["reference_picks"]}
 
-        return data
+    # 画面で式別・方式が指定されていればその買い目も付ける
+    try:
+        tickets = tickets_from_request(new_entries, data)
+        if tickets is not None:
+            data["tickets"] = tickets
+    except ValueError as e:
+        data["tickets_error"] = str(e)
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {"error": str(e)}
\ No newline at end of file
+    return data
@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import DailyRaceCache
+from .models import DailyRaceCache, RaceSchedule
 
-admin.site.register(DailyRaceCache)
\ No newline at end of file
+admin.site.register(DailyRaceCache)
+admin.site.register(RaceSchedule)
@@ -0,0 +1,45 @@
+# today_races/crawler.py
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Tuple
+import logging
+
+from scraping.http_client import fetch_text
+
+logger = logging.getLogger(__name__)
+
+# 同時接続数の上限（boatrace.jp / tenki.jp に負荷をかけすぎない程度）
+MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 20
+
+
+def crawl(urls: Iterable[str], max_workers: int = MAX_WORKERS,
+          timeout: int = DEFAULT_TIMEOUT, use_cache: bool = True) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    URL 群を並列に取得する。
+    - 同じ URL は 1回だけ取得する
+    - 同時実行数は max_workers で制限
+    - use_cache=False ならディスクキャッシュを読まず書かない（過去日のアーカイブ用）
+    返り値: (pages, errors)
+      pages  = { url: html }
+      errors = { url: "エラー内容" }
+    """
+    unique_urls = list(dict.fromkeys(u for u in urls if u))
+    pages: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+
+    if not unique_urls:
+        return pages, errors
+
+    workers = max(1, min(max_workers, len(unique_urls)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_text, url, timeout, use_cache=use_cache): url for url in unique_urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                pages[url] = future.result()
+            except Exception as e:
+                errors[url] = str(e)
+                logger.warning(f"[crawler] 取得失敗 {url}: {e}")
+
+    return pages, errors
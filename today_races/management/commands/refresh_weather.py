@@ -0,0 +1,20 @@
+# today_races/management/commands/refresh_weather.py
+from django.core.management.base import BaseCommand
+
+from today_races.weather import WEATHER_URL_DEFAULTS, refresh_weather
+
+
+class Command(BaseCommand):
+    help = "tenki.jp の1時間予報を会場ごとに並列取得して DB に保存する（cron 用）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("places", nargs="*", help="対象会場（省略時は全会場）")
+        parser.add_argument("--force", action="store_true", help="TTL 内でも取り直す")
+
+    def handle(self, *args, **opts):
+        places = opts["places"] or list(WEATHER_URL_DEFAULTS.keys())
+        failures = refresh_weather(places, force=opts["force"])
+
+        for place, reason in failures.items():
+            self.stderr.write(f"⚠️ {place}: {reason}")
+        self.stdout.write(self.style.SUCCESS(f"🌤 予報更新: {len(places) - len(failures)}/{len(places)} 会場"))
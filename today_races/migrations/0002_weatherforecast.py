@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('today_races', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('place', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('weather', models.CharField(blank=True, max_length=20)),
+                ('direction', models.CharField(blank=True, max_length=20)),
+                ('speed', models.IntegerField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'place'], name='today_races_date_6be9f3_idx')],
+                'constraints': [models.UniqueConstraint(fields=('place', 'date', 'hour'), name='uniq_weather_place_date_hour')],
+            },
+        ),
+    ]
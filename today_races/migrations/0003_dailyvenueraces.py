@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('today_races', '0002_weatherforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyVenueRaces',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('place', models.CharField(max_length=20)),
+                ('order', models.PositiveSmallIntegerField(default=0)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('raceindex_url', models.URLField(blank=True, max_length=300)),
+                ('races_json', models.TextField(default='[]')),
+                ('status', models.CharField(choices=[('pending', '未取得'), ('ok', '取得済み'), ('error', '失敗')], default='pending', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'status'], name='today_races_date_68dace_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'place'), name='uniq_venue_races_date_place')],
+            },
+        ),
+    ]
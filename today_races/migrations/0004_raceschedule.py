@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('today_races', '0003_dailyvenueraces'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RaceSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('place', models.CharField(max_length=20)),
+                ('rno', models.PositiveSmallIntegerField()),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('racelist_url', models.URLField(blank=True, max_length=300)),
+                ('raceindex_url', models.URLField(blank=True, max_length=300)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'start_time'], name='idx_schedule_date_time'), models.Index(fields=['racelist_url'], name='idx_schedule_racelist_url')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'place', 'rno'), name='uniq_schedule_date_place_rno')],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from datetime import date, timedelta
 from django.db import models
 from django.utils import timezone
 import json
@@ -9,13 +10,125 @@ class DailyRaceCache(models.Model):
 
     @classmethod
     def get_today(cls):
-        today = timezone.localdate()
+        today = date.today()
         obj, created = cls.objects.get_or_create(date=today)
         return obj
 
     @classmethod
     def save_today(cls, data_dict):
-        today = timezone.localdate()
+        today = date.today()
         text = json.dumps(data_dict, ensure_ascii=False)
         obj, _ = cls.objects.update_or_create(date=today, defaults={"json_text": text})
-        return obj
\ No newline at end of file
+        return obj
+
+
+class WeatherForecast(models.Model):
+    """tenki.jp の1時間予報（会場 × 日付 × 時）"""
+    place = models.CharField(max_length=20)
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    weather = models.CharField(max_length=20, blank=True)
+    direction = models.CharField(max_length=20, blank=True)
+    speed = models.IntegerField(null=True, blank=True)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["place", "date", "hour"], name="uniq_weather_place_date_hour"),
+        ]
+        indexes = [
+            models.Index(fields=["date", "place"]),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.place} {self.hour}時 {self.weather}"
+
+
+
+class DailyVenueRaces(models.Model):
+    """1日 × 1会場 のレース一覧（会場ごとに取得状態を持ち、失敗した会場だけ取り直す）"""
+    STATUS_PENDING = "pending"
+    STATUS_OK = "ok"
+    STATUS_ERROR = "error"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "未取得"),
+        (STATUS_OK, "取得済み"),
+        (STATUS_ERROR, "失敗"),
+    ]
+
+    # 失敗した会場を取り直すまでの間隔 / 取得済みでも取り直す間隔
+    RETRY_INTERVAL = timedelta(minutes=1)
+    STALE_AFTER = timedelta(hours=6)
+
+    date = models.DateField()
+    place = models.CharField(max_length=20)
+    order = models.PositiveSmallIntegerField(default=0)
+    title = models.CharField(max_length=200, blank=True)
+    raceindex_url = models.URLField(max_length=300, blank=True)
+    races_json = models.TextField(default="[]")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.TextField(blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "place"], name="uniq_venue_races_date_place"),
+        ]
+        indexes = [
+            models.Index(fields=["date", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.place} ({self.status})"
+
+    @property
+    def races(self):
+        return json.loads(self.races_json or "[]")
+
+    def needs_refresh(self, now=None) -> bool:
+        now = now or timezone.now()
+        if self.fetched_at is None:
+            return True
+        age = now - self.fetched_at
+        if self.status != self.STATUS_OK or not self.races:
+            return age >= self.RETRY_INTERVAL
+        return age >= self.STALE_AFTER
+
+    def to_site(self) -> dict:
+        return {
+            "place": self.place,
+            "title": self.title,
+            "raceindex_url": self.raceindex_url,
+            "races": self.races,
+        }
+
+
+class RaceSchedule(models.Model):
+    """
+    1日 × 1会場 × 1R の予定（締切時刻・URL）。
+    DailyVenueRaces の races_json を開かずに、会場+R や racelist URL で1行引けるようにしたもの。
+    """
+    date = models.DateField()
+    place = models.CharField(max_length=20)
+    rno = models.PositiveSmallIntegerField()
+    start_time = models.TimeField(null=True, blank=True)   # 締切予定時刻
+    racelist_url = models.URLField(max_length=300, blank=True)
+    raceindex_url = models.URLField(max_length=300, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "place", "rno"], name="uniq_schedule_date_place_rno"),
+        ]
+        indexes = [
+            models.Index(fields=["date", "start_time"], name="idx_schedule_date_time"),
+            models.Index(fields=["racelist_url"], name="idx_schedule_racelist_url"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.place} {self.rno}R {self.start_time or ''}"
+
+    @property
+    def time_text(self) -> str:
+        """"15:42"（DailyRaceCache の time と同じ形）"""
+        return self.start_time.strftime("%H:%M") if self.start_time else ""
@@ -0,0 +1,89 @@
+# today_races/schedule.py
+"""
+RaceSchedule（日付 × 会場 × R の締切時刻・URL）の書き込みと引き方。
+
+get_today_sites で会場のレース一覧が変わるたびに sync_schedule で upsert し、
+払戻への時刻付与・予想ページ・先読みはここから索引で引く（1日分の JSON を開かない）。
+"""
+from __future__ import annotations
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Tuple
+import re
+
+from .models import RaceSchedule
+
+
+def rno_to_int(rno: Any) -> int:
+    """"12R" / "12" / 12 → 12"""
+    m = re.search(r"\d+", str(rno))
+    if not m:
+        raise ValueError(f"レース番号が不正です: {rno}")
+    return int(m.group(0))
+
+
+def _parse_time(text: str | None) -> time | None:
+    try:
+        return datetime.strptime((text or "").strip(), "%H:%M").time()
+    except ValueError:
+        return None
+
+
+def sync_schedule(day: date, sites: List[Dict[str, Any]]) -> int:
+    """sites（get_today_sites の形）を RaceSchedule に upsert する。返り値: 行数"""
+    rows = []
+    for site in sites:
+        for race in site.get("races", []):
+            try:
+                rno = rno_to_int(race.get("rno"))
+            except ValueError:
+                continue
+            rows.append(RaceSchedule(
+                date=day,
+                place=site["place"],
+                rno=rno,
+                start_time=_parse_time(race.get("time")),
+                racelist_url=race.get("url") or "",
+                raceindex_url=site.get("raceindex_url") or "",
+            ))
+    RaceSchedule.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["date", "place", "rno"],
+        update_fields=["start_time", "racelist_url", "raceindex_url", "updated_at"],
+    )
+    return len(rows)
+
+
+def time_map(day: date) -> Dict[Tuple[str, int], str]:
+    """{ (会場, R): "15:42" }"""
+    return {
+        (place, rno): t.strftime("%H:%M")
+        for place, rno, t in RaceSchedule.objects.filter(date=day, start_time__isnull=False)
+        .values_list("place", "rno", "start_time")
+    }
+
+
+def deadlines(day: date) -> List[Tuple[str, str, datetime]]:
+    """(会場, racelist URL, 締切) の一覧（締切順）"""
+    qs = (
+        RaceSchedule.objects.filter(date=day, start_time__isnull=False)
+        .exclude(racelist_url="")
+        .order_by("start_time")
+        .values_list("place", "racelist_url", "start_time")
+    )
+    return [(place, url, datetime.combine(day, t)) for place, url, t in qs]
+
+
+def find_by_url(racelist_url: str) -> RaceSchedule | None:
+    """racelist URL → 予定（同じ URL は日付が入っているので1行）"""
+    return RaceSchedule.objects.filter(racelist_url=racelist_url).order_by("-date").first()
+
+
+def day_races(day: date) -> List[Tuple[str, int, str, datetime]]:
+    """(会場, R, racelist URL, 締切) の一覧（締切順）"""
+    qs = (
+        RaceSchedule.objects.filter(date=day, start_time__isnull=False)
+        .order_by("start_time", "place")
+        .values_list("place", "rno", "racelist_url", "start_time")
+    )
+    return [(place, rno, url, datetime.combine(day, t)) for place, rno, url, t in qs]
@@ -1,3 +1,9 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from scraping.corpus import CorpusTestMixin
+
+
+class RaceindexWeatherExtractorTests(CorpusTestMixin, SimpleTestCase):
+    """raceindex / tenki.jp の保存ページに対して extractor の出力を期待値と突き合わせる"""
+
+    page_types = ("raceindex", "tenki")
@@ -1,12 +1,22 @@
 # today_races/views.py
 
 from django.http import JsonResponse, HttpResponseBadRequest
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import json
 from datetime import date
-from .models import DailyRaceCache
+from django.utils import timezone
+from .models import DailyRaceCache, DailyVenueRaces, RaceSchedule
+from .crawler import crawl
+from .schedule import sync_schedule
+from .weather import (
+    WEATHER_URL_DEFAULTS,
+    fetch_weather_for_place,
+    load_weather_map,
+    parse_weather_html,
+    refresh_weather_in_background,
+)
+from scraping import http_client
+from scraping.parsers import make_soup
 import logging
 logger = logging.getLogger(__name__)
 
@@ -22,56 +32,103 @@ def api_root(request):
     })
 
 
-WEATHER_URL_DEFAULTS = {
-    "桐生": "https://tenki.jp/leisure/horse/3/13/32948/1hour.html",
-    "戸田": "https://tenki.jp/leisure/horse/3/14/32949/1hour.html",
-    "江戸川": "https://tenki.jp/leisure/horse/3/16/32950/1hour.html",
-    "平和島": "https://tenki.jp/leisure/horse/3/16/32951/1hour.html",
-    "多摩川": "https://tenki.jp/leisure/horse/3/16/32952/1hour.html",
-    "浜名湖": "https://tenki.jp/leisure/horse/5/25/32953/1hour.html",
-    "蒲郡": "https://tenki.jp/leisure/horse/5/26/32954/1hour.html",
-    "常滑": "https://tenki.jp/leisure/horse/5/26/32955/1hour.html",
-    "津": "https://tenki.jp/leisure/horse/5/27/32956/1hour.html",
-    "三国": "https://tenki.jp/leisure/horse/4/21/32957/1hour.html",
-    "びわこ": "https://tenki.jp/leisure/horse/6/28/32958/1hour.html",
-    "住之江": "https://tenki.jp/leisure/horse/6/30/32959/1hour.html",
-    "尼崎": "https://tenki.jp/leisure/horse/6/31/32960/1hour.html",
-    "鳴門": "https://tenki.jp/leisure/horse/8/39/32961/1hour.html",
-    "丸亀": "https://tenki.jp/leisure/horse/8/40/32962/1hour.html",
-    "児島": "https://tenki.jp/leisure/horse/7/36/32963/1hour.html",
-    "宮島": "https://tenki.jp/leisure/horse/7/37/32964/1hour.html",
-    "徳山": "https://tenki.jp/leisure/horse/7/38/32965/1hour.html",
-    "下関": "https://tenki.jp/leisure/horse/7/38/32966/1hour.html",
-    "若松": "https://tenki.jp/leisure/horse/9/43/32967/1hour.html",
-    "芦屋": "https://tenki.jp/leisure/horse/9/43/32968/1hour.html",
-    "福岡": "https://tenki.jp/leisure/horse/9/43/32969/1hour.html",
-    "唐津": "https://tenki.jp/leisure/horse/9/44/32970/1hour.html",
-    "大村": "https://tenki.jp/leisure/horse/9/45/32971/1hour.html",
-}
-
 # 🏁 今日の全レース取得（localStorage側でキャッシュ）
 def all_races_today(request):
     if request.method != "GET":
         return HttpResponseBadRequest("GET only")
 
-    from datetime import date
-    from .models import DailyRaceCache
-    import json
+    sites = get_today_sites()
+
+    # 🌤 天気は保存済みの予報から付与（更新はバックグラウンド）
+    apply_weather(sites)
+
+    return JsonResponse(sites, safe=False)
+
 
+# 📦 今日の sites を会場単位のキャッシュから組み立てる
+def get_today_sites(refresh: bool = True) -> list[dict]:
+    """
+    - 会場一覧が未登録なら開催一覧ページから登録する
+    - refresh=True なら、未取得 / 失敗 / 古い会場の raceindex だけ取り直す
+    - 結果は従来どおり DailyRaceCache（1日1件の JSON）にも書き出し、
+      レースごとの締切・URL は RaceSchedule に upsert する
+    """
     today = date.today()
-    cache = DailyRaceCache.objects.first()
+    venues = list(DailyVenueRaces.objects.filter(date=today).order_by("order"))
+
+    changed = False
+    if not venues:
+        # ⚡ ここから取得開始（今日の会場が未登録）
+        html = http_client.fetch_text(INDEX_URL, timeout=20)
+        sites = parse_sites_from_index(html)
+        venues = [
+            DailyVenueRaces(
+                date=today,
+                place=site["place"],
+                order=i,
+                title=site["title"],
+                raceindex_url=site["raceindex_url"],
+            )
+            for i, site in enumerate(sites)
+        ]
+        DailyVenueRaces.objects.bulk_create(venues, ignore_conflicts=True)
+        venues = list(DailyVenueRaces.objects.filter(date=today).order_by("order"))
+        changed = True
+
+    if refresh:
+        targets = [v for v in venues if v.needs_refresh()]
+        if targets:
+            print(f"♻️ 再取得する会場: {[v.place for v in targets]}")
+            refresh_venues(targets)
+            changed = True
+        else:
+            print("📦 今日のキャッシュを使用（再取得なし）")
+
+    sites = [v.to_site() for v in venues]
+
+    # 🗓 レースごとの予定（会場の一覧が変わったとき / 今日の分がまだ無いとき）
+    if changed or not RaceSchedule.objects.filter(date=today).exists():
+        sync_schedule(today, sites)
+
+    # 💾 DBに上書き（常に1件）
+    if changed:
+        json_text = json.dumps(sites, ensure_ascii=False)
+        cache = DailyRaceCache.objects.first()
+        if cache:
+            cache.date = today
+            cache.json_text = json_text
+            cache.save(update_fields=["date", "json_text", "updated_at"])
+        else:
+            DailyRaceCache.objects.create(date=today, json_text=json_text)
+
+    return sites
+
+
+# ♻️ 指定会場の raceindex だけ並列で取り直し、その行だけ更新する
+def refresh_venues(venues: list[DailyVenueRaces]) -> dict:
+    sites = [v.to_site() for v in venues]
+    failures = populate_sites(sites)
+    now = timezone.now()
+
+    for venue, site in zip(venues, sites):
+        reason = failures.get(venue.place)
+        if reason:
+            print(f"⚠️ {venue.place} の取得に失敗: {reason}")
+            venue.status = DailyVenueRaces.STATUS_ERROR
+            venue.error = reason
+        else:
+            venue.races_json = json.dumps(site["races"], ensure_ascii=False)
+            venue.status = DailyVenueRaces.STATUS_OK
+            venue.error = ""
+        venue.fetched_at = now
+        venue.save(update_fields=["races_json", "status", "error", "fetched_at"])
 
-    # ✅ 既存キャッシュがあって、今日ならそのまま返す
-    if cache and cache.date == today:
-        print("📦 今日のキャッシュを使用（再取得なし）")
-        sites = json.loads(cache.json_text)
-        return JsonResponse(sites, safe=False)
+    return failures
 
-    # ⚡ ここから取得開始（キャッシュなし or 古い日付）
 
-    res = requests.get(INDEX_URL, timeout=20)
-    res.encoding = "utf-8"
-    soup = BeautifulSoup(res.text, "html.parser")
+# 🏁 開催一覧ページから会場ごとの site を作る（races は空）
+def parse_sites_from_index(html: str, backend: str | None = None):
+    soup = make_soup(html, backend)
 
     sites = []
     for tbody in soup.select(".table1 table > tbody"):
@@ -101,61 +158,56 @@ def all_races_today(request):
         except Exception as e:
             print("Error parsing site:", e)
 
-    # ✅ 第一段階のJSON保存テスト
-    #json_text = json.dumps(sites, ensure_ascii=False, indent=2)
-    #with open("test_all_races_today.json", "w", encoding="utf-8") as f:
-    #    f.write(json_text)
+    return sites
 
 
-    # ✅ 完全版取得開始
-    for site in sites:
-        try:
-            site["races"] = fetch_races_from_raceindex(site["raceindex_url"])
-            print(f"🏁 {site['place']}: {len(site['races'])} races 取得")
-        except Exception as e:
-            print(f"⚠️ {site['place']} のレース詳細取得に失敗: {e}")
+# ⚡ 全会場の raceindex を並列取得して sites に反映
+def populate_sites(sites: list[dict], use_cache: bool = True) -> dict:
+    """
+    各 site の raceindex を 1回ずつ並列取得し、races を埋める。
+    返り値: { place: "失敗理由" }（会場ごとの失敗レポート）
+    """
+    pages, errors = crawl((site.get("raceindex_url") for site in sites), use_cache=use_cache)
 
-    # ✅ 完全版取得開始
+    failures = {}
     for site in sites:
-        try:
-            site["races"] = fetch_races_from_raceindex(site["raceindex_url"])
-            print(f"🏁 {site['place']}: {len(site['races'])} races 取得")
-        except Exception as e:
-            print(f"⚠️ {site['place']} のレース詳細取得に失敗: {e}")
+        place = site["place"]
+        index_url = site.get("raceindex_url")
+
+        if index_url in pages:
+            try:
+                site["races"] = parse_races_from_raceindex(pages[index_url])
+                print(f"🏁 {place}: {len(site['races'])} races 取得")
+            except Exception as e:
+                failures[place] = f"raceindex parse: {e}"
+        else:
+            failures[place] = f"raceindex: {errors.get(index_url, 'URLなし')}"
+
+    return failures
+
+
+# 🌤 保存済みの予報を各会場に付与し、古い会場はバックグラウンドで更新
+def apply_weather(sites: list[dict]):
+    places = [site.get("place") for site in sites if site.get("place")]
+    refresh_weather_in_background(places)
 
-    # 🌤 各開催場に天気をマージ
     for site in sites:
         try:
             merge_weather_into_races(site)
         except Exception as e:
             logger.warning(f"[weather] {site.get('place')} への天気付与に失敗: {e}")
 
-    # 💾 JSONをファイル保存（テスト用）
-    #json_text = json.dumps(sites, ensure_ascii=False, indent=2)
-    #with open("test_all_races_today_full.json", "w", encoding="utf-8") as f:
-    #    f.write(json_text)
-
-
-    # 💾 DBに上書き（常に1件）
-    json_text = json.dumps(sites, ensure_ascii=False)
-    if cache:
-        cache.date = today
-        cache.json_text = json_text
-        cache.save(update_fields=["date", "json_text", "updated_at"])
-        #print(f"💾 既存データを上書き保存 ({today})")
-    else:
-        DailyRaceCache.objects.create(date=today, json_text=json_text)
-        #print(f"🆕 新規保存 ({today})")
-
-    return JsonResponse(sites, safe=False)
-
 
 # 🏁 各会場別のレース情報を取得
 def fetch_races_from_raceindex(url):
     """各レース場のレース一覧（1R〜12R）を取得"""
-    res = requests.get(url, timeout=20)
-    res.encoding = "utf-8"
-    soup = BeautifulSoup(res.text, "html.parser")
+    html = http_client.fetch_text(url, timeout=20)
+    return parse_races_from_raceindex(html)
+
+
+def parse_races_from_raceindex(html: str, backend: str | None = None):
+    """raceindex の HTML からレース一覧（1R〜12R）を抽出"""
+    soup = make_soup(html, backend)
 
     races = []
     rows = soup.select(".contentsFrame1_inner .table1 table tbody tr")
@@ -177,76 +229,19 @@ def fetch_races_from_raceindex(url):
     return races
 
 
-# ☀️ 各会場の天気を天気予報から取得
-def fetch_weather_for_place(place: str):
-    """
-    tenki.jp から 1時間ごとの天気・風を 1〜24 時の dict で返す。
-    返り値: { hour(int): {"weather": "曇り", "direction": "北西", "speed": 4}, ... }
-    """
-    url = WEATHER_URL_DEFAULTS.get(place)
-    if not url:
-        logger.warning(f"[weather] URL not found for place={place}")
-        return {}
-
-    try:
-        res = requests.get(url, timeout=15)
-        res.encoding = "utf-8"
-    except Exception as e:
-        logger.warning(f"[weather] request error for {place}: {e}")
-        return {}
-
-    soup = BeautifulSoup(res.text, "html.parser")
-    table = soup.select_one("#forecast-point-1h-today")
-    if not table:
-        logger.warning(f"[weather] table not found for {place}")
-        return {}
-
-    # 時刻（01〜24）
-    hour_cells = table.select("tr.hour td span")
-    # 天気（曇り / 晴れ …）
-    weather_cells = table.select("tr.weather td p")
-    # 風向（北西 / 東北東 …）
-    dir_cells = table.select("tr.wind-blow td p")
-    # 風速（1 / 4 / 7 …）
-    speed_cells = table.select("tr.wind-speed td span")
-
-    n = min(len(hour_cells), len(weather_cells), len(dir_cells), len(speed_cells))
-    result = {}
-
-    for i in range(n):
-        try:
-            hour = int(hour_cells[i].get_text(strip=True))  # 1〜24
-        except ValueError:
-            continue
-
-        weather = weather_cells[i].get_text(strip=True)
-        direction = dir_cells[i].get_text(strip=True)
-        speed_text = speed_cells[i].get_text(strip=True)
-
-        try:
-            speed = int(speed_text)
-        except ValueError:
-            speed = None
-
-        result[hour] = {
-            "weather": weather,
-            "direction": direction,
-            "speed": speed,
-        }
-
-    return result
-
 # ☀️ 天気予報を各レースの日時の箇所に結合
-def merge_weather_into_races(site: dict):
+def merge_weather_into_races(site: dict, weather_map: dict | None = None):
     """
     site = {"place": ..., "races": [...]}
     各レースの time から hour を取り出して、weather / wind を追加する。
+    weather_map を省略した場合は DB に保存済みの予報を使う（tenki.jp は待たない）。
     """
     place = site.get("place")
     if not place:
         return
 
-    weather_map = fetch_weather_for_place(place)
+    if weather_map is None:
+        weather_map = load_weather_map(place)
     if not weather_map:
         return
 
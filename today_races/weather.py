@@ -0,0 +1,220 @@
+# today_races/weather.py
+"""
+tenki.jp の 1時間予報を (会場, 日付, 時) 単位で DB に保持する。
+- 取得は refresh_weather（並列・TTL 切れの会場だけ）
+- レース一覧への付与は load_weather_map で DB から読むだけ（tenki.jp を待たない）
+"""
+from __future__ import annotations
+from datetime import date, timedelta
+import logging
+import threading
+
+from django.db import close_old_connections
+from django.db.models import Max
+from django.utils import timezone
+
+from scraping import http_client
+from scraping.parsers import make_soup
+from .crawler import crawl
+from .models import WeatherForecast
+
+logger = logging.getLogger(__name__)
+
+# 予報を取り直すまでの時間
+WEATHER_TTL = timedelta(minutes=30)
+
+WEATHER_URL_DEFAULTS = {
+    "桐生": "https://tenki.jp/leisure/horse/3/13/32948/1hour.html",
+    "戸田": "https://tenki.jp/leisure/horse/3/14/32949/1hour.html",
+    "江戸川": "https://tenki.jp/leisure/horse/3/16/32950/1hour.html",
+    "平和島": "https://tenki.jp/leisure/horse/3/16/32951/1hour.html",
+    "多摩川": "https://tenki.jp/leisure/horse/3/16/32952/1hour.html",
+    "浜名湖": "https://tenki.jp/leisure/horse/5/25/32953/1hour.html",
+    "蒲郡": "https://tenki.jp/leisure/horse/5/26/32954/1hour.html",
+    "常滑": "https://tenki.jp/leisure/horse/5/26/32955/1hour.html",
+    "津": "https://tenki.jp/leisure/horse/5/27/32956/1hour.html",
+    "三国": "https://tenki.jp/leisure/horse/4/21/32957/1hour.html",
+    "びわこ": "https://tenki.jp/leisure/horse/6/28/32958/1hour.html",
+    "住之江": "https://tenki.jp/leisure/horse/6/30/32959/1hour.html",
+    "尼崎": "https://tenki.jp/leisure/horse/6/31/32960/1hour.html",
+    "鳴門": "https://tenki.jp/leisure/horse/8/39/32961/1hour.html",
+    "丸亀": "https://tenki.jp/leisure/horse/8/40/32962/1hour.html",
+    "児島": "https://tenki.jp/leisure/horse/7/36/32963/1hour.html",
+    "宮島": "https://tenki.jp/leisure/horse/7/37/32964/1hour.html",
+    "徳山": "https://tenki.jp/leisure/horse/7/38/32965/1hour.html",
+    "下関": "https://tenki.jp/leisure/horse/7/38/32966/1hour.html",
+    "若松": "https://tenki.jp/leisure/horse/9/43/32967/1hour.html",
+    "芦屋": "https://tenki.jp/leisure/horse/9/43/32968/1hour.html",
+    "福岡": "https://tenki.jp/leisure/horse/9/43/32969/1hour.html",
+    "唐津": "https://tenki.jp/leisure/horse/9/44/32970/1hour.html",
+    "大村": "https://tenki.jp/leisure/horse/9/45/32971/1hour.html",
+}
+
+
+# ☀️ 各会場の天気を天気予報から取得
+def fetch_weather_for_place(place: str):
+    """
+    tenki.jp から 1時間ごとの天気・風を 1〜24 時の dict で返す。
+    返り値: { hour(int): {"weather": "曇り", "direction": "北西", "speed": 4}, ... }
+    """
+    url = WEATHER_URL_DEFAULTS.get(place)
+    if not url:
+        logger.warning(f"[weather] URL not found for place={place}")
+        return {}
+
+    try:
+        html = http_client.fetch_text(url, timeout=15)
+    except Exception as e:
+        logger.warning(f"[weather] request error for {place}: {e}")
+        return {}
+
+    return parse_weather_html(html, place)
+
+
+def parse_weather_html(html: str, place: str = "", backend: str | None = None):
+    """tenki.jp の 1時間天気ページから { hour: {...} } を抽出"""
+    soup = make_soup(html, backend)
+    table = soup.select_one("#forecast-point-1h-today")
+    if not table:
+        logger.warning(f"[weather] table not found for {place}")
+        return {}
+
+    # 時刻（01〜24）
+    hour_cells = table.select("tr.hour td span")
+    # 天気（曇り / 晴れ …）
+    weather_cells = table.select("tr.weather td p")
+    # 風向（北西 / 東北東 …）
+    dir_cells = table.select("tr.wind-blow td p")
+    # 風速（1 / 4 / 7 …）
+    speed_cells = table.select("tr.wind-speed td span")
+
+    n = min(len(hour_cells), len(weather_cells), len(dir_cells), len(speed_cells))
+    result = {}
+
+    for i in range(n):
+        try:
+            hour = int(hour_cells[i].get_text(strip=True))  # 1〜24
+        except ValueError:
+            continue
+
+        weather = weather_cells[i].get_text(strip=True)
+        direction = dir_cells[i].get_text(strip=True)
+        speed_text = speed_cells[i].get_text(strip=True)
+
+        try:
+            speed = int(speed_text)
+        except ValueError:
+            speed = None
+
+        result[hour] = {
+            "weather": weather,
+            "direction": direction,
+            "speed": speed,
+        }
+
+    return result
+
+
+# 💾 予報を DB に保存（同じ (会場, 日付, 時) は上書き）
+def save_weather_map(place: str, weather_map: dict, day=None) -> int:
+    day = day or date.today()
+    now = timezone.now()
+    rows = [
+        WeatherForecast(
+            place=place,
+            date=day,
+            hour=hour,
+            weather=info.get("weather") or "",
+            direction=info.get("direction") or "",
+            speed=info.get("speed"),
+            fetched_at=now,
+        )
+        for hour, info in weather_map.items()
+    ]
+    if not rows:
+        return 0
+    WeatherForecast.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["place", "date", "hour"],
+        update_fields=["weather", "direction", "speed", "fetched_at"],
+    )
+    return len(rows)
+
+
+# 📦 DB から { hour: {...} } を読む（ネットワークには出ない）
+def load_weather_map(place: str, day=None) -> dict:
+    day = day or date.today()
+    qs = WeatherForecast.objects.filter(place=place, date=day)
+    return {
+        f.hour: {"weather": f.weather, "direction": f.direction, "speed": f.speed}
+        for f in qs
+    }
+
+
+def stale_places(places, day=None, ttl: timedelta = WEATHER_TTL) -> list[str]:
+    """予報が無い / TTL 切れの会場を返す"""
+    day = day or date.today()
+    places = [p for p in places if p in WEATHER_URL_DEFAULTS]
+    latest = dict(
+        WeatherForecast.objects.filter(date=day, place__in=places)
+        .values_list("place")
+        .annotate(last=Max("fetched_at"))
+    )
+    threshold = timezone.now() - ttl
+    return [p for p in places if not latest.get(p) or latest[p] < threshold]
+
+
+# ⚡ 複数会場の予報をまとめて並列取得して保存
+def refresh_weather(places=None, force: bool = False, day=None) -> dict:
+    """
+    places=None なら全会場。force=False なら TTL 切れの会場だけ取り直す。
+    返り値: { place: "失敗理由" }
+    """
+    places = list(places or WEATHER_URL_DEFAULTS.keys())
+    if not force:
+        places = stale_places(places, day)
+    if not places:
+        return {}
+
+    urls = {place: WEATHER_URL_DEFAULTS[place] for place in places if place in WEATHER_URL_DEFAULTS}
+    pages, errors = crawl(urls.values())
+
+    failures = {}
+    for place, url in urls.items():
+        if url not in pages:
+            failures[place] = errors.get(url, "取得失敗")
+            continue
+        weather_map = parse_weather_html(pages[url], place)
+        if not weather_map:
+            failures[place] = "予報テーブルなし"
+            continue
+        save_weather_map(place, weather_map, day)
+
+    for place, reason in failures.items():
+        logger.warning(f"[weather] {place} の予報更新に失敗: {reason}")
+    return failures
+
+
+_refresh_lock = threading.Lock()
+
+
+def refresh_weather_in_background(places=None) -> bool:
+    """
+    TTL 切れの会場をバックグラウンドで更新する（リクエストは待たせない）。
+    すでに更新中なら何もしない。起動したら True。
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+
+    def _run():
+        try:
+            refresh_weather(places)
+        except Exception as e:
+            logger.warning(f"[weather] バックグラウンド更新に失敗: {e}")
+        finally:
+            close_old_connections()
+            _refresh_lock.release()
+
+    threading.Thread(target=_run, name="weather-refresh", daemon=True).start()
+    return True